@@ -4,9 +4,101 @@ Contains the blueprints for the api url builder.
 '''
 
 
-from flask import Blueprint
+import base64
+import binascii
+from datetime import datetime
+from flask import Blueprint, Response, abort, jsonify, request
+from flask import stream_with_context
+import json
+from models import storage
+from models.base_model import time
+from models.engine.indexes import sort_key
 
 app_views = Blueprint('app_views', __name__, url_prefix='/api/v1')
+PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def jsonify_iter(objs):
+    '''
+    Streams the to_dict() of each obj as a JSON list, so the list is
+    never held in memory whole.
+    '''
+    def generate():
+        '''Yields the JSON list one object at a time.'''
+        separator = '['
+        for obj in objs:
+            yield separator + json.dumps(obj.to_dict(), sort_keys=True,
+                                         separators=(',', ':'))
+            separator = ','
+        yield '[]\n' if separator == '[' else ']\n'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/json')
+
+
+def encode_cursor(obj):
+    '''Returns the opaque cursor pointing after obj.'''
+    return base64.urlsafe_b64encode(
+        json.dumps(sort_key(obj)).encode()).decode()
+
+
+def decode_cursor(cursor):
+    '''
+    Returns the (created_at, id) key encoded in cursor. Raises 400 error
+    if the cursor is not one returned by encode_cursor.
+    '''
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at, id = key
+        datetime.strptime(created_at, time)
+        if type(id) is not str:
+            raise ValueError
+    except (binascii.Error, TypeError, ValueError):
+        abort(400, 'Invalid cursor')
+    return (created_at, id)
+
+
+def request_limit(default=PAGE_LIMIT):
+    '''
+    Returns the limit argument of the request, default if there is none.
+    Raises 400 error if it is not a number from 1 to MAX_PAGE_LIMIT.
+    '''
+    limit = request.args.get('limit')
+    if limit is None:
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        abort(400, 'Invalid limit')
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        abort(400, 'Invalid limit')
+    return limit
+
+
+def jsonify_page(cls, attribute=None, value=None):
+    '''
+    Returns the cls objects, only those whose attribute is value if given,
+    as a JSON list. When the request has a limit or a cursor argument,
+    returns instead one page of them, sorted by creation, as
+    {"results": [...], "next_cursor": cursor of the next page or null}.
+    '''
+    cursor = request.args.get('cursor')
+    if request.args.get('limit') is None and cursor is None:
+        if attribute is None:
+            return jsonify_iter(storage.iter(cls))
+        return jsonify_iter(storage.related(cls, attribute, value))
+    limit = request_limit()
+    after = None if cursor is None else decode_cursor(cursor)
+    objs = storage.page(cls, limit + 1, after, attribute, value)
+    next_cursor = None
+    if len(objs) > limit:
+        objs = objs[:limit]
+        next_cursor = encode_cursor(objs[-1])
+    return jsonify({'results': [obj.to_dict() for obj in objs],
+                    'next_cursor': next_cursor})
+
+
 from api.v1.views.index import *
 from api.v1.views.states import *
 from api.v1.views.cities import *
@@ -14,3 +106,4 @@ from api.v1.views.amenities import *
 from api.v1.views.users import *
 from api.v1.views.places import * 
 from api.v1.views.places_reviews import *
+from api.v1.views.search import *
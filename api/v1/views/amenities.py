@@ -4,7 +4,7 @@ This module contains the view for restful api of the
 city obj.
 '''
 
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.amenity import Amenity
@@ -15,12 +15,7 @@ def get_all_amenities():
     '''
     Returns the json object of all amenities in storage
     '''
-    amenity_list = []
-    all_amenities = storage.all('Amenity')
-    for _amenity in all_amenities.values():
-        amenity_list.append(_amenity.to_dict())
-
-    return jsonify(amenity_list)
+    return jsonify_page('Amenity')
 
 
 @app_views.route('/amenities/<amenity_id>', methods=['GET'])
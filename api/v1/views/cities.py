@@ -4,7 +4,7 @@ This module contains the view for restful api of the
 city obj.
 '''
 
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.city import City
@@ -17,14 +17,11 @@ def get_city_state(state_id):
     Gets all cities linked to state id. Raises 404 error if
     state_id is not linked to sstate obj.
     '''
-    city_list = []
     state_obj = storage.get(State, state_id)
     if state_obj is None:
         abort(404)
-    for city in state_obj.cities:
-        city_list.append(city.to_dict())
 
-    return jsonify(city_list)
+    return jsonify_page(City, 'state_id', state_id)
 
 
 @app_views.route('/cities/<city_id>', methods=['GET'])
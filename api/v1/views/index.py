@@ -4,7 +4,7 @@ Module contains the routes to be used for the API.
 '''
 
 from api.v1.views import app_views
-from flask import jsonify
+from flask import abort, jsonify, request
 from models import storage
 from models.city import City
 from models.place import Place
@@ -25,9 +25,41 @@ def app_status():
 
 @app_views.route('/stats')
 def count():
-    '''Returns the count of objects from storage.'''
+    '''
+    Returns the count of objects from storage, read at once from
+    storage.counts(): exact ones, or the approximate ones if the
+    approximate argument is 1. Raises 400 if it is neither 0 nor 1.
+    '''
+    approximate = request.args.get('approximate', '0')
+    if approximate not in ('0', '1'):
+        abort(400, 'Invalid approximate')
+    counts = storage.counts(approximate=approximate == '1')
     class_count_dict = {}
     for name, cls in classes.items():
-        cls_count = storage.count(cls)
-        class_count_dict[name] = cls_count
+        class_count_dict[name] = counts.get(cls.__name__, 0)
     return jsonify(class_count_dict)
+
+
+@app_views.route('/stats/pool')
+def pool_stats():
+    '''
+    Returns the metrics of the database connection pool: connections
+    checked out now and at most, overflow, and the histogram of the time
+    taken to get one. Raises 404 if the storage has no pool.
+    '''
+    stats = storage.pool_stats()
+    if stats is None:
+        abort(404)
+    return jsonify(stats)
+
+
+@app_views.route('/stats/cache')
+def cache_stats():
+    '''
+    Returns the counters of the object cache of the database storage:
+    hits, misses, evictions and size. Raises 404 if it is off.
+    '''
+    stats = storage.cache_stats()
+    if stats is None:
+        abort(404)
+    return jsonify(stats)
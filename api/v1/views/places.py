@@ -4,13 +4,47 @@ This module contains the view for the restful API for the
 places obj.
 '''
 
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_iter, jsonify_page
+from api.v1.views import request_limit
 from flask import jsonify, abort, request
 from models import storage
 from models.place import Place
 from models.city import City
+from models.engine import tiles
 from models.user import User
 
+# attributes of Place the places of a city can be filtered, sorted and
+# aggregated on
+PLACE_NUMBERS = ['price_by_night', 'max_guest', 'number_rooms',
+                 'number_bathrooms', 'latitude', 'longitude']
+# the farthest two places can be, in km
+MAX_RADIUS_KM = 20016
+# the most map tiles the clusters of a request may come from
+MAX_CLUSTER_TILES = 4096
+
+
+def place_filters():
+    '''
+    Returns the predicates on the PLACE_NUMBERS given as arguments of the
+    request, like price_by_night__lte=100 or max_guest=4.
+    Raises 400 error if the operator is unknown or the value not a number.
+    '''
+    predicates = {}
+    for key, value in request.args.items():
+        attribute, _, op = key.partition('__')
+        if attribute not in PLACE_NUMBERS:
+            continue
+        if op not in ['', 'gt', 'gte', 'lt', 'lte']:
+            abort(400, 'Invalid {}'.format(key))
+        try:
+            predicates[key] = int(value)
+        except ValueError:
+            try:
+                predicates[key] = float(value)
+            except ValueError:
+                abort(400, 'Invalid {}'.format(key))
+    return predicates
+
 
 @app_views.route('/cities/<city_id>/places',
                  methods=['GET'],
@@ -19,16 +53,119 @@ def get_places(city_id):
     '''
     Returns all places associated with the city_id.
     Returns 404 if city not found.
+    Arguments like price_by_night__lte=100 or max_guest__gte=4 filter
+    them, sort=price_by_night (or -price_by_night, descending) sorts them
+    and limit caps their number. stats=price_by_night returns instead the
+    count of the places and the min, max and mean of their price.
+    Raises 400 if an argument is invalid.
     '''
-    places_list = []
     city_obj = storage.get(City, city_id)
     if city_obj is None:
         abort(404)
 
-    for place in city_obj.places:
-        places_list.append(place.to_dict())
+    predicates = place_filters()
+    sort = request.args.get('sort')
+    stats = request.args.get('stats')
+    if not predicates and sort is None and stats is None:
+        return jsonify_page(Place, 'city_id', city_id)
 
-    return jsonify(places_list)
+    if stats is not None:
+        if stats not in PLACE_NUMBERS:
+            abort(400, 'Invalid stats')
+        return jsonify(storage.aggregate(Place, stats, city_id=city_id,
+                                         **predicates))
+
+    if sort is not None and sort[sort.startswith('-'):] not in PLACE_NUMBERS:
+        abort(400, 'Invalid sort')
+    if request.args.get('cursor') is not None:
+        abort(400, 'Invalid cursor')
+    places = storage.query(Place, order_by=sort, limit=request_limit(None),
+                           city_id=city_id, **predicates)
+    return jsonify_iter(places)
+
+
+def request_number(name, low, high):
+    '''
+    Returns the argument name of the request as a float.
+    Raises 400 error if it is missing or not a number from low to high.
+    '''
+    try:
+        number = float(request.args.get(name, ''))
+    except ValueError:
+        abort(400, 'Invalid {}'.format(name))
+    if not low <= number <= high:
+        abort(400, 'Invalid {}'.format(name))
+    return number
+
+
+@app_views.route('/places/near',
+                 methods=['GET'],
+                 strict_slashes=False)
+def get_places_near():
+    '''
+    Returns the places within radius_km of the point (lat, lng), nearest
+    first, each with its distance_km, at most limit of them.
+    Raises 400 if an argument is missing or invalid.
+    '''
+    latitude = request_number('lat', -90, 90)
+    longitude = request_number('lng', -180, 180)
+    radius_km = request_number('radius_km', 0, MAX_RADIUS_KM)
+    places = []
+    for km, place in storage.places_near(latitude, longitude, radius_km,
+                                         request_limit()):
+        place_dict = place.to_dict()
+        place_dict['distance_km'] = km
+        places.append(place_dict)
+    return jsonify(places)
+
+
+@app_views.route('/places/bbox',
+                 methods=['GET'],
+                 strict_slashes=False)
+def get_places_within():
+    '''
+    Returns the places within the box from south to north and from west to
+    east, crossing the antimeridian if west > east, at most limit of them.
+    Raises 400 if an argument is missing or invalid.
+    '''
+    south = request_number('south', -90, 90)
+    west = request_number('west', -180, 180)
+    north = request_number('north', -90, 90)
+    east = request_number('east', -180, 180)
+    if south > north:
+        abort(400, 'Invalid south')
+    return jsonify_iter(storage.places_within(south, west, north, east,
+                                              request_limit()))
+
+
+@app_views.route('/places/clusters',
+                 methods=['GET'],
+                 strict_slashes=False)
+def get_place_clusters():
+    '''
+    Returns the clusters of the places within the box from south to north
+    and from west to east seen at zoom, one per map tile a quarter of a
+    256 pixel tile wide holding places, with their count, centroid and
+    min price.
+    Raises 400 if an argument is missing or invalid, or if the box spans
+    more than MAX_CLUSTER_TILES tiles at that zoom.
+    '''
+    south = request_number('south', -90, 90)
+    west = request_number('west', -180, 180)
+    north = request_number('north', -90, 90)
+    east = request_number('east', -180, 180)
+    if south > north:
+        abort(400, 'Invalid south')
+    try:
+        zoom = int(request.args.get('zoom', ''))
+    except ValueError:
+        abort(400, 'Invalid zoom')
+    if zoom < 0 or zoom > tiles.MAX_ZOOM:
+        abort(400, 'Invalid zoom')
+    if tiles.count(south, west, north, east,
+                   zoom + tiles.CELL_ZOOM) > MAX_CLUSTER_TILES:
+        abort(400, 'Too many tiles')
+    return jsonify(storage.place_clusters(south, west, north, east, zoom))
 
 
 @app_views.route('/places/<place_id>',
@@ -132,3 +269,30 @@ def update_place(place_id):
             setattr(place_obj, key, value)
     storage.save()
     return jsonify(place_obj.to_dict()), 200
+
+
+@app_views.route('/places_search',
+                 methods=['POST'],
+                 strict_slashes=False)
+def search_places():
+    '''
+    Returns the places in the states and cities whose ids are listed in
+    the JSON body, all places if both lists are empty or missing, keeping
+    only those having all the amenities and one of the any_amenities
+    listed.
+    If http body doesn't contain valid JSON raise 400.
+    If states, cities, amenities or any_amenities is not a list of ids
+    raise 400.
+    '''
+    filters = request.get_json(silent=True)
+    if not isinstance(filters, dict):
+        abort(400, 'Not a Json')
+
+    ids = {}
+    for key in ['states', 'cities', 'amenities', 'any_amenities']:
+        ids[key] = filters.get(key) or []
+        if not isinstance(ids[key], list) or \
+                not all(isinstance(id, str) for id in ids[key]):
+            abort(400, 'Invalid {}'.format(key))
+
+    return jsonify_iter(storage.search_places(**ids))
@@ -4,7 +4,7 @@ This module contains the view for restful api of the
 city obj.
 '''
 
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.place import Place
@@ -19,14 +19,11 @@ def get_places_reviews(place_id):
     Gets all reviews linked to place id. Raises 404 error if
     place_id is not linked to place obj.
     '''
-    review_list = []
     place_obj = storage.get(Place, place_id)
     if place_obj is None:
         abort(404)
-    for review in place_obj.reviews:
-        review_list.append(review.to_dict())
 
-    return jsonify(review_list)
+    return jsonify_page(Review, 'place_id', place_id)
 
 
 @app_views.route('/reviews/<review_id>', methods=['GET'], strict_slashes=False)
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+'''
+This module contains the views for the full-text search of the
+places and reviews, and for the autocomplete of the search box.
+'''
+
+import base64
+import binascii
+from api.v1.views import app_views, request_limit
+from flask import abort, jsonify, request
+import json
+from models import storage
+
+AUTOCOMPLETE_LIMIT = 10
+
+
+def encode_search_cursor(score, obj):
+    '''Returns the opaque cursor pointing after obj, found with score.'''
+    return base64.urlsafe_b64encode(json.dumps(
+        [score, obj.__class__.__name__, obj.id]).encode()).decode()
+
+
+def decode_search_cursor(cursor):
+    '''
+    Returns the (score, class name, id) encoded in cursor. Raises 400
+    error if the cursor is not one returned by encode_search_cursor.
+    '''
+    try:
+        score, name, id = json.loads(base64.urlsafe_b64decode(
+            cursor.encode()))
+        if type(score) not in [int, float] or type(name) is not str or \
+                type(id) is not str:
+            raise ValueError
+    except (binascii.Error, TypeError, ValueError):
+        abort(400, 'Invalid cursor')
+    return (score, name, id)
+
+
+@app_views.route('/search',
+                 methods=['GET'],
+                 strict_slashes=False)
+def search():
+    '''
+    Returns one page of the places and reviews whose description or text
+    holds one of the words of q, the most relevant first, each with its
+    score, as {"results": [...], "next_cursor": cursor of the next page
+    or null}.
+    Raises 400 if q is missing or an argument is invalid.
+    '''
+    text = request.args.get('q', '')
+    if not text.strip():
+        abort(400, 'Missing q')
+    limit = request_limit()
+    cursor = request.args.get('cursor')
+    after = None if cursor is None else decode_search_cursor(cursor)
+
+    found = storage.search(text, limit + 1, after)
+    next_cursor = None
+    if len(found) > limit:
+        found = found[:limit]
+        next_cursor = encode_search_cursor(*found[-1])
+    results = []
+    for score, obj in found:
+        obj_dict = obj.to_dict()
+        obj_dict['score'] = score
+        results.append(obj_dict)
+    return jsonify({'results': results, 'next_cursor': next_cursor})
+
+
+@app_views.route('/autocomplete',
+                 methods=['GET'],
+                 strict_slashes=False)
+def autocomplete():
+    '''
+    Returns the states, cities and amenities whose name starts with
+    prefix, ignoring case and accents, sorted by name, as a JSON list of
+    their {"__class__", "id", "name"}. Returns AUTOCOMPLETE_LIMIT of them
+    unless limit is given.
+    Raises 400 if prefix is missing or limit is invalid.
+    '''
+    prefix = request.args.get('prefix', '')
+    if not prefix.strip():
+        abort(400, 'Missing prefix')
+    limit = request_limit(AUTOCOMPLETE_LIMIT)
+    return jsonify([{'__class__': name, 'id': id, 'name': value}
+                    for value, name, id in storage.autocomplete(prefix,
+                                                                limit)])
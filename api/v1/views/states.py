@@ -4,7 +4,7 @@ This module contains the view for the restful API for the
 state obj.
 '''
 
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.state import State
@@ -13,12 +13,7 @@ from models.state import State
 @app_views.route('/states', methods=['GET'], strict_slashes=False)
 def get_all_states():
     '''Returns the json object of all states in storage.'''
-    state_list = []
-    all_states = storage.all('State')
-    for _state in all_states.values():
-        state_list.append(_state.to_dict())
-
-    return jsonify(state_list)
+    return jsonify_page('State')
 
 
 @app_views.route('/states/<state_id>', methods=['GET'])
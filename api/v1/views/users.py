@@ -4,7 +4,7 @@ This module contains the view for the restful API for the
 user obj.
 '''
 
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_page
 from flask import jsonify, abort, request
 from models import storage
 from models.user import User
@@ -15,12 +15,7 @@ def get_all_users():
     '''
     Returns all users in the database.
     '''
-    users_list = []
-    all_users = storage.all('User')
-    for user_obj in all_users.values():
-        users_list.append(user_obj.to_dict())
-
-    return jsonify(users_list)
+    return jsonify_page('User')
 
 
 @app_views.route('/users/<user_id>', methods=['GET'])
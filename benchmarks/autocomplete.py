@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""
+Times the completions of the search box through the FileStorage
+PrefixIndex against a scan of storage.all('State') and storage.all('City').
+
+Run from the repository root:
+    python3 -m benchmarks.autocomplete [scale ...]
+
+Names are made of random syllables, some capitalized or accented. Each
+completion asks for the first 10 names starting with a prefix of 1 to 4
+letters of a name, as typed one keystroke at a time. The percentiles are
+those of the storage call and of the whole GET /api/v1/autocomplete
+request through the Flask test client; the scan is timed on a few
+prefixes only.
+"""
+
+import random
+import sys
+import time
+from models.amenity import Amenity
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.engine.text import fold
+from models.state import State
+
+SCALES = [10000, 100000, 1000000]
+PREFIXES = 2000
+SYLLABLES = ["ba", "ca", "co", "de", "fé", "lo", "ma", "no", "ra", "sa",
+             "ta", "vi", "Ré", "San", "Port", "New "]
+
+
+def populate(storage, total):
+    """fills an empty storage with 50 states, 500 amenities and total
+    cities, returns their names"""
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__buckets = {}
+    FileStorage._FileStorage__indexes = {}
+    rand = random.Random(total)
+
+    def name():
+        """a random name"""
+        return "".join(rand.choices(SYLLABLES, k=rand.randint(2, 5)))
+
+    objs = [State(name=name()) for i in range(50)]
+    objs += [Amenity(name=name()) for i in range(500)]
+    objs += [City(name=name(), state_id=objs[i % 50].id)
+             for i in range(total)]
+    for obj in objs:
+        storage.new(obj)
+    return [obj.name for obj in objs]
+
+
+def scan(storage, prefix, limit):
+    """the completions of prefix found by scanning the states and cities"""
+    prefix = fold(prefix)
+    found = [(fold(obj.name), obj.name, obj.__class__.__name__, obj.id)
+             for cls in ["State", "City"]
+             for obj in storage.all(cls).values()
+             if fold(obj.name).startswith(prefix)]
+    return [key[1:] for key in sorted(found)[:limit]]
+
+
+def percentiles(function, prefixes):
+    """returns the (p50, p99) of function on each prefix in milliseconds"""
+    times = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        function(prefix)
+        times.append((time.perf_counter() - start) * 1e3)
+    times.sort()
+    return times[len(times) // 2], times[len(times) * 99 // 100]
+
+
+def main(scales):
+    """prints one row of timings per scale"""
+    from api.v1.app import app
+    client = app.test_client()
+    storage = FileStorage()
+    saved = (FileStorage._FileStorage__objects,
+             FileStorage._FileStorage__buckets,
+             FileStorage._FileStorage__indexes)
+    print("{:>8} {:>10} {:>10} {:>10} {:>10} {:>12}".format(
+        "cities", "p50 (ms)", "p99 (ms)", "GET p50", "GET p99",
+        "scan (ms)"))
+    try:
+        for total in scales:
+            names = populate(storage, total)
+            rand = random.Random(0)
+            prefixes = [name[:rand.randint(1, 4)]
+                        for name in rand.choices(names, k=PREFIXES)]
+            fast = percentiles(lambda p: storage.autocomplete(p, 10),
+                               prefixes)
+            get = percentiles(lambda p: client.get(
+                "/api/v1/autocomplete", query_string={"prefix": p}),
+                prefixes)
+            slow = percentiles(lambda p: scan(storage, p, 10),
+                               prefixes[:5])[0]
+            print("{:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>12.3f}".
+                  format(total, fast[0], fast[1], get[0], get[1], slow))
+    finally:
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__buckets,
+         FileStorage._FileStorage__indexes) = saved
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SCALES)
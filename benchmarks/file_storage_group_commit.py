@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+Compares FileStorage save throughput under concurrent writers with and
+without the background flusher.
+
+Run from the repository root:
+    python3 -m benchmarks.file_storage_group_commit [writers] [saves]
+
+Each writer thread creates a State and calls storage.save() in a loop on
+top of a store preloaded with BASE objects, like concurrent API POSTs.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from models.engine.file_storage import FileStorage
+from models.state import State
+
+BASE = 1000
+WINDOWS = [0, 0.001, 0.005]
+
+
+def run(storage, writers, saves):
+    """returns the saves per second reached by writers threads"""
+    def writer():
+        """creates and saves a State, saves times"""
+        for i in range(saves):
+            storage.new(State(name="state"))
+            storage.save()
+
+    threads = [threading.Thread(target=writer) for i in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return writers * saves / (time.perf_counter() - start)
+
+
+def main(writers=32, saves=20):
+    """prints the throughput for each flush window"""
+    storage = FileStorage()
+    attrs = ["_FileStorage__file_path", "_FileStorage__objects",
+             "_FileStorage__buckets", "_FileStorage__indexes",
+             "_FileStorage__dirty",
+             "_FileStorage__fragments", "_FileStorage__flush_window"]
+    saved = {attr: getattr(FileStorage, attr) for attr in attrs}
+    tmp = tempfile.mkdtemp()
+    print("{} writers x {} saves on {} objects".format(writers, saves, BASE))
+    print("{:>12} {:>12}".format("window (s)", "saves/s"))
+    try:
+        for window in WINDOWS:
+            FileStorage._FileStorage__file_path = os.path.join(
+                tmp, "file{}.json".format(window))
+            FileStorage._FileStorage__objects = {}
+            FileStorage._FileStorage__buckets = {}
+            FileStorage._FileStorage__indexes = {}
+            FileStorage._FileStorage__dirty = {}
+            FileStorage._FileStorage__fragments = {}
+            FileStorage._FileStorage__flush_window = window
+            for i in range(BASE):
+                storage.new(State(name="state"))
+            storage.save()
+            print("{:>12} {:>12.1f}".format(
+                window, run(storage, writers, saves)))
+    finally:
+        storage.sync()
+        for attr, value in saved.items():
+            setattr(FileStorage, attr, value)
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
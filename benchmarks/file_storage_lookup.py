@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""
+Times FileStorage get/count/all(cls) while the total number of objects grows.
+
+Run from the repository root:
+    python3 -m benchmarks.file_storage_lookup [scale ...]
+
+The Amenity population is held at a fixed size while the number of Place
+objects grows, so flat timings show that lookups don't depend on the size
+of the rest of the store.
+"""
+
+import sys
+import timeit
+from models.amenity import Amenity
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+SCALES = [1000, 10000, 100000, 1000000]
+AMENITIES = 100
+REPEAT = 10000
+
+
+def populate(storage, total):
+    """fills an empty storage with AMENITIES amenities and total places"""
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__buckets = {}
+    FileStorage._FileStorage__indexes = {}
+    amenities = [Amenity(name="amenity") for i in range(AMENITIES)]
+    for amenity in amenities:
+        storage.new(amenity)
+    for i in range(total - AMENITIES):
+        storage.new(Place(name="place"))
+    return amenities
+
+
+def per_call(stmt):
+    """returns the mean time of stmt in microseconds"""
+    return min(timeit.repeat(stmt, number=REPEAT, repeat=3)) / REPEAT * 1e6
+
+
+def main(scales):
+    """prints one row of timings per scale"""
+    storage = FileStorage()
+    saved = (FileStorage._FileStorage__objects,
+             FileStorage._FileStorage__buckets,
+             FileStorage._FileStorage__indexes)
+    print("{:>10} {:>12} {:>12} {:>16}".format(
+        "objects", "get (us)", "count (us)", "all(cls) (us)"))
+    try:
+        for total in scales:
+            amenity = populate(storage, total)[-1]
+            print("{:>10} {:>12.3f} {:>12.3f} {:>16.3f}".format(
+                total,
+                per_call(lambda: storage.get(Amenity, amenity.id)),
+                per_call(lambda: storage.count(Amenity)),
+                per_call(lambda: storage.all(Amenity))))
+    finally:
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__buckets,
+         FileStorage._FileStorage__indexes) = saved
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SCALES)
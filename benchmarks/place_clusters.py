@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""
+Times the clusters of map viewports through the FileStorage TileCache
+against fetching every place of the viewport, as the front end did to
+cluster them itself.
+
+Run from the repository root:
+    python3 -m benchmarks.place_clusters [scale ...]
+
+Places are spread as in benchmarks.place_geo. For a world viewport at zoom
+2 and a city viewport at zoom 11, the clusters are timed when no tile is
+cached (cold), when all are (warm), and after one place of the viewport
+moved (moved), which updates the cached tiles rather than
+forgetting them.
+"""
+
+import sys
+import time
+import timeit
+from benchmarks.place_geo import populate
+from models.engine.file_storage import FileStorage
+
+SCALES = [100000, 1000000]
+REPEAT = 5
+
+
+def per_call(function):
+    """returns the best time of function in milliseconds"""
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) * 1e3
+
+
+def once(function):
+    """returns the time of a single call of function in milliseconds"""
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main(scales):
+    """prints one row of timings per scale and viewport"""
+    storage = FileStorage()
+    saved = (FileStorage._FileStorage__objects,
+             FileStorage._FileStorage__buckets,
+             FileStorage._FileStorage__indexes)
+    print("{:>8} {:<6} {:>8} {:>9} {:>10} {:>10} {:>10} {:>12}".format(
+        "places", "view", "places", "clusters", "cold (ms)", "warm (ms)",
+        "moved (ms)", "fetch (ms)"))
+    try:
+        for total in scales:
+            places, cities = populate(storage, total)
+            latitude, longitude = cities[0]
+            city = (latitude - 0.1, longitude - 0.15,
+                    latitude + 0.1, longitude + 0.15)
+            for name, box, zoom in [("world", (-85, -180, 85, 180), 2),
+                                    ("city", city, 11)]:
+                def clusters():
+                    """the clusters of the viewport"""
+                    return storage.place_clusters(*box, zoom)
+
+                def fetch():
+                    """every place of the viewport, as dictionaries"""
+                    return [place.to_dict()
+                            for place in storage.places_within(*box)]
+
+                cold = once(clusters)
+                warm = per_call(clusters)
+                mover = storage.places_within(*box, limit=1)[0]
+                mover.latitude += 1e-4
+                moved = once(clusters)
+                print("{:>8} {:<6} {:>8} {:>9} {:>10.3f} {:>10.3f} "
+                      "{:>10.3f} {:>12.3f}".format(
+                          total, name, len(storage.places_within(*box)),
+                          len(clusters()), cold, warm, moved,
+                          per_call(fetch)))
+    finally:
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__buckets,
+         FileStorage._FileStorage__indexes) = saved
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SCALES)
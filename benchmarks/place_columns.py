@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""
+Times filters, sorts and aggregates over Place numeric attributes through
+the FileStorage ColumnStore against a loop over the Place objects.
+
+Run from the repository root, with NumPy installed:
+    python3 -m benchmarks.place_columns [scale ...]
+
+Each query runs once through storage.query() / storage.aggregate(), which
+vectorize the conditions over the NumPy columns, and once through the
+object loop they fall back to without NumPy (matches(), order() and
+aggregate() of models.engine.predicates).
+"""
+
+import random
+import sys
+import timeit
+from models.engine.columns import ColumnStore
+from models.engine.file_storage import FileStorage
+from models.engine.predicates import aggregate, matches, order, parse
+from models.place import Place
+
+SCALES = [10000, 100000]
+REPEAT = 5
+
+
+def populate(storage, total):
+    """fills an empty storage with total places, returns them"""
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__buckets = {}
+    FileStorage._FileStorage__indexes = {}
+    rand = random.Random(total)
+    places = [Place(name="place", price_by_night=rand.randint(20, 500),
+                    max_guest=rand.randint(1, 10),
+                    number_rooms=rand.randint(1, 6),
+                    latitude=rand.uniform(-90, 90),
+                    longitude=rand.uniform(-180, 180))
+              for i in range(total)]
+    for place in places:
+        storage.new(place)
+    return places
+
+
+def queries(storage, places):
+    """returns the {name: (vectorized, loop)} functions of each query"""
+    band = {"price_by_night__gte": 100, "price_by_night__lt": 150,
+            "max_guest__gte": 4, "latitude__gt": 0}
+    guests = {"max_guest__gte": 8}
+
+    def loop_filter(predicates):
+        """the places meeting predicates, by the object loop"""
+        conditions = parse(predicates)
+        return [place for place in places if matches(place, conditions)]
+
+    return {
+        "filter": (lambda: storage.query(Place, **band),
+                   lambda: loop_filter(band)),
+        "sort+limit": (
+            lambda: storage.query(Place, order_by="-price_by_night",
+                                  limit=20, **guests),
+            lambda: order(loop_filter(guests), "price_by_night",
+                          True)[:20]),
+        "min/max price": (
+            lambda: storage.aggregate(Place, "price_by_night"),
+            lambda: aggregate(places, "price_by_night"))}
+
+
+def per_call(function):
+    """returns the best time of function in milliseconds"""
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) * 1e3
+
+
+def main(scales):
+    """prints one row of timings per scale and query"""
+    if not ColumnStore.available:
+        print("NumPy is not installed, FileStorage keeps no ColumnStore")
+        return
+    storage = FileStorage()
+    saved = (FileStorage._FileStorage__objects,
+             FileStorage._FileStorage__buckets,
+             FileStorage._FileStorage__indexes)
+    print("{:>8} {:<14} {:>12} {:>12} {:>8}".format(
+        "places", "query", "numpy (ms)", "loop (ms)", "speedup"))
+    try:
+        for total in scales:
+            places = populate(storage, total)
+            for name, (vectorized, loop) in queries(storage,
+                                                    places).items():
+                fast, slow = per_call(vectorized), per_call(loop)
+                print("{:>8} {:<14} {:>12.3f} {:>12.3f} {:>7.1f}x".format(
+                    total, name, fast, slow, slow / fast))
+    finally:
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__buckets,
+         FileStorage._FileStorage__indexes) = saved
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SCALES)
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+"""
+Times radius and bounding box searches of places through the FileStorage
+GridIndex against a loop over the Place objects.
+
+Run from the repository root:
+    python3 -m benchmarks.place_geo [scale ...]
+
+Half the places are spread over the world, the other half gathered around
+a hundred cities. Each search runs once through storage.places_near() /
+storage.places_within() and once through a loop computing the distance to,
+or testing the box of, every place.
+"""
+
+import random
+import sys
+import timeit
+from models.engine.file_storage import FileStorage
+from models.engine.geo import distance
+from models.place import Place
+
+SCALES = [100000, 1000000]
+REPEAT = 5
+
+
+def populate(storage, total):
+    """fills an empty storage with total places, returns them and the
+    cities they are gathered around"""
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__buckets = {}
+    FileStorage._FileStorage__indexes = {}
+    rand = random.Random(total)
+    cities = [(rand.uniform(-60, 60), rand.uniform(-180, 180))
+              for i in range(100)]
+    places = []
+    for i in range(total):
+        if i % 2:
+            latitude, longitude = rand.choice(cities)
+            latitude = max(-90, min(90, rand.gauss(latitude, 0.2)))
+            longitude = max(-180, min(180, rand.gauss(longitude, 0.2)))
+        else:
+            latitude = rand.uniform(-90, 90)
+            longitude = rand.uniform(-180, 180)
+        places.append(Place(name="place", latitude=latitude,
+                            longitude=longitude,
+                            price_by_night=rand.randint(20, 500)))
+    for place in places:
+        storage.new(place)
+    return places, cities
+
+
+def searches(storage, places, cities):
+    """returns the {name: (indexed, loop)} functions of each search"""
+    latitude, longitude = cities[0]
+    viewport = (latitude - 0.1, longitude - 0.15,
+                latitude + 0.1, longitude + 0.15)
+
+    def loop_near(radius_km, limit):
+        """the nearest places within radius_km, by the object loop"""
+        found = []
+        for place in places:
+            km = distance(latitude, longitude, place.latitude,
+                          place.longitude)
+            if km <= radius_km:
+                found.append((km, place))
+        found.sort(key=lambda item: item[0])
+        return found[:limit]
+
+    def loop_within(south, west, north, east):
+        """the places within the box, by the object loop"""
+        return [place for place in places
+                if south <= place.latitude <= north and
+                west <= place.longitude <= east]
+
+    return {
+        "near 20 of 25 km": (
+            lambda: storage.places_near(latitude, longitude, 25, 20),
+            lambda: loop_near(25, 20)),
+        "near 100 of 5 km": (
+            lambda: storage.places_near(latitude, longitude, 5, 100),
+            lambda: loop_near(5, 100)),
+        "city viewport": (lambda: storage.places_within(*viewport),
+                          lambda: loop_within(*viewport))}
+
+
+def per_call(function):
+    """returns the best time of function in milliseconds"""
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) * 1e3
+
+
+def main(scales):
+    """prints one row of timings per scale and search"""
+    storage = FileStorage()
+    saved = (FileStorage._FileStorage__objects,
+             FileStorage._FileStorage__buckets,
+             FileStorage._FileStorage__indexes)
+    print("{:>8} {:<18} {:>8} {:>12} {:>12} {:>8}".format(
+        "places", "search", "found", "grid (ms)", "loop (ms)", "speedup"))
+    try:
+        for total in scales:
+            places, cities = populate(storage, total)
+            for name, (indexed, loop) in searches(storage, places,
+                                                  cities).items():
+                fast, slow = per_call(indexed), per_call(loop)
+                print("{:>8} {:<18} {:>8} {:>12.3f} {:>12.3f} {:>7.1f}x".
+                      format(total, name, len(indexed()), fast, slow,
+                             slow / fast))
+    finally:
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__buckets,
+         FileStorage._FileStorage__indexes) = saved
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SCALES)
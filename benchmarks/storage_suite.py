@@ -0,0 +1,279 @@
+#!/usr/bin/python3
+"""
+Benchmarks the storage engines on synthetic data at several scales.
+
+Run from the repository root:
+    python3 -m benchmarks.storage_suite [-s SCALE ...] [-e ENGINE ...]
+                                        [-o REPORT] [-c BASELINE]
+
+For each engine (file, db, sqlite) and scale (number of Places), a fresh
+Python process loads States, Cities, Users, Amenities, Places and Reviews
+into an empty store, then times reload, all(cls), get, count, new+save,
+the State.cities / Place.reviews traversals and search_places by state.
+DBStorage runs on a local SQLite database through HBNB_DB_URL, so no
+MySQL server is needed.
+
+The JSON report holds the mean and best seconds per call of every
+operation, the peak Python allocations of each operation (tracemalloc,
+measured in a separate untimed call) and the peak RSS of the process.
+Pass a previous report with -c to print the ratio of each timing to it.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCALES = [100, 1000, 10000]
+ENGINES = ["file", "db", "sqlite"]
+SAMPLES = 200
+
+
+def environment(engine, directory):
+    """returns the environment selecting engine, with its data in
+    directory"""
+    env = dict(os.environ)
+    for name in ["HBNB_TYPE_STORAGE", "HBNB_DB_URL", "HBNB_SQLITE_PATH",
+                 "HBNB_ENV", "HBNB_FILE_SHARED"]:
+        env.pop(name, None)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    if engine == "db":
+        env["HBNB_TYPE_STORAGE"] = "db"
+        env["HBNB_DB_URL"] = "sqlite:///" + os.path.join(directory, "db.db")
+    elif engine == "sqlite":
+        env["HBNB_TYPE_STORAGE"] = "sqlite"
+        env["HBNB_SQLITE_PATH"] = os.path.join(directory, "hbnb.db")
+    return env
+
+
+def populate(storage, scale):
+    """loads scale Places and their States, Cities, Users, Amenities and
+    Reviews with new() and a single save(), returns the objects by class"""
+    from models.amenity import Amenity
+    from models.city import City
+    from models.place import Place
+    from models.review import Review
+    from models.state import State
+    from models.user import User
+
+    rand = random.Random(scale)
+    objs = {}
+    objs["State"] = [State(name="state {}".format(i))
+                     for i in range(max(1, scale // 100))]
+    objs["City"] = [City(name="city {}".format(i),
+                         state_id=rand.choice(objs["State"]).id)
+                    for i in range(max(1, scale // 10))]
+    objs["User"] = [User(email="user{}@hbnb.io".format(i), password="pwd")
+                    for i in range(max(1, scale // 10))]
+    objs["Amenity"] = [Amenity(name="amenity {}".format(i))
+                       for i in range(min(scale, 50))]
+    objs["Place"] = [Place(name="place {}".format(i),
+                           city_id=rand.choice(objs["City"]).id,
+                           user_id=rand.choice(objs["User"]).id,
+                           number_rooms=rand.randint(1, 8),
+                           price_by_night=rand.randint(20, 500))
+                     for i in range(scale)]
+    objs["Review"] = [Review(text="review {}".format(i),
+                             place_id=rand.choice(objs["Place"]).id,
+                             user_id=rand.choice(objs["User"]).id)
+                      for i in range(scale)]
+    for name in ["State", "City", "User", "Amenity", "Place", "Review"]:
+        for obj in objs[name]:
+            storage.new(obj)
+    storage.save()
+    return objs
+
+
+def operations(storage, objs):
+    """returns the {name: (function, calls)} of the operations to time"""
+    from models.place import Place
+    from models.state import State
+
+    rand = random.Random(0)
+    place_ids = [rand.choice(objs["Place"]).id for i in range(SAMPLES)]
+    state_ids = [rand.choice(objs["State"]).id for i in range(SAMPLES)]
+
+    def reload():
+        """reloads the whole store"""
+        storage.close()
+        storage.reload()
+
+    def get():
+        """gets SAMPLES places by id"""
+        for id in place_ids:
+            storage.get(Place, id)
+
+    def new_save():
+        """creates and saves one State"""
+        storage.new(State(name="new state"))
+        storage.save()
+
+    def state_cities():
+        """lists the cities of SAMPLES states"""
+        for id in state_ids:
+            len(storage.get(State, id).cities)
+
+    def search_places():
+        """searches the places of SAMPLES states"""
+        for id in state_ids:
+            storage.search_places([id])
+
+    def place_reviews():
+        """lists the reviews of SAMPLES places"""
+        for id in place_ids:
+            len(storage.get(Place, id).reviews)
+
+    return {"reload": (reload, 1),
+            "all": (lambda: storage.all(), 1),
+            "all(State)": (lambda: storage.all(State), 1),
+            "all(Place)": (lambda: storage.all(Place), 1),
+            "get": (get, SAMPLES),
+            "count": (lambda: storage.count(), 1),
+            "count(Place)": (lambda: storage.count(Place), 1),
+            "new+save": (new_save, 1),
+            "State.cities": (state_cities, SAMPLES),
+            "Place.reviews": (place_reviews, SAMPLES),
+            "search_places": (search_places, SAMPLES)}
+
+
+def measure(function, calls, budget):
+    """returns the mean and best seconds per call of function, run for
+    about budget seconds (at least 3 times)"""
+    times = []
+    start = time.perf_counter()
+    while len(times) < 3 or time.perf_counter() - start < budget:
+        begin = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - begin) / calls)
+        if len(times) >= 1000:
+            break
+    return {"mean_s": sum(times) / len(times), "best_s": min(times),
+            "runs": len(times)}
+
+
+def child(engine, scale, budget):
+    """runs the benchmark in this process, returns its results"""
+    import models
+
+    storage = models.storage
+    start = time.perf_counter()
+    objs = populate(storage, scale)
+    result = {"engine": engine, "scale": scale,
+              "objects": sum(len(v) for v in objs.values()),
+              "populate_s": time.perf_counter() - start,
+              "operations": {}}
+    storage.close()
+    for name, (function, calls) in operations(storage, objs).items():
+        timing = measure(function, calls, budget)
+        tracemalloc.start()
+        function()
+        timing["peak_alloc_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+        result["operations"][name] = timing
+        storage.close()
+    result["peak_rss_kb"] = resource.getrusage(
+        resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def run(engine, scale, budget):
+    """runs the benchmark of engine at scale in a fresh process on an
+    empty store, returns its results"""
+    directory = tempfile.mkdtemp()
+    try:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.storage_suite", "--child",
+             engine, str(scale), "-b", str(budget)],
+            cwd=directory, env=environment(engine, directory),
+            stdout=subprocess.PIPE, check=True)
+        return json.loads(out.stdout.decode())
+    finally:
+        shutil.rmtree(directory)
+
+
+def commit():
+    """returns the git commit of the tree benchmarked, or None"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def show(report, baseline=None):
+    """prints the timings of report, in microseconds per call, with the
+    ratio to the matching timing of baseline if given"""
+    before = {}
+    for result in (baseline or {}).get("results", []):
+        for name, timing in result["operations"].items():
+            before[result["engine"], result["scale"], name] = timing
+    print("{:>7} {:>7} {:<14} {:>14} {:>10} {:>8}".format(
+        "engine", "scale", "operation", "mean (us)", "alloc KB",
+        "ratio" if baseline else "").rstrip())
+    for result in report["results"]:
+        for name, timing in result["operations"].items():
+            old = before.get((result["engine"], result["scale"], name))
+            ratio = ""
+            if old:
+                ratio = "{:.2f}x".format(timing["mean_s"] / old["mean_s"])
+            line = "{:>7} {:>7} {:<14} {:>14.1f} {:>10} {:>8}".format(
+                result["engine"], result["scale"], name,
+                timing["mean_s"] * 1e6, timing["peak_alloc_kb"], ratio)
+            print(line.rstrip())
+        print("{:>7} {:>7} {:<14} {:>14} {:>10}".format(
+            result["engine"], result["scale"], "peak RSS", "",
+            result["peak_rss_kb"]))
+
+
+def main(argv):
+    """runs the suite and writes its JSON report"""
+    parser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks.storage_suite",
+        description="Benchmarks the storage engines.")
+    parser.add_argument("-s", "--scales", type=int, nargs="+",
+                        default=SCALES, help="numbers of Places")
+    parser.add_argument("-e", "--engines", nargs="+", choices=ENGINES,
+                        default=ENGINES)
+    parser.add_argument("-b", "--budget", type=float, default=0.5,
+                        help="seconds spent timing each operation")
+    parser.add_argument("-o", "--output", default="storage_report.json",
+                        help="path of the JSON report")
+    parser.add_argument("-c", "--compare", metavar="BASELINE",
+                        help="a previous report to compare with")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        engine, scale = args.child
+        json.dump(child(engine, int(scale), args.budget), sys.stdout)
+        return
+    report = {"date": datetime.datetime.utcnow().isoformat(),
+              "commit": commit(),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "budget_s": args.budget,
+              "results": [run(engine, scale, args.budget)
+                          for scale in args.scales
+                          for engine in args.engines]}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    show(report, baseline)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
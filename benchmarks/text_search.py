@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Times full-text searches of reviews through the FileStorage TextIndex
+against a loop over the Review objects testing their text with `in`.
+
+Run from the repository root:
+    python3 -m benchmarks.text_search [scale ...]
+
+Reviews are 30 words drawn from a vocabulary of 5000 words, the frequent
+ones far more often, as in natural text. A rare word is held by a few
+reviews, a common one by most of them. The index ranks all the reviews
+found by BM25 and keeps the best 20; the loop only finds them, unranked.
+"""
+
+import random
+import sys
+import timeit
+from models.engine.file_storage import FileStorage
+from models.review import Review
+
+SCALES = [10000, 100000]
+REPEAT = 5
+WORDS = ["w{}".format(i) for i in range(5000)]
+# the weight of a word is the inverse of its rank, like in natural text
+WEIGHTS = [1 / (rank + 1) for rank in range(len(WORDS))]
+
+
+def populate(storage, total):
+    """fills an empty storage with total reviews, returns them"""
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__buckets = {}
+    FileStorage._FileStorage__indexes = {}
+    rand = random.Random(total)
+    reviews = [Review(place_id="place", text=" ".join(
+        rand.choices(WORDS, WEIGHTS, k=30))) for i in range(total)]
+    for review in reviews:
+        storage.new(review)
+    return reviews
+
+
+def per_call(function):
+    """returns the best time of function in milliseconds"""
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) * 1e3
+
+
+def main(scales):
+    """prints one row of timings per scale and search"""
+    storage = FileStorage()
+    saved = (FileStorage._FileStorage__objects,
+             FileStorage._FileStorage__buckets,
+             FileStorage._FileStorage__indexes)
+    print("{:>8} {:<12} {:>8} {:>12} {:>12} {:>8}".format(
+        "reviews", "search", "found", "index (ms)", "loop (ms)", "speedup"))
+    try:
+        for total in scales:
+            reviews = populate(storage, total)
+            for name, words in [("rare word", ["w4321"]),
+                                ("common word", ["w3"]),
+                                ("two words", ["w3", "w4321"])]:
+                def loop():
+                    """the reviews holding one of the words"""
+                    return [review for review in reviews
+                            if any(word in review.text.lower().split()
+                                   for word in words)]
+
+                found = len(loop())
+                fast = per_call(lambda: storage.search(" ".join(words), 20))
+                slow = per_call(loop)
+                print("{:>8} {:<12} {:>8} {:>12.3f} {:>12.3f} {:>7.1f}x".
+                      format(total, name, found, fast, slow, slow / fast))
+    finally:
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__buckets,
+         FileStorage._FileStorage__indexes) = saved
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SCALES)
@@ -0,0 +1,6 @@
+-- adds the FULLTEXT indexes searched by /api/v1/search to the tables of a
+-- database created before them, run once with
+-- cat migrate_full_text_mysql.sql | mysql -uroot -p hbnb_dev_db
+
+ALTER TABLE places ADD FULLTEXT INDEX places_full_text (description);
+ALTER TABLE reviews ADD FULLTEXT INDEX reviews_full_text (text);
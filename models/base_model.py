@@ -7,8 +7,9 @@ from datetime import datetime
 import models
 from os import getenv
 import sqlalchemy
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import declared_attr
 import uuid
 
 time = "%Y-%m-%dT%H:%M:%S.%f"
@@ -26,6 +27,27 @@ class BaseModel:
         created_at = Column(DateTime, default=datetime.utcnow)
         updated_at = Column(DateTime, default=datetime.utcnow)
 
+        @declared_attr
+        def __table_args__(cls):
+            """indexes (created_at, id), on its own and after each foreign
+            key, for the keyset pagination of storage.page(), the
+            columns of each tuple of cls.indexed_together, and on MySQL
+            the FULLTEXT index of the cls.full_text columns"""
+            table = cls.__tablename__
+            indexes = [Index(table + "_created_at", "created_at", "id")]
+            for name, column in vars(cls).items():
+                if isinstance(column, Column) and column.foreign_keys:
+                    indexes.append(Index("{}_{}".format(table, name), name,
+                                         "created_at", "id"))
+            for names in getattr(cls, "indexed_together", ()):
+                indexes.append(Index("_".join((table,) + tuple(names)),
+                                     *names))
+            if getattr(cls, "full_text", ()):
+                indexes.append(Index(table + "_full_text", *cls.full_text,
+                                     mysql_prefix="FULLTEXT").ddl_if(
+                                         dialect="mysql"))
+            return tuple(indexes)
+
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
         if kwargs:
@@ -47,13 +69,23 @@ class BaseModel:
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    if models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """sets an attribute and lets the storage know it changed.
+            Changes made in place, like appending to amenity_ids, set no
+            attribute: save() the instance, or storage.touch() it, for
+            storage.save() to write them"""
+            super().__setattr__(name, value)
+            models.storage.touch(self)
+
     def __str__(self):
         """String representation of the BaseModel class"""
         return "[{:s}] ({:s}) {}".format(self.__class__.__name__, self.id,
                                          self.__dict__)
 
     def save(self):
-        """updates the attribute 'updated_at' with the current datetime"""
+        """updates the attribute 'updated_at' with the current datetime
+        and writes the instance, changes made in place included"""
         self.updated_at = datetime.utcnow()
         models.storage.new(self)
         models.storage.save()
@@ -68,6 +100,8 @@ class BaseModel:
         new_dict["__class__"] = self.__class__.__name__
         if "_sa_instance_state" in new_dict:
             del new_dict["_sa_instance_state"]
+            for name in self.__mapper__.relationships.keys():
+                new_dict.pop(name, None)
         return new_dict
 
     def delete(self):
@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+"""
+Contains the LRUCache kept by DBStorage in front of get() and all(cls)
+when HBNB_DB_CACHE_SIZE is set
+"""
+
+from collections import OrderedDict
+import threading
+from time import monotonic
+
+
+class LRUCache:
+    """maps keys to values, dropping the least recently used ones beyond
+    a total weight of size and those older than ttl seconds if given. A
+    value weighs what put() is told, the number of rows it holds, so that
+    a whole table counts as its rows rather than as one object
+
+    A value read from the database while a write invalidated it may be
+    the one from before the write, so put() is told the generation the
+    cache had when the read started and drops the value if any key was
+    invalidated since."""
+
+    def __init__(self, size, ttl=None):
+        """Instantiate an empty cache of values weighing at most size"""
+        self.size = size
+        self.ttl = ttl
+        # OrderedDict - key -> (value, time it was put, weight), the most
+        # recently used last
+        self.__values = OrderedDict()
+        # integer - total weight of the values
+        self.__weight = 0
+        # lock - guards the values and counters, shared by every thread
+        self.__lock = threading.Lock()
+        # integer - number of invalidations so far
+        self.generation = 0
+        # integers - lookups finding a value or not, values evicted
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def __len__(self):
+        """returns the number of values cached"""
+        return len(self.__values)
+
+    def get(self, key, default=None):
+        """returns the value of key, default if it is missing or expired"""
+        with self.__lock:
+            item = self.__values.get(key)
+            if item is not None and self.ttl is not None and \
+                    monotonic() - item[1] > self.ttl:
+                self.__pop(key)
+                item = None
+            if item is None:
+                self.__misses += 1
+                return default
+            self.__hits += 1
+            self.__values.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, generation, weight=1):
+        """caches value weighing weight under key unless a key was
+        invalidated since the generation given, or it weighs more than
+        size, evicting the least recently used values beyond size"""
+        with self.__lock:
+            if generation != self.generation:
+                return
+            self.__pop(key)
+            if weight > self.size:
+                return
+            self.__values[key] = (value, monotonic(), weight)
+            self.__weight += weight
+            while self.__weight > self.size:
+                self.__pop(next(iter(self.__values)))
+                self.__evictions += 1
+
+    def discard(self, *keys):
+        """drops the values of keys"""
+        with self.__lock:
+            self.generation += 1
+            for key in keys:
+                self.__pop(key)
+
+    def clear(self):
+        """drops every value"""
+        with self.__lock:
+            self.generation += 1
+            self.__values.clear()
+            self.__weight = 0
+
+    def stats(self):
+        """returns the counters of the cache"""
+        with self.__lock:
+            return {"size": self.__weight, "capacity": self.size,
+                    "ttl": self.ttl, "hits": self.__hits,
+                    "misses": self.__misses, "evictions": self.__evictions}
+
+    def __pop(self, key):
+        """drops the value of key if any, the lock being held"""
+        item = self.__values.pop(key, None)
+        if item is not None:
+            self.__weight -= item[2]
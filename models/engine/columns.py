@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+"""
+Contains the ColumnStore class, kept by FileStorage when NumPy is installed
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# operators of models.engine.predicates a ColumnStore evaluates
+operators = {"eq": "__eq__", "gt": "__gt__", "gte": "__ge__",
+             "lt": "__lt__", "lte": "__le__"}
+
+
+def to_float(value):
+    """returns value as a float, +-inf for integers too large for one, or
+    None if value is not a number"""
+    if not isinstance(value, (int, float)):
+        return None
+    try:
+        return float(value)
+    except OverflowError:
+        return float("inf") if value > 0 else float("-inf")
+
+
+class ColumnStore:
+    """mirrors numeric attributes of the objects of a class, like
+    Place.price_by_night, as one NumPy array per attribute with a row per
+    object, so that filters, sorts and aggregates over them are vectorized.
+    Rows are only meaningful until the store changes"""
+    # boolean - whether NumPy can be imported
+    available = numpy is not None
+
+    def __init__(self, attributes, objs=()):
+        """Instantiate a store of attributes of objs"""
+        # tuple - the attributes mirrored
+        self.attributes = tuple(attributes)
+        # dictionary - id -> the row of each object
+        self.__rows = {}
+        # list - row -> id of the object it holds
+        self.__ids = []
+        # dictionary - id -> the tuple of the values each row holds
+        self.__values = {}
+        # dictionary - attribute -> array of its values, NaN for those
+        # that are not numbers, only the first len(__ids) rows in use
+        self.__columns = {attribute: numpy.empty(max(len(objs), 16))
+                          for attribute in self.attributes}
+        for obj in objs:
+            self.add(obj)
+
+    def __len__(self):
+        """returns the number of objects stored"""
+        return len(self.__ids)
+
+    def add(self, obj):
+        """stores the current values of obj, in a new row if it has none"""
+        values = tuple(getattr(obj, attribute, None)
+                       for attribute in self.attributes)
+        row = self.__rows.get(obj.id)
+        if row is None:
+            row = len(self.__ids)
+            if row == len(self.__columns[self.attributes[0]]):
+                for attribute, column in self.__columns.items():
+                    self.__columns[attribute] = numpy.resize(column,
+                                                             2 * row)
+            self.__rows[obj.id] = row
+            self.__ids.append(obj.id)
+        elif self.__values[obj.id] == values:
+            return
+        self.__values[obj.id] = values
+        for attribute, value in zip(self.attributes, values):
+            value = to_float(value)
+            self.__columns[attribute][row] = (numpy.nan if value is None
+                                              else value)
+
+    def discard(self, obj):
+        """drops the row of obj, moving the last row in its place"""
+        row = self.__rows.pop(obj.id, None)
+        if row is None:
+            return
+        del self.__values[obj.id]
+        last = len(self.__ids) - 1
+        if row != last:
+            for column in self.__columns.values():
+                column[row] = column[last]
+            self.__ids[row] = self.__ids[last]
+            self.__rows[self.__ids[row]] = row
+        self.__ids.pop()
+
+    def stale(self, obj):
+        """tells whether one of obj's attributes changed since it was
+        stored"""
+        values = tuple(getattr(obj, attribute, None)
+                       for attribute in self.attributes)
+        return self.__values.get(obj.id) != values
+
+    def answers(self, condition):
+        """tells whether select() evaluates the (attribute, op, value)
+        condition"""
+        attribute, op, value = condition
+        if attribute not in self.__columns:
+            return False
+        if op == "in":
+            return all(to_float(v) is not None for v in value)
+        return op in operators and to_float(value) is not None
+
+    def rows(self, objs=None):
+        """returns the array of the rows of objs, of all objects if None"""
+        if objs is None:
+            return numpy.arange(len(self.__ids))
+        rows = self.__rows
+        return numpy.fromiter((rows[obj.id] for obj in objs), numpy.intp,
+                              len(objs))
+
+    def select(self, rows, conditions):
+        """returns the array of the rows meeting the conditions answers()
+        accepts, with the list of the other conditions"""
+        rest = []
+        for condition in conditions:
+            if not self.answers(condition):
+                rest.append(condition)
+                continue
+            attribute, op, value = condition
+            values = self.__columns[attribute][rows]
+            if op == "in":
+                rows = rows[numpy.isin(values, [to_float(v) for v in value])]
+            else:
+                rows = rows[getattr(values, operators[op])(to_float(value))]
+        return rows, rest
+
+    def order(self, rows, attribute, descending=False):
+        """returns rows sorted by attribute, those not holding a number
+        last"""
+        values = self.__columns[attribute][rows]
+        return rows[numpy.argsort(-values if descending else values,
+                                  kind="stable")]
+
+    def values(self, rows, attributes):
+        """returns the array of the values of attributes in rows, a line
+        per row and a column per attribute"""
+        return numpy.column_stack([self.__columns[attribute][rows]
+                                   for attribute in attributes])
+
+    def ids(self, rows):
+        """returns the list of the ids of the objects in rows"""
+        ids = self.__ids
+        return [ids[row] for row in rows.tolist()]
+
+    def aggregate(self, rows, attribute):
+        """returns the {"count", "min", "max", "mean"} of the objects in
+        rows, the last three over their attribute values that are numbers,
+        None if there are none"""
+        result = {"count": len(rows), "min": None, "max": None,
+                  "mean": None}
+        values = self.__columns[attribute][rows]
+        rows = rows[~numpy.isnan(values)]
+        if len(rows):
+            values = self.__columns[attribute][rows]
+            index = self.attributes.index(attribute)
+            for key, row in [("min", rows[values.argmin()]),
+                             ("max", rows[values.argmax()])]:
+                result[key] = self.__values[self.__ids[row]][index]
+            result["mean"] = float(values.mean())
+        return result
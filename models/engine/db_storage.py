@@ -3,22 +3,49 @@
 Contains the class DBStorage
 """
 
+from datetime import datetime
 import models
 from models.amenity import Amenity
-from models.base_model import BaseModel, Base
+from models.base_model import BaseModel, Base, time
 from models.city import City
+from models.engine.cache import LRUCache
+from models.engine.geo import nearest, split
+from models.engine.indexes import PrefixIndex, complete
+from models.engine.pool import PoolMonitor, pool_options
+from models.engine.predicates import OPERATORS, ordering, parse
+from models.engine.text import TextIndex, rank, tokens
+from models.engine.tiles import TileCache
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import and_, create_engine, event, func, or_
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from sqlalchemy.orm import scoped_session, selectinload, sessionmaker
+import threading
+from time import monotonic
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+# <class name>: the text columns searched by search(), through their
+# FULLTEXT index on MySQL
+texts = {"Place": ("description",), "Review": ("text",)}
+
+# <class name>: the column completed by autocomplete()
+prefixes = {"Amenity": "name", "City": "name", "State": "name"}
+
+# the relationship loaders all() and get() can load with, "selectin" with
+# one more query per relationship, "joined" in the same query
+loaders = {"joined": joinedload, "selectin": selectinload}
+
+# the classes whose get() and all(cls) go through the LRUCache when
+# HBNB_DB_CACHE_SIZE is set, those read far more often than written
+cached = ("Amenity", "City", "Place", "State")
+
 
 class DBStorage:
     """interaacts with the MySQL database"""
@@ -32,28 +59,80 @@ class DBStorage:
         HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
         HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
         HBNB_ENV = getenv('HBNB_ENV')
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
-                                      format(HBNB_MYSQL_USER,
-                                             HBNB_MYSQL_PWD,
-                                             HBNB_MYSQL_HOST,
-                                             HBNB_MYSQL_DB))
+        HBNB_DB_URL = getenv('HBNB_DB_URL')
+        if HBNB_DB_URL is None:
+            HBNB_DB_URL = 'mysql+mysqldb://{}:{}@{}/{}'.format(
+                HBNB_MYSQL_USER, HBNB_MYSQL_PWD, HBNB_MYSQL_HOST,
+                HBNB_MYSQL_DB)
+        self.__engine = create_engine(HBNB_DB_URL,
+                                      **pool_options(HBNB_DB_URL))
+        self.__pool = PoolMonitor(self.__engine)
+        self.__tiles = TileCache(
+            ttl=float(getenv('HBNB_TILE_CACHE_TTL', 60)))
+        self.__text_ttl = float(getenv('HBNB_TEXT_INDEX_TTL', 60))
+        # dictionary - <class name>: (TextIndex, time it was built) of the
+        # texts searched without MySQL
+        self.__texts = {}
+        self.__texts_lock = threading.Lock()
+        self.__prefix_ttl = float(getenv('HBNB_PREFIX_INDEX_TTL', 60))
+        # dictionary - <class name>: (PrefixIndex, time it was built) of the
+        # values completed by autocomplete()
+        self.__prefixes = {}
+        self.__prefixes_lock = threading.Lock()
+        self.__count_ttl = float(getenv('HBNB_COUNT_CACHE_TTL', 10))
+        # tuple - ({<class name>: number of objects}, time they were read)
+        # of the approximate counts
+        self.__counts = None
+        self.__counts_lock = threading.Lock()
+        size = int(getenv('HBNB_DB_CACHE_SIZE', 0))
+        ttl = getenv('HBNB_DB_CACHE_TTL')
+        # LRUCache - (<class name>, id): columns of the object, and
+        # (<class name>, None): columns of all of them, or None when off
+        self.__cache = None
+        if size > 0:
+            self.__cache = LRUCache(size, ttl and float(ttl))
+        # set - names of the classes whose texts have their FULLTEXT index,
+        # searched through it rather than through a TextIndex
+        self.__full_text = set()
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """query on the current database session"""
+    def all(self, cls=None, load=(), how="selectin"):
+        """query on the current database session, loading with the objects
+        the relationships named in load, like "cities" or "cities.places",
+        by the loader how. All the classes are read in one statement"""
+        if cls is None and not load:
+            return {obj.__class__.__name__ + '.' + obj.id: obj
+                    for obj in self.__all_at_once()}
+        if cls is not None and not load and self.__cache is not None:
+            name = getattr(cls, "__name__", cls)
+            if name in cached:
+                return {name + '.' + obj.id: obj
+                        for obj in self.__all_cached(classes[name])}
         new_dict = {}
         for clss in classes:
             if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
+                objs = self.__session.query(classes[clss]).options(
+                    *self.__loading(classes[clss], load, how)).all()
                 for obj in objs:
                     key = obj.__class__.__name__ + '.' + obj.id
                     new_dict[key] = obj
         return (new_dict)
 
+    def iter(self, cls=None, batch_size=1000):
+        """yields the objects of cls, or of every class, fetching them
+        batch_size rows at a time through a server side cursor"""
+        for clss in classes:
+            if cls is None or cls is classes[clss] or cls == clss:
+                query = self.__session.query(classes[clss])
+                for obj in query.yield_per(batch_size):
+                    yield obj
+
     def new(self, obj):
         """add the object to the current database session"""
         self.__session.add(obj)
+        if self.__cache is not None:
+            self.__wrote(self.__session(), obj)
 
     def save(self):
         """commit all changes of the current database session"""
@@ -63,24 +142,49 @@ class DBStorage:
         """delete from the current database session obj if not None"""
         if obj is not None:
             self.__session.delete(obj)
+            if self.__cache is not None:
+                self.__wrote(self.__session(), obj)
 
     def reload(self):
-        """reloads data from the database"""
+        """reloads data from the database, adding on MySQL the FULLTEXT
+        indexes missing from the tables created without them"""
         Base.metadata.create_all(self.__engine)
+        if self.__engine.dialect.name == "mysql":
+            self.__full_text = self.__create_full_text()
         sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
+        event.listen(sess_factory, "before_flush", self.__flushing)
+        event.listen(sess_factory, "after_commit", self.__committed)
+        event.listen(sess_factory, "after_transaction_end", self.__ended)
         Session = scoped_session(sess_factory)
         self.__session = Session
 
-    def get(self, cls, id):
-        '''Returns one instance found in the db.'''
-        if cls is not None:
-            result = self.__session.query(cls).filter(cls.id == id).first()
-            return result
-        else:
+    def get(self, cls, id, load=(), how="selectin"):
+        '''Returns one instance found in the db, loading with it the
+        relationships named in load by the loader how. An object already
+        in the session is returned from its identity map, without a
+        query, and one whose columns are in the LRUCache is built from
+        them.'''
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None or id is None:
+            return None
+        if not load and self.__cache is not None and \
+                cls.__name__ in cached:
+            return self.__get_cached(cls, id)
+        result = self.__session.get(cls, id,
+                                    options=self.__loading(cls, load, how))
+        if result is not None and result in self.__session.deleted:
             return None
+        return result
 
-    def count(self, cls=None):
-        '''Returns a count of cls if passed if not all items from database.'''
+    def count(self, cls=None, approximate=False):
+        '''Returns a count of cls if passed if not all items from database.
+        approximate counts come from counts(approximate=True).'''
+        if approximate:
+            counts = self.counts(approximate=True)
+            if cls is None:
+                return sum(counts.values())
+            return counts.get(getattr(cls, "__name__", cls), 0)
         if cls is not None:
             '''
             For example checking count of State objects
@@ -88,17 +192,477 @@ class DBStorage:
             '''
             result = self.__session.query(cls).count()
             return (result)
-        else:
-            '''
-            Iterate over values of classes dict, return count and add to
-            total.
-            '''
-            count = 0
-            for clss in classes.values():
-                result = self.__session.query(clss).count()
-                count = count + result
-            return count
+        return sum(self.counts().values())
+
+    def counts(self, approximate=False):
+        """returns the {class name: number of objects} of every class, read
+        in one statement. approximate counts are cached for
+        HBNB_COUNT_CACHE_TTL seconds, and read from the table statistics
+        of MySQL rather than counted"""
+        if not approximate:
+            self.__session.flush()
+            return {name: count for name, count in self.__session.execute(
+                sqlalchemy.union_all(*(
+                    sqlalchemy.select(sqlalchemy.literal(name),
+                                      func.count()).select_from(
+                        classes[name].__table__) for name in classes)))}
+        with self.__counts_lock:
+            if self.__counts is not None and \
+                    monotonic() - self.__counts[1] <= self.__count_ttl:
+                return dict(self.__counts[0])
+            if self.__engine.dialect.name == "mysql":
+                names = {classes[name].__tablename__: name
+                         for name in classes}
+                rows = self.__session.execute(sqlalchemy.text(
+                    "SELECT table_name, table_rows FROM "
+                    "information_schema.tables WHERE table_schema = "
+                    "DATABASE()"))
+                counts = dict.fromkeys(classes, 0)
+                counts.update((names[table], int(number or 0))
+                              for table, number in rows if table in names)
+            else:
+                counts = self.counts()
+            self.__counts = (counts, monotonic())
+            return dict(counts)
+
+    def related(self, cls, attribute, value):
+        """returns the list of the cls objects whose attribute is value"""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None:
+            return []
+        return self.__session.query(cls).filter(
+            getattr(cls, attribute) == value).all()
+
+    def query(self, cls, order_by=None, limit=None, **predicates):
+        """returns the list of the cls objects meeting all predicates (see
+        models.engine.predicates), sorted by order_by and cut to limit if
+        given, by the database"""
+        attribute, descending = ordering(order_by)
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None:
+            return []
+        query = self.__filter(self.__session.query(cls), cls, predicates)
+        if attribute is not None:
+            column = getattr(cls, attribute)
+            query = query.order_by(column.desc() if descending else column)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def aggregate(self, cls, attribute, **predicates):
+        """returns the {"count", "min", "max", "mean"} of the cls objects
+        meeting all predicates, the last three over their attribute values,
+        None if there are none, in a single query"""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None:
+            return {"count": 0, "min": None, "max": None, "mean": None}
+        column = getattr(cls, attribute)
+        query = self.__session.query(func.count(cls.id), func.min(column),
+                                     func.max(column), func.avg(column))
+        count, low, high, mean = self.__filter(query, cls, predicates).one()
+        return {"count": count, "min": low, "max": high,
+                "mean": None if mean is None else float(mean)}
+
+    def search_places(self, states=(), cities=(), amenities=(),
+                      any_amenities=()):
+        """returns the list of the places in the states or cities given, or
+        of all places if neither is, having all the amenities and one of
+        the any_amenities given, found by a single query"""
+        query = self.__session.query(Place)
+        if states or cities:
+            in_states = sqlalchemy.select(City.id).where(
+                City.state_id.in_(list(states)))
+            query = query.filter(or_(Place.city_id.in_(list(cities)),
+                                     Place.city_id.in_(in_states)))
+        for id in set(amenities):
+            query = query.filter(Place.amenities.any(Amenity.id == id))
+        if any_amenities:
+            query = query.filter(Place.amenities.any(
+                Amenity.id.in_(list(any_amenities))))
+        return query.all()
+
+    def places_near(self, latitude, longitude, radius_km, limit=None):
+        """returns the (distance in km, place) of the places within
+        radius_km of (latitude, longitude), nearest first, at most limit of
+        them, found through the index on (latitude, longitude)"""
+        return nearest(self.__places_within, latitude, longitude, radius_km,
+                       limit)
+
+    def places_within(self, south, west, north, east, limit=None):
+        """returns the list of the places within the box (south, west,
+        north, east), crossing the antimeridian if west > east, at most
+        limit of them, in a single query"""
+        return self.__places_within([(south, west, north, east)], limit)
+
+    def place_clusters(self, south, west, north, east, zoom):
+        """returns the {"count", "latitude", "longitude", "min_price"} of
+        the places of each map tile of zoom overlapping the box (see
+        models.engine.tiles). Tiles are cached for HBNB_TILE_CACHE_TTL
+        seconds, kept in step with the places this process commits"""
+        return self.__tiles.clusters(south, west, north, east, zoom,
+                                     self.__entries_within)
+
+    def search(self, text, limit=None, after=None):
+        """returns the (score, obj) of the places and reviews whose text
+        holds one of the tokens of text, ranked by the relevance MySQL
+        gives them through their FULLTEXT index, or by BM25 through a
+        TextIndex on other databases or when an index is missing, at most
+        limit of them, after the (score, class name, id) after if given"""
+        terms = sorted(set(tokens(text)))
+        if not terms:
+            return []
+        if self.__engine.dialect.name != "mysql" or \
+                set(texts) - self.__full_text:
+            return self.__scan_texts(terms, limit, after)
+        try:
+            return self.__match_texts(terms, limit, after)
+        except sqlalchemy.exc.OperationalError:
+            # the index was dropped since reload(), a failed SELECT
+            # leaving the transaction as it was on MySQL
+            self.__full_text = set()
+            return self.__scan_texts(terms, limit, after)
+
+    def autocomplete(self, prefix, limit=None):
+        """returns the (value, class name, id) of the states, cities and
+        amenities whose name starts with prefix, ignoring case and accents,
+        sorted by name, at most limit of them, through the PrefixIndex of
+        each class, built from the database when missing or older than
+        HBNB_PREFIX_INDEX_TTL"""
+        indexes = {}
+        with self.__prefixes_lock:
+            for name, attribute in prefixes.items():
+                cls = classes[name]
+                index, built = self.__prefixes.get(name, (None, 0))
+                if index is None or monotonic() - built > self.__prefix_ttl:
+                    index = PrefixIndex(attribute)
+                    for id, value in self.__session.query(
+                            cls.id, getattr(cls, attribute)):
+                        index.put(id, value)
+                    self.__prefixes[name] = (index, monotonic())
+                indexes[name] = index
+            return complete(indexes, prefix, limit)
+
+    def page(self, cls, limit, after=None, attribute=None, value=None):
+        """returns the list of the first limit cls objects, whose attribute
+        is value if given, sorted by (created_at, id) after the key after"""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None:
+            return []
+        query = self.__session.query(cls)
+        if attribute is not None:
+            query = query.filter(getattr(cls, attribute) == value)
+        if after is not None:
+            created_at = datetime.strptime(after[0], time)
+            query = query.filter(or_(cls.created_at > created_at,
+                                     and_(cls.created_at == created_at,
+                                          cls.id > after[1])))
+        return query.order_by(cls.created_at, cls.id).limit(limit).all()
+
+    def pool_stats(self):
+        """returns the metrics of the connection pool, see
+        models.engine.pool"""
+        return self.__pool.stats()
+
+    def cache_stats(self):
+        """returns the counters of the LRUCache, None when it is off"""
+        if self.__cache is None:
+            return None
+        return self.__cache.stats()
 
     def close(self):
         """call remove() method on the private session attribute"""
         self.__session.remove()
+
+    def __places_within(self, boxes, limit=None):
+        """returns the list of the places within one of the boxes, at most
+        limit of them"""
+        query = self.__session.query(Place).filter(or_(*(
+            and_(Place.latitude.between(south, north),
+                 Place.longitude.between(west, east))
+            for box in boxes for south, west, north, east in split(*box))))
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def __entries_within(self, box):
+        """returns the TileCache entries of the places within box, read
+        from their columns only"""
+        south, west, north, east = box
+        latitude, longitude, price = (getattr(Place, attribute) for attribute
+                                      in self.__tiles.attributes)
+        rows = self.__session.query(latitude, longitude, price).filter(
+            latitude.between(south, north), longitude.between(west, east))
+        return (TileCache.located(*row) for row in rows)
+
+    def __match_texts(self, terms, limit, after):
+        """returns the ranked (score, obj) of the objects whose text holds
+        one of the terms, through the FULLTEXT index of each class"""
+        scored = []
+        for name, attributes in texts.items():
+            cls = classes[name]
+            score = match(*(getattr(cls, attribute)
+                            for attribute in attributes),
+                          against=" ".join(terms)).in_natural_language_mode()
+            query = self.__session.query(cls, score).filter(score > 0)
+            if after is not None and name < after[1]:
+                query = query.filter(score < after[0])
+            elif after is not None and name == after[1]:
+                query = query.filter(or_(score < after[0],
+                                         and_(score == after[0],
+                                              cls.id > after[2])))
+            elif after is not None:
+                query = query.filter(score <= after[0])
+            query = query.order_by(score.desc(), cls.id)
+            if limit is not None:
+                query = query.limit(limit)
+            scored.extend((float(value), name, obj.id, obj)
+                          for obj, value in query)
+        return rank(scored, limit, after)
+
+    def __scan_texts(self, terms, limit, after):
+        """returns the ranked (score, obj) of the objects whose text holds
+        one of the terms, through the TextIndex of each class, built from
+        the database when missing or older than HBNB_TEXT_INDEX_TTL"""
+        scored = []
+        for name, attributes in texts.items():
+            cls = classes[name]
+            with self.__texts_lock:
+                index, built = self.__texts.get(name, (None, 0))
+                if index is None or monotonic() - built > self.__text_ttl:
+                    index = TextIndex(attributes)
+                    for row in self.__session.query(cls.id, *(
+                            getattr(cls, attribute)
+                            for attribute in attributes)):
+                        index.put(row[0], row[1:])
+                    self.__texts[name] = (index, monotonic())
+                scored.extend((score, name, id, (name, id)) for id, score
+                              in index.scores(terms).items())
+        found = rank(scored, limit, after)
+        objs = {}
+        for name in texts:
+            cls = classes[name]
+            ids = [id for score, (other, id) in found if other == name]
+            if ids:
+                objs.update(((name, obj.id), obj) for obj in
+                            self.__session.query(cls).filter(
+                                cls.id.in_(ids)))
+        return [(score, objs[key]) for score, key in found if key in objs]
+
+    def __create_full_text(self):
+        """adds the FULLTEXT index of the texts of each class whose table
+        lacks it, and returns the names of those indexed"""
+        indexed = set()
+        inspector = sqlalchemy.inspect(self.__engine)
+        for name, attributes in texts.items():
+            table = classes[name].__tablename__
+            if any(index["column_names"] == list(attributes) and
+                   index.get("dialect_options", {}).get(
+                       "mysql_prefix") == "FULLTEXT"
+                   for index in inspector.get_indexes(table)):
+                indexed.add(name)
+                continue
+            try:
+                with self.__engine.begin() as conn:
+                    conn.execute(sqlalchemy.text(
+                        "ALTER TABLE {0} ADD FULLTEXT INDEX {0}_full_text "
+                        "({1})".format(table, ", ".join(attributes))))
+                indexed.add(name)
+            except sqlalchemy.exc.DBAPIError:
+                # without the ALTER privilege, search() scans the texts
+                # until migrate_full_text_mysql.sql is run
+                pass
+        return indexed
+
+    def __flushing(self, session, context, instances):
+        """queues in session the moves of the places about to be written in
+        the TileCache, from the values they were loaded with to their
+        current ones, and the reindexing of the texts and names about to be
+        written in the TextIndex and PrefixIndex kept, to be made once its
+        transaction commits, and drops the objects about to be written from
+        the LRUCache"""
+        if self.__cache is not None:
+            for obj in list(session.new) + list(session.dirty) + \
+                    list(session.deleted):
+                self.__wrote(session, obj)
+        pending = session.info.setdefault("hbnb_pending", [])
+        for kept, lock in [(self.__texts, self.__texts_lock),
+                           (self.__prefixes, self.__prefixes_lock)]:
+            for obj in list(session.new) + list(session.dirty) + \
+                    list(session.deleted):
+                pending.append((self.__reindex,
+                                (kept, lock, obj, obj in session.deleted)))
+        for obj in list(session.new) + list(session.dirty) + \
+                list(session.deleted):
+            if not isinstance(obj, Place):
+                continue
+            old = None
+            if obj not in session.new:
+                state = sqlalchemy.inspect(obj)
+                old = TileCache.located(*(
+                    (history.deleted or history.unchanged or [None])[0]
+                    for history in (state.attrs[attribute].history
+                                    for attribute in
+                                    self.__tiles.attributes)))
+            new = None if obj in session.deleted else self.__tiles.entry(obj)
+            pending.append((self.__tiles.update, (old, new)))
+
+    def __all_at_once(self):
+        """returns the objects of every class, read in one UNION ALL of
+        their tables, each padded with NULL to the columns of the others,
+        the objects already in the session being kept as they are"""
+        self.__session.flush()
+        types = {}
+        for cls in classes.values():
+            for column in cls.__table__.columns:
+                types.setdefault(column.name, column.type)
+        names = sorted(types)
+        rows = self.__session.execute(sqlalchemy.union_all(*(
+            sqlalchemy.select(sqlalchemy.literal(name).label("class_"), *(
+                cls.__table__.c[column] if column in cls.__table__.c else
+                sqlalchemy.type_coerce(sqlalchemy.null(),
+                                       types[column]).label(column)
+                for column in names))
+            for name, cls in classes.items())))
+        objs = []
+        for row in rows:
+            cls = classes[row[0]]
+            objs.append(self.__attach(cls, {
+                column.key: getattr(row, column.name)
+                for column in cls.__table__.columns}))
+        return objs
+
+    def __attach(self, cls, values):
+        """returns the object of cls of id values["id"] in the session, or
+        one built from the columns values and added to the session as if
+        it had been loaded, without a query"""
+        mapper = sqlalchemy.inspect(cls)
+        obj = self.__session.identity_map.get(
+            mapper.identity_key_from_primary_key((values["id"],)))
+        if obj is None:
+            obj = mapper.class_manager.new_instance()
+            for key, value in values.items():
+                setattr(obj, key, value)
+            make_transient_to_detached(obj)
+            self.__session.add(obj)
+        return obj
+
+    @staticmethod
+    def __columns(obj):
+        """returns the {column: value} of obj, as kept in the LRUCache"""
+        return {column.key: getattr(obj, column.key)
+                for column in type(obj).__table__.columns}
+
+    def __get_cached(self, cls, id):
+        """get() through the LRUCache: the object in the session, else one
+        built from the columns cached, else the one read, whose columns
+        are cached unless the session wrote it since its transaction began.
+        Only columns are cached, each session getting its own objects"""
+        session = self.__session()
+        key = (cls.__name__, id)
+        obj = session.identity_map.get(
+            sqlalchemy.inspect(cls).identity_key_from_primary_key((id,)))
+        if obj is None:
+            values = self.__cache.get(key)
+            if values is not None:
+                return self.__attach(cls, values)
+            generation = self.__cache.generation
+            obj = session.get(cls, id)
+            if obj is not None and \
+                    key not in session.info.get("hbnb_written", ()):
+                self.__cache.put(key, self.__columns(obj), generation)
+        if obj is not None and obj in session.deleted:
+            return None
+        return obj
+
+    def __all_cached(self, cls):
+        """all(cls) through the LRUCache, like __get_cached(), the session
+        reading the table itself once it added or deleted objects of cls.
+        The table weighs its number of rows, so one larger than the cache
+        is not cached"""
+        session = self.__session()
+        key = (cls.__name__, None)
+        if key in session.info.get("hbnb_written", ()) or \
+                any(isinstance(obj, cls) for obj in
+                    list(session.new) + list(session.deleted)):
+            return session.query(cls).all()
+        rows = self.__cache.get(key)
+        if rows is not None:
+            return [self.__attach(cls, values) for values in rows]
+        generation = self.__cache.generation
+        objs = session.query(cls).all()
+        self.__cache.put(key, [self.__columns(obj) for obj in objs],
+                         generation, max(1, len(objs)))
+        return objs
+
+    def __wrote(self, session, obj):
+        """drops obj and all the objects of its class from the LRUCache,
+        and remembers them in session so that they are dropped again when
+        it commits or rolls back, and not cached from it until then"""
+        keys = ((type(obj).__name__, obj.id), (type(obj).__name__, None))
+        session.info.setdefault("hbnb_written", set()).update(keys)
+        self.__cache.discard(*keys)
+
+    @staticmethod
+    def __reindex(kept, lock, obj, deleted):
+        """adds obj to the index kept for its class, if any, or discards it
+        from there if deleted"""
+        index = kept.get(type(obj).__name__, (None,))[0]
+        if index is not None:
+            with lock:
+                if deleted:
+                    index.discard(obj)
+                else:
+                    index.add(obj)
+
+    def __committed(self, session):
+        """makes the changes queued in session by __flushing, now that its
+        transaction committed"""
+        for function, args in session.info.pop("hbnb_pending", ()):
+            function(*args)
+
+    def __ended(self, session, transaction):
+        """drops the changes queued in session that were not committed, and
+        from the LRUCache the objects session wrote, once its outermost
+        transaction committed, rolled back or was closed"""
+        if transaction.parent is not None:
+            return
+        session.info.pop("hbnb_pending", None)
+        keys = session.info.pop("hbnb_written", ())
+        if keys and self.__cache is not None:
+            self.__cache.discard(*keys)
+
+    @staticmethod
+    def __loading(cls, load, how):
+        """returns the loader options of the relationship paths of load
+        starting with a relationship of cls, each relationship of a path
+        like "cities.places" being loaded by the loader how"""
+        if how not in loaders:
+            raise ValueError("unknown loader: {}".format(how))
+        options = []
+        for path in load:
+            names = path.split(".")
+            if names[0] not in sqlalchemy.inspect(cls).relationships:
+                continue
+            option, current = None, cls
+            for name in names:
+                attribute = getattr(current, name)
+                option = (loaders[how](attribute) if option is None else
+                          getattr(option, how + "load")(attribute))
+                current = attribute.property.mapper.class_
+            options.append(option)
+        return options
+
+    @staticmethod
+    def __filter(query, cls, predicates):
+        """returns query filtered by the predicates on cls"""
+        for attribute, op, value in parse(predicates):
+            column = getattr(cls, attribute)
+            if op == "in":
+                query = query.filter(column.in_(value))
+            else:
+                query = query.filter(OPERATORS[op](column, value))
+        return query
@@ -3,18 +3,72 @@
 Contains the FileStorage class
 """
 
+import atexit
+from contextlib import contextmanager
+import fcntl
 import json
+import mmap
+import os
+import struct
+import threading
+import time
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
+from models.engine.indexes import BitsetIndex, HashIndex, RangeIndex
+from models.engine.indexes import PrefixIndex, SortedIndex, complete
+from models.engine.indexes import hashable
+from models.engine.columns import ColumnStore
+from models.engine.geo import GridIndex, nearest
+from models.engine.predicates import RANGES, aggregate, matches, order
+from models.engine.predicates import ordering, parse
+from models.engine.rwlock import RWLock
+from models.engine.text import TextIndex, rank, tokens
+from models.engine.tiles import TileCache
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+from os import getenv
 
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+# <class name>: attributes holding the id of another object
+foreign_keys = {"Amenity": ("place_id",), "City": ("state_id",),
+                "Place": ("city_id", "user_id"),
+                "Review": ("place_id", "user_id")}
+
+# <class name>: {attribute: "hash" or "sorted"}, the secondary indexes kept
+# on top of the hash indexes of the foreign_keys, see FileStorage.add_index
+secondary_indexes = {"Amenity": {"name": "hash"},
+                     "Place": {"max_guest": "sorted",
+                               "number_rooms": "sorted",
+                               "price_by_night": "sorted"},
+                     "State": {"name": "hash"},
+                     "User": {"email": "hash"}}
+
+# <class name>: attributes holding the id of another object, which is
+# mapped to the bitset of the objects of the class pointing at it
+bitsets = {"Amenity": ("place_id",)}
+
+# <class name>: numeric attributes mirrored in a ColumnStore when NumPy is
+# installed
+columns = {"Place": ("price_by_night", "max_guest", "number_rooms",
+                     "number_bathrooms", "latitude", "longitude")}
+
+# <class name>: the (latitude, longitude) attributes of the GridIndex kept
+# on the objects of the class
+locations = {"Place": ("latitude", "longitude")}
+
+# <class name>: the text attributes of the TextIndex kept on the objects of
+# the class, searched by search()
+texts = {"Place": ("description",), "Review": ("text",)}
+
+# <class name>: the attribute of the PrefixIndex kept on the objects of the
+# class, completed by autocomplete()
+prefixes = {"Amenity": "name", "City": "name", "State": "name"}
+
 
 class FileStorage:
     """serializes instances to a JSON file & deserializes back to instances"""
@@ -23,71 +77,916 @@ class FileStorage:
     __file_path = "file.json"
     # dictionary - empty but will store all objects by <class name>.id
     __objects = {}
+    # boolean - __objects was returned by all() since it last changed, so
+    # it is copied before the next change rather than changed in place
+    __objects_shared = False
+    # dictionary - the same objects bucketed as {<class name>: {id: obj}}
+    __buckets = {}
+    # dictionary - {<class name>: {(kind, attribute): HashIndex, RangeIndex
+    # or BitsetIndex}} of the indexes declared on the stored objects and of
+    # the bitsets, under ("columns", None) their ColumnStore if any, under
+    # ("grid", None) and ("tiles", None) their GridIndex and TileCache if
+    # any, under ("text", None) their TextIndex if any, under ("prefix",
+    # None) their PrefixIndex if any, and under None the SortedIndex of all
+    # of them
+    __indexes = {}
+    # integer - a ColumnStore scans all its rows rather than follow an index
+    # finding more than 1 / __scan_ratio of them, as each object found costs
+    # about as much as that many rows scanned
+    __scan_ratio = 64
+    # dictionary - {<class name>: {attribute: kind}} of the indexes to keep,
+    # a hash index for each foreign key and the secondary_indexes
+    __declared = {name: dict([(attribute, "hash") for attribute in
+                              foreign_keys.get(name, ())] +
+                             list(secondary_indexes.get(name, {}).items()))
+                  for name in classes}
+    # dictionary - <class name>.id -> obj (or None once deleted) added,
+    # changed or deleted since the last save
+    __dirty = {}
+    # dictionary - <class name>.id -> (obj, its encoded '"key": {...}' JSON
+    # member) as of the last save, reused while the obj stays clean
+    __fragments = {}
+    # boolean - append changes to __file_path.log instead of rewriting
+    # the whole JSON file on every save
+    __journal = getenv("HBNB_FILE_JOURNAL") == "1"
+    # integer - log size in bytes that triggers a background compaction
+    __journal_limit = int(getenv("HBNB_FILE_JOURNAL_LIMIT", 1024 * 1024))
+    # thread - the running background compaction, if any
+    __compactor = None
+    # lock - held while reading or replacing the JSON file and journals,
+    # so that __signature always matches what this process last saw
+    __file_lock = threading.Lock()
+    # float - seconds a background flusher waits to gather concurrent saves
+    # into one write, 0 writes on the calling thread instead
+    __flush_window = float(getenv("HBNB_FILE_FLUSH_WINDOW", 0))
+    # thread - the background flusher, started by the first save
+    __flusher = None
+    # condition - guards the flush counters below
+    __flush_cond = threading.Condition()
+    # integers - number of saves requested and of saves made durable
+    __flush_requested = 0
+    __flush_done = 0
+    # dictionary - {"error": exception or None} of the saves requested
+    # since the flusher last took them, the error of their flush being set
+    # for their own callers only
+    __flush_batch = {"error": None}
+    # tuple - (ticket, batch) of the last save requested, waited by sync()
+    __flush_last = (0, __flush_batch)
+    # tuple - (mtime, size, inode) of the JSON file and the journals as
+    # this process last read or wrote them
+    __signature = None
+    # rwlock - shared by all, get and count, exclusive to the methods that
+    # change __objects
+    __lock = RWLock()
+    # lock - guards __dirty, taken on its own by touch()
+    __dirty_lock = threading.Lock()
+    # lock - serializes flushes so each builds on the one before it
+    __save_lock = threading.Lock()
+    # boolean - coordinate with other processes using the same file through
+    # an advisory lock and the generation number in __file_path.lock
+    __shared = getenv("HBNB_FILE_SHARED") == "1"
+    # lock - serializes this process's threads on the advisory lock
+    __shared_mutex = threading.Lock()
+    # tuple - (pid, path, fd, mmap) of the lock file opened by this process
+    __shared_file = None
+    # integer - the generation of the data this process last synced with
+    __generation = None
+    # tuple - (inode, offset) of the live journal read so far, or None
+    __log_position = None
 
-    def all(self, cls=None):
-        """returns the dictionary __objects"""
+    def all(self, cls=None, load=(), how="selectin"):
+        """returns the dictionary __objects. load and how, the relationships
+        DBStorage loads with the objects, are ignored, relationships being
+        read through the hash indexes of related(). The dictionary is a
+        snapshot: it never changes once returned, so callers can iterate it
+        while other threads save, and it does not see the objects new() or
+        delete() add or remove afterwards, which go to a copy of it made by
+        the first of them. all(cls) and iter() build their own list instead
+        of costing that copy"""
+        self.__sync_shared()
         if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
-        return self.__objects
+            name = self.__class_name(cls)
+            with self.__lock.read():
+                bucket = self.__buckets.get(name, {})
+                return {name + "." + id: obj for id, obj in bucket.items()}
+        with self.__lock.read():
+            FileStorage.__objects_shared = True
+            return self.__objects
+
+    def iter(self, cls=None, batch_size=1000):
+        """yields the objects of cls, or all objects, one at a time without
+        building a dictionary. The objects are already in memory, so
+        batch_size is only accepted for parity with the other engines"""
+        self.__sync_shared()
+        with self.__lock.read():
+            if cls is None:
+                objs = list(self.__objects.values())
+            else:
+                objs = list(self.__buckets.get(self.__class_name(cls),
+                                               {}).values())
+        return iter(objs)
 
     def new(self, obj):
         """sets in __objects the obj with key <obj class name>.id"""
         if obj is not None:
-            key = obj.__class__.__name__ + "." + obj.id
-            self.__objects[key] = obj
+            with self.__lock.write():
+                key = self.__add(obj)
+                with self.__dirty_lock:
+                    self.__dirty[key] = obj
 
-    def save(self):
+    def touch(self, obj):
+        """marks obj as changed if it is one of the stored objects, and
+        reindexes it if one of its indexed attributes changed"""
+        name = obj.__class__.__name__
+        bucket = self.__buckets.get(name)
+        if bucket and bucket.get(obj.__dict__.get("id")) is obj:
+            with self.__dirty_lock:
+                self.__dirty[name + "." + obj.id] = obj
+            indexes = self.__indexes.get(name, {}).values()
+            if any(index.stale(obj) for index in indexes):
+                with self.__lock.write():
+                    if self.__buckets.get(name, {}).get(obj.id) is obj:
+                        self.__index(self.__indexes, obj)
+
+    def save(self, wait=True):
         """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+        if self.__flush_window <= 0:
+            self.__flush()
+            return
+        cond = self.__flush_cond
+        with cond:
+            FileStorage.__flush_requested += 1
+            ticket = FileStorage.__flush_requested
+            batch = FileStorage.__flush_batch
+            FileStorage.__flush_last = (ticket, batch)
+            if FileStorage.__flusher is None:
+                FileStorage.__flusher = threading.Thread(
+                    target=self.__flush_loop, daemon=True)
+                FileStorage.__flusher.start()
+                atexit.register(self.sync)
+            cond.notify_all()
+        if wait:
+            self.__wait_flush(ticket, batch)
+
+    def sync(self):
+        """waits until every save requested so far is on disk"""
+        if self.__flusher is not None:
+            with self.__flush_cond:
+                ticket, batch = FileStorage.__flush_last
+            self.__wait_flush(ticket, batch)
 
     def reload(self):
         """deserializes the JSON file to __objects"""
-        try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
-        except:
-            pass
+        with self.__locked(exclusive=False):
+            self.__load()
 
     def delete(self, obj=None):
         """delete obj from __objects if it’s inside"""
         if obj is not None:
             key = obj.__class__.__name__ + '.' + obj.id
-            if key in self.__objects:
-                del self.__objects[key]
-
-    def get(self, cls, id):
-        '''Gets one item from filestorage or none if unable to locate.'''
-        if cls in classes.values():
-            cls_dict = self.all(cls).items()
-            for key, value in cls_dict:
-                if id in key:
-                    return value
-        else:
+            with self.__lock.write():
+                if key in self.__objects:
+                    self.__remove(key)
+                    with self.__dirty_lock:
+                        self.__dirty[key] = None
+
+    def get(self, cls, id, load=(), how="selectin"):
+        '''Gets one item from filestorage or none if unable to locate.
+        load and how are ignored, as by all().'''
+        if cls not in classes.values() and cls not in classes:
             return None
+        self.__sync_shared()
+        with self.__lock.read():
+            return self.__buckets.get(self.__class_name(cls), {}).get(id)
 
-    def count(self, cls=None):
+    def count(self, cls=None, approximate=False):
         '''
         Returns the count of object instances for the class supplied else will
-        return the count of all object instances in filestorage.
+        return the count of all object instances in filestorage. Counts are
+        always exact, approximate is ignored.
         '''
-        obj_instance_dict = {}
-        if cls is not None:
-            obj_instance_dict = self.all(cls)
-            return len(obj_instance_dict)
+        self.__sync_shared()
+        with self.__lock.read():
+            if cls is not None:
+                return len(self.__buckets.get(self.__class_name(cls), {}))
+            return len(self.__objects)
+
+    def counts(self, approximate=False):
+        """returns the {class name: number of objects} of every class,
+        always exact, approximate is ignored"""
+        self.__sync_shared()
+        with self.__lock.read():
+            return {name: len(self.__buckets.get(name, {}))
+                    for name in classes}
+
+    def related(self, cls, attribute, value):
+        """returns the list of the cls objects whose attribute is value"""
+        self.__sync_shared()
+        name = self.__class_name(cls)
+        with self.__lock.read():
+            if self.__declared.get(name, {}).get(attribute) == "hash":
+                index = self.__indexes.get(name, {}).get(("hash", attribute))
+                return index.lookup(value) if index else []
+            return [obj for obj in self.__buckets.get(name, {}).values()
+                    if getattr(obj, attribute, None) == value]
 
-        obj_instance_dict = self.all()
-        return len(obj_instance_dict)
+    def page(self, cls, limit, after=None, attribute=None, value=None):
+        """returns the list of the first limit cls objects, whose attribute
+        is value if given, sorted by (created_at, id) after the key after"""
+        self.__sync_shared()
+        name = self.__class_name(cls)
+        with self.__lock.read():
+            indexes = self.__indexes.get(name, {})
+            if attribute is None:
+                index = indexes.get(None)
+                return index.page(limit, after) if index else []
+            if self.__declared.get(name, {}).get(attribute) == "hash":
+                index = indexes.get(("hash", attribute))
+                return index.page(value, limit, after) if index else []
+            objs = [obj for obj in self.__buckets.get(name, {}).values()
+                    if getattr(obj, attribute, None) == value]
+        return SortedIndex(objs).page(limit, after)
+
+    def query(self, cls, order_by=None, limit=None, **predicates):
+        """returns the list of the cls objects meeting all predicates (see
+        models.engine.predicates), sorted by order_by and cut to limit if
+        given. The index narrowing them down the most finds the candidates,
+        which are then checked against the rest, vectorized over the
+        columns of the class if it has a ColumnStore"""
+        conditions = parse(predicates)
+        ordering(order_by)
+        self.__sync_shared()
+        name = self.__class_name(cls)
+        with self.__lock.read():
+            return self.__find(name, conditions, order_by, limit)
+
+    def aggregate(self, cls, attribute, **predicates):
+        """returns the {"count", "min", "max", "mean"} of the cls objects
+        meeting all predicates, the last three over their attribute values
+        that are numbers, None if there are none"""
+        conditions = parse(predicates)
+        self.__sync_shared()
+        name = self.__class_name(cls)
+        with self.__lock.read():
+            objs, rows, rest = self.__candidates(name, conditions,
+                                                 attribute)
+            if rows is not None:
+                store = self.__indexes[name]["columns", None]
+                if rest:
+                    objs = [obj for obj in self.__objects_of(
+                        name, store.ids(rows)) if matches(obj, rest)]
+                    rows = store.rows(objs)
+                return store.aggregate(rows, attribute)
+        return aggregate([obj for obj in objs if matches(obj, rest)],
+                         attribute)
+
+    def search_places(self, states=(), cities=(), amenities=(),
+                      any_amenities=()):
+        """returns the list of the places in the states or cities given, or
+        of all places if neither is, having all the amenities and one of
+        the any_amenities given. The cities of the states and the places of
+        the cities come from the foreign key indexes, and the amenities of
+        the places from the bitsets of the Amenity.place_id BitsetIndex"""
+        self.__sync_shared()
+        with self.__lock.read():
+            conditions = []
+            if states or cities:
+                city_ids = set(cities)
+                if states:
+                    city_ids.update(city.id for city in self.__find(
+                        "City", [("state_id", "in", list(states))]))
+                conditions.append(("city_id", "in", list(city_ids)))
+            if not amenities and not any_amenities:
+                return self.__find("Place", conditions)
+            index = self.__indexes.get("Amenity", {}).get(("bits",
+                                                           "place_id"))
+            if index is None:
+                return []
+            every, found = index.mask(amenities)
+            some = index.mask(any_amenities)[0] if any_amenities else None
+            if found < len(set(amenities)) or some == 0:
+                return []
+            if not conditions:
+                conditions.append(("id", "in", index.find(every, some)))
+            return [place for place in self.__find("Place", conditions)
+                    if index.matches(place.id, every, some)]
+
+    def places_near(self, latitude, longitude, radius_km, limit=None):
+        """returns the (distance in km, place) of the places within
+        radius_km of (latitude, longitude), nearest first, at most limit of
+        them, found through the GridIndex of the places"""
+        self.__sync_shared()
+        with self.__lock.read():
+            index = self.__indexes.get("Place", {}).get(("grid", None))
+            if index is None:
+                return []
+            return nearest(index.within, latitude, longitude, radius_km,
+                           limit)
+
+    def places_within(self, south, west, north, east, limit=None):
+        """returns the list of the places within the box (south, west,
+        north, east), crossing the antimeridian if west > east, at most
+        limit of them, found through the GridIndex of the places"""
+        self.__sync_shared()
+        with self.__lock.read():
+            index = self.__indexes.get("Place", {}).get(("grid", None))
+            if index is None:
+                return []
+            return index.within([(south, west, north, east)], limit)
+
+    def place_clusters(self, south, west, north, east, zoom):
+        """returns the {"count", "latitude", "longitude", "min_price"} of
+        the places of each map tile of zoom overlapping the box (see
+        models.engine.tiles), from the TileCache of the places, the tiles
+        not cached being filled through their ColumnStore if any, else
+        through their GridIndex"""
+        self.__sync_shared()
+        with self.__lock.read():
+            indexes = self.__indexes.get("Place", {})
+            if ("tiles", None) not in indexes:
+                return []
+            grid, tiles = indexes["grid", None], indexes["tiles", None]
+            store = indexes.get(("columns", None))
+            if store is not None and \
+                    set(tiles.attributes) <= set(store.attributes):
+                latitude, longitude = tiles.attributes[:2]
+
+                def find(box):
+                    """the rows of the places within box, vectorized"""
+                    south, west, north, east = box
+                    rows = store.select(store.rows(), [
+                        (latitude, "gte", south), (latitude, "lte", north),
+                        (longitude, "gte", west), (longitude, "lte", east)])
+                    return store.values(rows[0], tiles.attributes)
+            else:
+                def find(box):
+                    """the entries of the places within box"""
+                    return map(tiles.entry, grid.within([box]))
+            return tiles.clusters(south, west, north, east, zoom, find)
+
+    def search(self, text, limit=None, after=None):
+        """returns the (score, obj) of the places and reviews whose text
+        holds one of the tokens of text, ranked by BM25 (see
+        models.engine.text), at most limit of them, after the (score,
+        class name, id) after if given, through their TextIndex"""
+        terms = tokens(text)
+        self.__sync_shared()
+        with self.__lock.read():
+            scored = []
+            for name in texts:
+                index = self.__indexes.get(name, {}).get(("text", None))
+                if index is None:
+                    continue
+                bucket = self.__buckets.get(name, {})
+                scored.extend((score, name, id, bucket[id]) for id, score
+                              in index.scores(terms).items())
+            return rank(scored, limit, after)
+
+    def autocomplete(self, prefix, limit=None):
+        """returns the (value, class name, id) of the states, cities and
+        amenities whose name starts with prefix, ignoring case and accents,
+        sorted by name, at most limit of them, through their PrefixIndex"""
+        self.__sync_shared()
+        with self.__lock.read():
+            return complete({name: self.__indexes[name]["prefix", None]
+                             for name in prefixes if name in self.__indexes},
+                            prefix, limit)
+
+    def add_index(self, cls, attribute, kind="hash"):
+        """declares a "hash" (equality) or "sorted" (equality and range)
+        index on attribute of the cls objects, used by query()"""
+        if kind not in ("hash", "sorted"):
+            raise ValueError("unknown index kind: {}".format(kind))
+        name = self.__class_name(cls)
+        with self.__lock.write():
+            declared = dict(self.__declared)
+            declared[name] = dict(declared.get(name, {}))
+            declared[name][attribute] = kind
+            FileStorage.__declared = declared
+            objs = list(self.__buckets.get(name, {}).values())
+            self.__indexes[name] = self.__new_indexes(name, objs)
+
+    def pool_stats(self):
+        """returns None, FileStorage has no connection pool"""
+        return None
+
+    def cache_stats(self):
+        """returns None, the objects already being in memory"""
+        return None
 
     def close(self):
-        """call reload() method for deserializing the JSON file to objects"""
-        self.reload()
+        """reloads the JSON file if another process changed it since this
+        one last read or wrote it"""
+        if self.__shared:
+            self.__sync_shared()
+            return
+        with self.__file_lock:
+            changed = self.__stat() != self.__signature
+        if changed:
+            self.reload()
+
+    def compact(self):
+        """folds the journal into a fresh JSON file, then drops the log"""
+        compactor = FileStorage.__compactor
+        if compactor is not None:
+            compactor.join()
+        self.__merge()
+        sealed, live = self.__logs()
+        with self.__locked(exclusive=True):
+            rotate = os.path.exists(live)
+            if rotate:
+                os.replace(live, sealed)
+                FileStorage.__log_position = None
+        if rotate:
+            self.__merge()
+
+    def __add(self, obj):
+        """indexes obj without marking it as changed, returns its key"""
+        name = obj.__class__.__name__
+        key = name + "." + obj.id
+        self.__unshare()
+        self.__objects[key] = obj
+        old = self.__buckets.setdefault(name, {}).get(obj.id)
+        if old is not None and old is not obj:
+            self.__unindex(self.__indexes, old)
+        self.__buckets[name][obj.id] = obj
+        self.__index(self.__indexes, obj)
+        return key
+
+    def __remove(self, key):
+        """drops the object stored under key from every index"""
+        self.__unshare()
+        obj = self.__objects.pop(key)
+        self.__buckets.get(obj.__class__.__name__, {}).pop(obj.id, None)
+        self.__unindex(self.__indexes, obj)
+
+    def __unshare(self):
+        """copies __objects before it changes if all() returned it, for
+        callers holding __lock exclusively"""
+        if FileStorage.__objects_shared:
+            FileStorage.__objects = dict(FileStorage.__objects)
+            FileStorage.__objects_shared = False
+
+    def __find(self, name, conditions, order_by=None, limit=None):
+        """returns the list of the objects of the class named name meeting
+        all conditions, sorted by order_by and cut to limit if given, for
+        callers holding __lock"""
+        attribute, descending = ordering(order_by)
+        objs, rows, rest = self.__candidates(name, conditions, attribute)
+        if rows is not None:
+            store = self.__indexes[name]["columns", None]
+            if attribute in store.attributes:
+                rows = store.order(rows, attribute, descending)
+                attribute = None
+            if limit is not None and not rest and attribute is None:
+                rows = rows[:limit]
+            objs = self.__objects_of(name, store.ids(rows))
+        if rest:
+            objs = [obj for obj in objs if matches(obj, rest)]
+        if attribute is not None:
+            objs = order(objs, attribute, descending)
+        return objs if limit is None else objs[:limit]
+
+    def __candidates(self, name, conditions, attribute=None):
+        """returns (objs, rows, rest), the objects of the class named name
+        meeting all conditions but the rest: the list objs found through
+        the indexes, or, when the ColumnStore of the class evaluates some
+        conditions or holds attribute, the array of their rows in it"""
+        bucket = self.__buckets.get(name, {})
+        indexes = self.__indexes.get(name, {})
+        store = indexes.get(("columns", None))
+        if store is None or not (attribute in store.attributes or
+                                 any(store.answers(c) for c in conditions)):
+            objs, used = self.__plan(indexes, conditions, bucket)
+            if objs is None:
+                objs = list(bucket.values())
+            return objs, None, [c for i, c in enumerate(conditions)
+                                if i not in used]
+        objs, used = self.__plan(indexes, conditions, bucket,
+                                 len(store) // self.__scan_ratio)
+        rows, rest = store.select(store.rows(objs), [
+            c for i, c in enumerate(conditions) if i not in used])
+        return None, rows, rest
+
+    def __objects_of(self, name, ids):
+        """returns the list of the objects of the class named name with the
+        given ids, all stored"""
+        bucket = self.__buckets[name]
+        return [bucket[id] for id in ids]
+
+    @staticmethod
+    def __new_indexes(name, objs=()):
+        """returns the indexes of the class named name filled with objs"""
+        indexes = {None: SortedIndex(objs)}
+        if name in columns and ColumnStore.available:
+            indexes["columns", None] = ColumnStore(columns[name], objs)
+        if name in texts:
+            index = indexes["text", None] = TextIndex(texts[name])
+            for obj in objs:
+                index.add(obj)
+        if name in prefixes:
+            index = indexes["prefix", None] = PrefixIndex(prefixes[name])
+            for obj in objs:
+                index.add(obj)
+        if name in locations:
+            index = indexes["grid", None] = GridIndex(*locations[name])
+            tiles = indexes["tiles", None] = TileCache(
+                latitude=locations[name][0], longitude=locations[name][1])
+            for obj in objs:
+                index.add(obj)
+                tiles.add(obj)
+        for attribute in bitsets.get(name, ()):
+            index = indexes["bits", attribute] = BitsetIndex(attribute)
+            for obj in objs:
+                index.add(obj)
+        for attribute, kind in FileStorage.__declared.get(name, {}).items():
+            if kind == "sorted":
+                indexes[kind, attribute] = RangeIndex(attribute, objs)
+                continue
+            index = indexes[kind, attribute] = HashIndex(attribute)
+            for obj in objs:
+                index.add(obj)
+        return indexes
+
+    @staticmethod
+    def __plan(indexes, conditions, bucket=None, most=None):
+        """returns the objects found by the index narrowing conditions down
+        the most, with the positions of the conditions they all meet, or
+        (None, ()) if no index applies or, most being given, if it finds
+        more than most objects. Conditions on the id are answered from
+        bucket, the {id: obj} of the class, if given"""
+        best, count, used = None, None, ()
+        bounds = {}
+        for i, (attribute, op, value) in enumerate(conditions):
+            if (attribute == "id" and bucket is not None and
+                    op in ("eq", "in")):
+                ids = [value] if op == "eq" else value
+                if all(hashable(id) for id in ids):
+                    ids = set(ids)
+                    if count is None or len(ids) < count:
+                        best = (FileStorage.__by_id, bucket, ids)
+                        count, used = len(ids), {i}
+            for kind in ("hash", "sorted"):
+                index = indexes.get((kind, attribute))
+                n = index.count(op, value) if index else None
+                if n is not None and (count is None or n < count):
+                    best, count, used = (index.find, op, value), n, {i}
+            if op in RANGES and ("sorted", attribute) in indexes:
+                lower, inclusive = RANGES[op]
+                bounds.setdefault(attribute, {})[lower] = (value, inclusive,
+                                                           i)
+        for attribute, sides in bounds.items():
+            if len(sides) < 2:
+                continue
+            low, high = sides[True], sides[False]
+            index = indexes["sorted", attribute]
+            n = index.range_count(low[0], low[1], high[0], high[1])
+            if n is not None and (count is None or n < count):
+                best, count = (index.range, low[0], low[1], high[0],
+                               high[1]), n
+                used = {low[2], high[2]}
+        if best is None or (most is not None and count > most):
+            return None, ()
+        return best[0](*best[1:]), used
+
+    @staticmethod
+    def __by_id(bucket, ids):
+        """returns the list of the objects of bucket whose id is in ids"""
+        return [bucket[id] for id in ids if id in bucket]
+
+    @staticmethod
+    def __index(indexes, obj):
+        """adds obj to the indexes of its class in indexes"""
+        name = obj.__class__.__name__
+        if name not in indexes:
+            indexes[name] = FileStorage.__new_indexes(name)
+        for index in indexes[name].values():
+            index.add(obj)
+
+    @staticmethod
+    def __unindex(indexes, obj):
+        """removes obj from the indexes of its class"""
+        for index in indexes.get(obj.__class__.__name__, {}).values():
+            index.discard(obj)
+
+    def __logs(self):
+        """returns the paths of the sealed and the live journal"""
+        return self.__file_path + ".log.1", self.__file_path + ".log"
+
+    def __load(self, keep_dirty=False):
+        """reads the JSON file and journals into __objects"""
+        sealed, live = self.__logs()
+        loaded = {}
+        with self.__file_lock:
+            signature = self.__stat()
+            try:
+                with open(self.__file_path, 'r') as f:
+                    jo = json.load(f)
+                for key in jo:
+                    loaded[key] = classes[jo[key]["__class__"]](**jo[key])
+            except:
+                pass
+            self.__replay(sealed, loaded)
+            position = self.__replay(live, loaded)
+            if position is not None and position[2]:
+                signature = self.__stat()
+        self.__apply(loaded, signature, keep_dirty, complete=self.__shared)
+        if position is not None:
+            position = position[:2]
+        FileStorage.__log_position = position
+        if self.__shared:
+            FileStorage.__generation = self.__disk_generation()
+
+    def __apply(self, loaded, signature, keep_dirty, complete=False):
+        """swaps in a copy of __objects updated with loaded, a map of keys
+        to objects (None once deleted), or made of loaded alone when it is
+        complete. Changes not saved yet are dropped for the loaded keys,
+        or win over them with keep_dirty"""
+        with self.__lock.write():
+            objects = {} if complete else dict(self.__objects)
+            with self.__dirty_lock:
+                if keep_dirty:
+                    for key, obj in self.__dirty.items():
+                        loaded[key] = obj
+                else:
+                    for key in loaded:
+                        self.__dirty.pop(key, None)
+            for key, obj in loaded.items():
+                if obj is None:
+                    objects.pop(key, None)
+                else:
+                    objects[key] = obj
+            buckets = {}
+            for obj in objects.values():
+                buckets.setdefault(obj.__class__.__name__, {})[obj.id] = obj
+            indexes = {name: self.__new_indexes(name, list(bucket.values()))
+                       for name, bucket in buckets.items()}
+            FileStorage.__objects, FileStorage.__buckets = objects, buckets
+            FileStorage.__objects_shared = False
+            FileStorage.__indexes = indexes
+            FileStorage.__signature = signature
+
+    def __sync_shared(self):
+        """catches up with other processes if the generation moved"""
+        if (self.__shared and
+                self.__disk_generation() != FileStorage.__generation):
+            with self.__locked(exclusive=False):
+                self.__catch_up()
+
+    def __catch_up(self):
+        """brings __objects up to the generation on disk, keeping the
+        changes not saved yet. Replays only the new journal records when
+        the live journal is still the one read last, else reloads"""
+        generation = self.__disk_generation()
+        if generation == FileStorage.__generation:
+            return
+        live = self.__logs()[1]
+        position = FileStorage.__log_position
+        try:
+            inode = os.stat(live).st_ino
+        except OSError:
+            inode = None
+        tail = None
+        if (self.__journal and position is not None and
+                position[0] == inode):
+            loaded = {}
+            with self.__file_lock:
+                tail = self.__replay(live, loaded, position[1])
+                signature = self.__stat()
+        if tail is not None and tail[0] == inode:
+            self.__apply(loaded, signature, keep_dirty=True)
+            FileStorage.__log_position = tail[:2]
+        else:
+            self.__load(keep_dirty=True)
+        FileStorage.__generation = generation
+
+    @contextmanager
+    def __locked(self, exclusive):
+        """holds the advisory lock shared by all the processes using the
+        file, exclusive to write; does nothing unless __shared is set"""
+        if not self.__shared:
+            yield
+            return
+        with self.__shared_mutex:
+            fd = self.__lock_file()[2]
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def __lock_file(self):
+        """returns the (pid, path, fd, mmap) of the lock file, opening it
+        again in a forked child or when __file_path changed"""
+        path = self.__file_path + ".lock"
+        shared = FileStorage.__shared_file
+        if shared is None or shared[:2] != (os.getpid(), path):
+            if shared is not None and shared[0] == os.getpid():
+                shared[3].close()
+                os.close(shared[2])
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            if os.fstat(fd).st_size < 8:
+                os.ftruncate(fd, 8)
+            shared = (os.getpid(), path, fd, mmap.mmap(fd, 8))
+            FileStorage.__shared_file = shared
+        return shared
+
+    def __disk_generation(self):
+        """returns the generation number stored in the lock file"""
+        return struct.unpack(">Q", self.__lock_file()[3][:8])[0]
+
+    def __flush(self):
+        """writes the changes out, to the journal or to the JSON file"""
+        with self.__save_lock, self.__locked(exclusive=True):
+            if self.__shared:
+                self.__catch_up()
+            with self.__dirty_lock:
+                dirty = FileStorage.__dirty
+                FileStorage.__dirty = {}
+            try:
+                if self.__journal:
+                    self.__append(dirty)
+                else:
+                    self.__snapshot(dirty)
+            except BaseException:
+                with self.__dirty_lock:
+                    dirty.update(FileStorage.__dirty)
+                    FileStorage.__dirty = dirty
+                raise
+            if self.__shared and (dirty or not self.__journal):
+                generation = self.__disk_generation() + 1
+                struct.pack_into(">Q", self.__lock_file()[3], 0, generation)
+                FileStorage.__generation = generation
+
+    def __flush_loop(self):
+        """flushes, at most once per window, all the saves requested"""
+        cond = self.__flush_cond
+        while True:
+            with cond:
+                cond.wait_for(lambda: (FileStorage.__flush_requested >
+                                       FileStorage.__flush_done))
+            time.sleep(self.__flush_window)
+            with cond:
+                target = FileStorage.__flush_requested
+                batch = FileStorage.__flush_batch
+                FileStorage.__flush_batch = {"error": None}
+            error = None
+            try:
+                self.__flush()
+            except Exception as e:
+                error = e
+            with cond:
+                FileStorage.__flush_done = target
+                batch["error"] = error
+                cond.notify_all()
+
+    def __wait_flush(self, ticket, batch):
+        """blocks until the flush covering ticket, requested in batch, is
+        done, raising the error of that flush if it failed"""
+        cond = self.__flush_cond
+        with cond:
+            cond.wait_for(lambda: FileStorage.__flush_done >= ticket)
+            if batch["error"] is not None:
+                raise batch["error"]
+
+    def __snapshot(self, dirty):
+        """rewrites the JSON file, encoding only the dirty objects"""
+        fragments = {}
+        with self.__lock.read():
+            for key, obj in self.__objects.items():
+                fragment = self.__fragments.get(key)
+                if (key in dirty or fragment is None or
+                        fragment[0] is not obj):
+                    fragment = (obj, json.dumps(key) + ": " +
+                                json.dumps(obj.to_dict()))
+                fragments[key] = fragment
+        self.__write("{" + ", ".join(v[1] for v in fragments.values()) +
+                     "}")
+        FileStorage.__fragments = fragments
+        with self.__file_lock:
+            for path in self.__logs():
+                if os.path.exists(path):
+                    os.remove(path)
+            FileStorage.__signature = self.__stat()
+
+    def __write(self, text, remove=None):
+        """replaces the JSON file with text through an fsync'd temp file,
+        then deletes the file at remove, if any, in the same step"""
+        tmp_path = "{}.{}.{}.tmp".format(self.__file_path, os.getpid(),
+                                         threading.get_ident())
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        with self.__file_lock:
+            os.replace(tmp_path, self.__file_path)
+            if remove is not None:
+                os.remove(remove)
+            FileStorage.__signature = self.__stat()
+
+    def __append(self, dirty):
+        """appends one journal record per changed object to the live log"""
+        if not dirty:
+            return
+        lines = []
+        with self.__lock.read():
+            for key, obj in dirty.items():
+                value = obj.to_dict() if obj is not None else None
+                lines.append(json.dumps([key, value]) + "\n")
+        sealed, live = self.__logs()
+        compactor = FileStorage.__compactor
+        with self.__file_lock:
+            with open(live, 'a') as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            FileStorage.__log_position = (os.stat(live).st_ino, size)
+            rotate = size >= self.__journal_limit and (
+                compactor is None or not compactor.is_alive())
+            if rotate and not os.path.exists(sealed):
+                os.replace(live, sealed)
+                FileStorage.__log_position = None
+            FileStorage.__signature = self.__stat()
+        if rotate:
+            FileStorage.__compactor = threading.Thread(target=self.__merge,
+                                                       daemon=True)
+            FileStorage.__compactor.start()
+
+    def __merge(self):
+        """writes the JSON file plus the sealed log to a new JSON file"""
+        sealed = self.__logs()[0]
+        with self.__locked(exclusive=True):
+            if not os.path.exists(sealed):
+                return
+            jo = {}
+            if os.path.exists(self.__file_path):
+                with open(self.__file_path, 'r') as f:
+                    jo = json.load(f)
+            for key, value in self.__records(sealed)[0]:
+                if value is None:
+                    jo.pop(key, None)
+                else:
+                    jo[key] = value
+            self.__write(json.dumps(jo), remove=sealed)
+
+    def __replay(self, path, loaded, offset=0):
+        """applies the records of the journal at path, from offset on, to
+        loaded, a map of keys to objects (None once deleted). A torn last
+        record is cut off the file. Returns the (inode, end offset, torn)
+        of the journal, or None if there is no journal"""
+        try:
+            records, end, size = self.__records(path, offset)
+        except FileNotFoundError:
+            return None
+        for key, value in records:
+            if value is None:
+                loaded[key] = None
+            else:
+                loaded[key] = classes[value["__class__"]](**value)
+        if end < size:
+            with open(path, 'r+') as f:
+                f.truncate(end)
+        return os.stat(path).st_ino, end, end < size
+
+    def __stat(self):
+        """returns the (mtime, size, inode) of the JSON file and journals"""
+        signature = []
+        for path in (self.__file_path,) + self.__logs():
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    @staticmethod
+    def __records(path, offset=0):
+        """returns the [key, value] records of the journal at path from
+        offset on, the offset past the last whole record and the file size
+        (past the end offset when the last record is torn)"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        size = offset + len(data)
+        records = []
+        for line in data.splitlines(True):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("record has no end of line")
+                records.append(json.loads(line.decode()))
+            except ValueError:
+                break
+            offset += len(line)
+        return records, offset, size
+
+    @staticmethod
+    def __class_name(cls):
+        """returns the bucket name for a class or a class name"""
+        if isinstance(cls, str):
+            return cls
+        return cls.__name__
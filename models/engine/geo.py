@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+"""
+Contains the geometry of the radius and bounding box searches of places,
+and the GridIndex kept by FileStorage for them
+
+A box is a (south, west, north, east) tuple of degrees. It crosses the
+antimeridian when west > east, split() cutting it into boxes that don't.
+"""
+
+from math import asin, cos, degrees, floor, radians, sin, sqrt
+
+# float - mean radius of the Earth in km
+EARTH_RADIUS = 6371.0088
+
+
+def point(latitude, longitude):
+    """returns (latitude, longitude) as floats, or None if they are not
+    the degrees of a point"""
+    for value in (latitude, longitude):
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return float(latitude), float(longitude)
+
+
+def distance(lat1, lng1, lat2, lng2):
+    """returns the great circle distance in km between two points"""
+    lat1, lng1, lat2, lng2 = map(radians, (lat1, lng1, lat2, lng2))
+    a = (sin((lat2 - lat1) / 2) ** 2 +
+         cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(a)))
+
+
+def split(south, west, north, east):
+    """returns the list of the boxes covering the box, none crossing the
+    antimeridian"""
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def around(latitude, longitude, radius_km):
+    """returns the list of the boxes covering the points within radius_km
+    of (latitude, longitude)"""
+    angle = radius_km / EARTH_RADIUS
+    south = latitude - degrees(angle)
+    north = latitude + degrees(angle)
+    if south <= -90 or north >= 90:
+        return [(max(south, -90.0), -180.0, min(north, 90.0), 180.0)]
+    ratio = sin(angle) / cos(radians(latitude))
+    if ratio >= 1:
+        return [(south, -180.0, north, 180.0)]
+    spread = degrees(asin(ratio))
+    west, east = longitude - spread, longitude + spread
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return split(south, west, north, east)
+
+
+def nearest(find, latitude, longitude, radius_km, limit=None, start_km=1.0):
+    """returns the (distance in km, obj) of the objects within radius_km of
+    (latitude, longitude), nearest first, at most limit of them. find(boxes)
+    returns the objects within the boxes, at least. With a limit, the search
+    starts start_km around and widens until it finds limit objects, so it
+    only looks at the neighbourhood of the point"""
+    reach = radius_km if limit is None else min(start_km, radius_km)
+    while True:
+        found = []
+        for obj in find(around(latitude, longitude, reach)):
+            location = point(obj.latitude, obj.longitude)
+            if location is not None:
+                km = distance(latitude, longitude, *location)
+                if km <= reach:
+                    found.append((km, obj))
+        if reach >= radius_km or len(found) >= limit:
+            found.sort(key=lambda item: item[0])
+            return found if limit is None else found[:limit]
+        reach = min(4 * reach, radius_km)
+
+
+class GridIndex:
+    """buckets the objects of a class, like Place, by the cell of a fine
+    grid their (latitude, longitude) falls in, the fine cells grouped by the
+    cell of a coarse grid, so that a box search only goes through the non
+    empty cells the box overlaps"""
+    # float - side of the cells in degrees, about 1.1 km and 111 km
+    FINE = 0.01
+    COARSE = 1.0
+
+    def __init__(self, latitude="latitude", longitude="longitude"):
+        """Instantiate an empty index of the points (latitude, longitude)"""
+        self.attributes = (latitude, longitude)
+        # dictionary - coarse cell -> {fine cell: {id: obj}}
+        self.__cells = {}
+        # dictionary - id -> the point each object is indexed under, None
+        # for the objects not located
+        self.__points = {}
+
+    def add(self, obj):
+        """indexes obj under its current point, moving it if it was
+        indexed under another one"""
+        location = point(*(getattr(obj, attribute, None)
+                           for attribute in self.attributes))
+        if obj.id in self.__points:
+            if self.__points[obj.id] == location:
+                if location is not None:
+                    self.__cell(location)[obj.id] = obj
+                return
+            self.discard(obj)
+        self.__points[obj.id] = location
+        if location is not None:
+            self.__cell(location)[obj.id] = obj
+
+    def discard(self, obj):
+        """stops indexing obj"""
+        if obj.id not in self.__points:
+            return
+        location = self.__points.pop(obj.id)
+        if location is None:
+            return
+        coarse, fine = self.__keys(location)
+        cells = self.__cells[coarse]
+        del cells[fine][obj.id]
+        if not cells[fine]:
+            del cells[fine]
+            if not cells:
+                del self.__cells[coarse]
+
+    def stale(self, obj):
+        """tells whether obj's point changed since it was indexed"""
+        location = point(*(getattr(obj, attribute, None)
+                           for attribute in self.attributes))
+        return self.__points.get(obj.id, self) != location
+
+    def within(self, boxes, limit=None):
+        """returns the list of the objects within one of the boxes, at most
+        limit of them"""
+        found = []
+        for box in boxes:
+            for south, west, north, east in split(*box):
+                self.__collect(found, south, west, north, east, limit)
+                if limit is not None and len(found) >= limit:
+                    return found[:limit]
+        return found
+
+    def __collect(self, found, south, west, north, east, limit):
+        """appends to found the objects within a box not crossing the
+        antimeridian, until found holds limit of them"""
+        size = self.COARSE
+        rows = range(floor(south / size), floor(north / size) + 1)
+        columns = range(floor(west / size), floor(east / size) + 1)
+        if len(rows) * len(columns) > len(self.__cells):
+            coarse = [key for key in self.__cells
+                      if key[0] in rows and key[1] in columns]
+        else:
+            coarse = [(i, j) for i in rows for j in columns
+                      if (i, j) in self.__cells]
+        for i, j in coarse:
+            cells = self.__cells[i, j]
+            inside = (south <= i * size and (i + 1) * size <= north and
+                      west <= j * size and (j + 1) * size <= east)
+            for (k, m), objs in cells.items():
+                if inside:
+                    found.extend(objs.values())
+                elif self.__overlaps(k, m, south, west, north, east):
+                    for id, obj in objs.items():
+                        lat, lng = self.__points[id]
+                        if south <= lat <= north and west <= lng <= east:
+                            found.append(obj)
+                if limit is not None and len(found) >= limit:
+                    return
+
+    def __overlaps(self, k, m, south, west, north, east):
+        """tells whether the fine cell (k, m) may hold points of the box"""
+        size, margin = self.FINE, self.FINE / 2
+        return (k * size - margin <= north and south <= (k + 1) *
+                size + margin and m * size - margin <= east and
+                west <= (m + 1) * size + margin)
+
+    def __keys(self, location):
+        """returns the (coarse cell, fine cell) of location"""
+        lat, lng = location
+        return ((floor(lat / self.COARSE), floor(lng / self.COARSE)),
+                (floor(lat / self.FINE), floor(lng / self.FINE)))
+
+    def __cell(self, location):
+        """returns the {id: obj} of the fine cell of location, creating it
+        if needed"""
+        coarse, fine = self.__keys(location)
+        cells = self.__cells.get(coarse)
+        if cells is None:
+            cells = self.__cells[coarse] = {}
+        objs = cells.get(fine)
+        if objs is None:
+            objs = cells[fine] = {}
+        return objs
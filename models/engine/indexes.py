@@ -0,0 +1,584 @@
+#!/usr/bin/python3
+"""
+Contains the in-memory indexes kept by FileStorage
+"""
+
+from bisect import bisect_left, insort
+from datetime import datetime
+from heapq import nsmallest
+from models.base_model import time
+from models.engine.text import fold
+
+
+class Top:
+    """compares greater than anything else, (value, TOP) bounding from
+    above the keys (value, id)"""
+
+    def __lt__(self, other):
+        """nothing is greater"""
+        return False
+
+    def __gt__(self, other):
+        """everything else is smaller"""
+        return other is not self
+
+
+TOP = Top()
+
+
+def sort_key(obj):
+    """returns the (created_at, id) key objects are paged by, created_at
+    formatted as in to_dict() so keys compare like the stored strings"""
+    created_at = obj.__dict__.get("created_at")
+    if isinstance(created_at, datetime):
+        created_at = created_at.strftime(time)
+    return (str(created_at), obj.id)
+
+
+def hashable(value):
+    """tells whether value can be hashed"""
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+class SortedKeys:
+    """a sorted list of keys split into chunks of about LOAD keys, so that
+    adding or removing one only moves the keys of its chunk"""
+    LOAD = 512
+
+    def __init__(self, keys=()):
+        """Instantiate the sorted list of keys"""
+        keys = sorted(keys)
+        # list - the chunks, lists of keys each sorted after the one before
+        self.__chunks = [keys[i:i + self.LOAD]
+                         for i in range(0, len(keys), self.LOAD)]
+        # list - the last key of each chunk
+        self.__maxes = [chunk[-1] for chunk in self.__chunks]
+        self.__len = len(keys)
+
+    def __len__(self):
+        """returns the number of keys"""
+        return self.__len
+
+    def add(self, key):
+        """inserts key"""
+        chunks, maxes = self.__chunks, self.__maxes
+        self.__len += 1
+        if not chunks:
+            chunks.append([key])
+            maxes.append(key)
+            return
+        i = bisect_left(maxes, key)
+        if i == len(maxes):
+            i -= 1
+            chunks[i].append(key)
+        else:
+            insort(chunks[i], key)
+        chunk = chunks[i]
+        maxes[i] = chunk[-1]
+        if len(chunk) > 2 * self.LOAD:
+            half = chunk[self.LOAD:]
+            del chunk[self.LOAD:]
+            chunks.insert(i + 1, half)
+            maxes[i] = chunk[-1]
+            maxes.insert(i + 1, half[-1])
+
+    def remove(self, key):
+        """removes key if it is there"""
+        chunks, maxes = self.__chunks, self.__maxes
+        i = bisect_left(maxes, key)
+        if i == len(maxes):
+            return
+        chunk = chunks[i]
+        j = bisect_left(chunk, key)
+        if chunk[j] != key:
+            return
+        del chunk[j]
+        self.__len -= 1
+        if chunk:
+            maxes[i] = chunk[-1]
+        else:
+            del chunks[i]
+            del maxes[i]
+
+    def count(self, low=None, high=None):
+        """returns the number of keys from low included to high excluded,
+        None leaving that side open"""
+        i, j = self.__locate(low, 0)
+        k, m = self.__locate(high, len(self.__chunks))
+        if (k, m) <= (i, j):
+            return 0
+        return sum(len(chunk) for chunk in self.__chunks[i:k]) - j + m
+
+    def range(self, low=None, high=None, limit=None):
+        """returns the list of the keys from low included to high excluded,
+        None leaving that side open, at most limit of them if given"""
+        i, j = self.__locate(low, 0)
+        k, m = self.__locate(high, len(self.__chunks))
+        keys = []
+        while (i, j) < (k, m):
+            chunk = self.__chunks[i]
+            stop = m if i == k else len(chunk)
+            if limit is not None:
+                stop = min(stop, j + limit - len(keys))
+            keys.extend(chunk[j:stop])
+            if limit is not None and len(keys) >= limit:
+                break
+            i, j = i + 1, 0
+        return keys
+
+    def __locate(self, bound, default):
+        """returns the (chunk, offset) of the first key not below bound,
+        (default, 0) if bound is None"""
+        if bound is None:
+            return default, 0
+        i = bisect_left(self.__maxes, bound)
+        if i == len(self.__maxes):
+            return i, 0
+        return i, bisect_left(self.__chunks[i], bound)
+
+
+class SortedIndex:
+    """keeps objects sorted by sort_key for keyset pagination"""
+
+    def __init__(self, objs=()):
+        """Instantiate an index of objs"""
+        # dictionary - id -> obj
+        self.__objects = {obj.id: obj for obj in objs}
+        # dictionary - id -> the key each object is sorted under
+        self.__values = {id: sort_key(obj)
+                         for id, obj in self.__objects.items()}
+        # SortedKeys - the keys
+        self.__keys = SortedKeys(self.__values.values())
+
+    def __len__(self):
+        """returns the number of objects indexed"""
+        return len(self.__keys)
+
+    def add(self, obj):
+        """indexes obj, moving it if its key changed"""
+        key = sort_key(obj)
+        old = self.__values.get(obj.id)
+        if old != key:
+            if old is not None:
+                self.__keys.remove(old)
+            self.__keys.add(key)
+            self.__values[obj.id] = key
+        self.__objects[obj.id] = obj
+
+    def discard(self, obj):
+        """stops indexing obj"""
+        key = self.__values.pop(obj.id, None)
+        if key is not None:
+            self.__keys.remove(key)
+            del self.__objects[obj.id]
+
+    def stale(self, obj):
+        """tells whether obj's key changed since it was indexed"""
+        return self.__values.get(obj.id) != sort_key(obj)
+
+    def objects(self):
+        """returns the list of the objects in key order"""
+        return [self.__objects[key[1]] for key in self.__keys.range()]
+
+    def page(self, limit, after=None):
+        """returns the list of the first limit objects whose key is
+        greater than after, in key order"""
+        low = None if after is None else tuple(after) + (TOP,)
+        return [self.__objects[key[1]]
+                for key in self.__keys.range(low, None, limit)]
+
+
+class HashIndex:
+    """maps the values of one attribute of a class, like City.state_id, to
+    the objects holding them, sorted by sort_key"""
+
+    def __init__(self, attribute):
+        """Instantiate an empty index on attribute"""
+        self.attribute = attribute
+        # dictionary - value -> SortedIndex of the objects holding it
+        self.__objects = {}
+        # dictionary - id -> the value each object is indexed under
+        self.__values = {}
+
+    def add(self, obj):
+        """indexes obj under the current value of its attribute, moving it
+        if it was indexed under another one. Objects holding a value that
+        can't be hashed are only tracked, no hashable value equals it"""
+        value = getattr(obj, self.attribute, None)
+        if obj.id in self.__values and self.__values[obj.id] != value:
+            self.discard(obj)
+        self.__values[obj.id] = value
+        if hashable(value):
+            objects = self.__objects.get(value)
+            if objects is None:
+                objects = self.__objects[value] = SortedIndex()
+            objects.add(obj)
+
+    def discard(self, obj):
+        """stops indexing obj"""
+        if obj.id not in self.__values:
+            return
+        value = self.__values.pop(obj.id)
+        if not hashable(value):
+            return
+        objects = self.__objects[value]
+        objects.discard(obj)
+        if not len(objects):
+            del self.__objects[value]
+
+    def stale(self, obj):
+        """tells whether obj's attribute or key changed since it was
+        indexed"""
+        value = getattr(obj, self.attribute, None)
+        if self.__values.get(obj.id, self) != value:
+            return True
+        return hashable(value) and self.__objects[value].stale(obj)
+
+    def lookup(self, value):
+        """returns the list of the objects whose attribute is value"""
+        objects = self.__objects.get(value) if hashable(value) else None
+        return objects.objects() if objects else []
+
+    def page(self, value, limit, after=None):
+        """returns the SortedIndex.page of the objects whose attribute is
+        value"""
+        objects = self.__objects.get(value) if hashable(value) else None
+        return objects.page(limit, after) if objects else []
+
+    def count(self, op, value):
+        """returns the number of objects meeting the condition op value,
+        or None if this index can't answer it"""
+        if op == "eq" and hashable(value):
+            objects = self.__objects.get(value)
+            return len(objects) if objects else 0
+        if op == "in" and all(hashable(v) for v in value):
+            return sum(self.count("eq", v) for v in set(value))
+        return None
+
+    def find(self, op, value):
+        """returns the list of the objects meeting the condition op value,
+        which count() can answer"""
+        if op == "eq":
+            return self.lookup(value)
+        return [obj for v in set(value) for obj in self.lookup(v)]
+
+
+class RangeIndex:
+    """keeps the objects of a class sorted by the value of one attribute,
+    for range conditions. Values are kept apart by kind (numbers, strings,
+    datetimes) since only those of the same kind compare"""
+
+    def __init__(self, attribute, objs=()):
+        """Instantiate an index on attribute of objs"""
+        self.attribute = attribute
+        # dictionary - id -> obj
+        self.__objects = {obj.id: obj for obj in objs}
+        # dictionary - id -> the value each object is indexed under
+        self.__values = {id: getattr(obj, attribute, None)
+                         for id, obj in self.__objects.items()}
+        # dictionary - kind -> SortedKeys of the (value, id) of that kind
+        self.__sorted = {}
+        keys = {}
+        for id, value in self.__values.items():
+            kind = self.__kind(value)
+            if kind is not None:
+                keys.setdefault(kind, []).append((value, id))
+        for kind in keys:
+            self.__sorted[kind] = SortedKeys(keys[kind])
+
+    def add(self, obj):
+        """indexes obj under the current value of its attribute, moving it
+        if it was indexed under another one"""
+        value = getattr(obj, self.attribute, None)
+        if obj.id in self.__values:
+            if self.__values[obj.id] == value:
+                self.__objects[obj.id] = obj
+                return
+            self.discard(obj)
+        self.__values[obj.id] = value
+        self.__objects[obj.id] = obj
+        kind = self.__kind(value)
+        if kind is not None:
+            if kind not in self.__sorted:
+                self.__sorted[kind] = SortedKeys()
+            self.__sorted[kind].add((value, obj.id))
+
+    def discard(self, obj):
+        """stops indexing obj"""
+        if obj.id not in self.__values:
+            return
+        value = self.__values.pop(obj.id)
+        del self.__objects[obj.id]
+        kind = self.__kind(value)
+        if kind is not None:
+            self.__sorted[kind].remove((value, obj.id))
+
+    def stale(self, obj):
+        """tells whether obj's attribute changed since it was indexed"""
+        value = getattr(obj, self.attribute, None)
+        return self.__values.get(obj.id, self) != value
+
+    def count(self, op, value):
+        """returns the number of objects meeting the condition op value,
+        or None if this index can't answer it"""
+        ranges = self.__ranges(op, value)
+        if ranges is None:
+            return None
+        return sum(keys.count(low, high) for keys, low, high in ranges)
+
+    def find(self, op, value):
+        """returns the list of the objects meeting the condition op value,
+        which count() can answer"""
+        return [self.__objects[key[1]] for keys, low, high in
+                self.__ranges(op, value) for key in keys.range(low, high)]
+
+    def range(self, low=None, low_inclusive=True, high=None,
+              high_inclusive=True):
+        """returns the list of the objects whose value lies between low and
+        high, None leaving that side open, or None if low and high are
+        both None or can't be compared with the indexed values"""
+        bounds = self.__bounds(low, low_inclusive, high, high_inclusive)
+        if bounds is None:
+            return None
+        keys, low, high = bounds
+        return [self.__objects[key[1]] for key in keys.range(low, high)]
+
+    def range_count(self, low=None, low_inclusive=True, high=None,
+                    high_inclusive=True):
+        """returns the number of objects range() would return, or None"""
+        bounds = self.__bounds(low, low_inclusive, high, high_inclusive)
+        return None if bounds is None else bounds[0].count(*bounds[1:])
+
+    def __ranges(self, op, value):
+        """returns the (keys, low, high) ranges of the keys meeting the
+        condition op value, or None"""
+        if op == "in":
+            if not all(hashable(v) for v in value):
+                return None
+            ranges = [self.__bounds(v, True, v, True) for v in set(value)]
+            return None if None in ranges else ranges
+        if op == "eq":
+            bounds = self.__bounds(value, True, value, True)
+        elif op in ("gt", "gte"):
+            bounds = self.__bounds(value, op == "gte", None, True)
+        elif op in ("lt", "lte"):
+            bounds = self.__bounds(None, True, value, op == "lte")
+        else:
+            return None
+        return None if bounds is None else [bounds]
+
+    def __bounds(self, low, low_inclusive, high, high_inclusive):
+        """returns the SortedKeys of the kind of low and high with the key
+        bounds of the values between them, or None"""
+        kinds = {self.__kind(v) for v in (low, high) if v is not None}
+        if len(kinds) != 1 or None in kinds:
+            return None
+        keys = self.__sorted.get(kinds.pop(), SortedKeys())
+        if low is not None:
+            low = (low,) if low_inclusive else (low, TOP)
+        if high is not None:
+            high = (high, TOP) if high_inclusive else (high,)
+        return keys, low, high
+
+    @staticmethod
+    def __kind(value):
+        """returns the kind of values value compares with, or None if it is
+        not indexed"""
+        if isinstance(value, (int, float)):
+            return "number"
+        if isinstance(value, (str, datetime)):
+            return type(value)
+        return None
+
+
+class BitsetIndex:
+    """gives each object of a class, like Amenity, a bit, and maps the
+    values of one attribute, like Amenity.place_id, to the bitset of the
+    objects holding them, so that "all of" and "any of" filters over those
+    objects are bitwise operations"""
+
+    def __init__(self, attribute):
+        """Instantiate an empty index on attribute"""
+        self.attribute = attribute
+        # dictionary - id -> the bit of each object
+        self.__bits = {}
+        # list - bit -> the id of the object holding it, None once freed
+        self.__ids = []
+        # list - the bits of discarded objects, given out again first
+        self.__free = []
+        # dictionary - id -> the value each object is indexed under
+        self.__values = {}
+        # dictionary - value -> int, the bitset of the objects holding it
+        self.__sets = {}
+
+    def add(self, obj):
+        """indexes obj under the current value of its attribute, moving its
+        bit if it was indexed under another one"""
+        value = getattr(obj, self.attribute, None)
+        bit = self.__bits.get(obj.id)
+        if bit is None:
+            if self.__free:
+                bit = self.__free.pop()
+                self.__ids[bit] = obj.id
+            else:
+                bit = len(self.__ids)
+                self.__ids.append(obj.id)
+            self.__bits[obj.id] = bit
+        elif self.__values[obj.id] == value:
+            return
+        else:
+            self.__unset(self.__values[obj.id], bit)
+        self.__values[obj.id] = value
+        if hashable(value):
+            self.__sets[value] = self.__sets.get(value, 0) | 1 << bit
+
+    def discard(self, obj):
+        """stops indexing obj, freeing its bit"""
+        bit = self.__bits.pop(obj.id, None)
+        if bit is not None:
+            self.__unset(self.__values.pop(obj.id), bit)
+            self.__ids[bit] = None
+            self.__free.append(bit)
+
+    def stale(self, obj):
+        """tells whether obj's attribute changed since it was indexed"""
+        value = getattr(obj, self.attribute, None)
+        return self.__values.get(obj.id, self) != value
+
+    def mask(self, ids):
+        """returns the bitset of the objects whose id is in ids, with the
+        number of them indexed"""
+        mask = found = 0
+        for id in set(ids):
+            bit = self.__bits.get(id)
+            if bit is not None:
+                mask |= 1 << bit
+                found += 1
+        return mask, found
+
+    def matches(self, value, every=0, some=None):
+        """tells whether the bitset of value has all the bits of every and,
+        unless some is None, one of the bits of some"""
+        bits = self.__sets.get(value, 0) if hashable(value) else 0
+        return bits & every == every and (some is None or bits & some != 0)
+
+    def find(self, every=0, some=None):
+        """returns the list of the values whose bitset matches() every and
+        some, among those held by at least one object. Each object holds a
+        single value, so only those of the objects of a bit of every, or
+        else of the bits of some, are checked"""
+        if every:
+            values = [self.__values[self.__ids[next(self.__positions(
+                every))]]]
+        elif some is not None:
+            values = {self.__values[self.__ids[bit]]
+                      for bit in self.__positions(some)}
+        else:
+            values = self.__sets
+        return [value for value in values
+                if self.matches(value, every, some)]
+
+    @staticmethod
+    def __positions(bits):
+        """yields the positions of the bits set in bits, lowest first"""
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def __unset(self, value, bit):
+        """clears bit from the bitset of value"""
+        if hashable(value):
+            bits = self.__sets[value] & ~(1 << bit)
+            if bits:
+                self.__sets[value] = bits
+            else:
+                del self.__sets[value]
+
+
+class PrefixIndex:
+    """keeps the string values of one attribute of a class, like
+    State.name, sorted without regard to case and accents, so that the
+    values starting with a prefix are one range of them"""
+
+    def __init__(self, attribute):
+        """Instantiate an empty index of attribute"""
+        self.attribute = attribute
+        # dictionary - id -> the (folded value, value, id) key each object
+        # is indexed under, objects without a string value having none
+        self.__values = {}
+        # SortedKeys - the keys
+        self.__keys = SortedKeys()
+
+    def __len__(self):
+        """returns the number of values indexed"""
+        return len(self.__keys)
+
+    def add(self, obj):
+        """indexes the value of obj, moving it if it changed"""
+        self.put(obj.id, getattr(obj, self.attribute, None))
+
+    def discard(self, obj):
+        """stops indexing obj"""
+        self.remove(obj.id)
+
+    def stale(self, obj):
+        """tells whether obj's attribute changed since it was indexed"""
+        return self.__values.get(obj.id) != self.__key(
+            obj.id, getattr(obj, self.attribute, None))
+
+    def put(self, id, value):
+        """indexes value as the one of the object id"""
+        key = self.__key(id, value)
+        old = self.__values.get(id)
+        if old == key:
+            return
+        if old is not None:
+            self.__keys.remove(old)
+            del self.__values[id]
+        if key is not None:
+            self.__keys.add(key)
+            self.__values[id] = key
+
+    def remove(self, id):
+        """stops indexing the value of the object id"""
+        key = self.__values.pop(id, None)
+        if key is not None:
+            self.__keys.remove(key)
+
+    def match(self, prefix, limit=None):
+        """returns the list of the (folded value, value, id) keys whose
+        value starts with prefix, ignoring case and accents, in key order,
+        at most limit of them"""
+        prefix = fold(prefix)
+        if not prefix:
+            return self.__keys.range(None, None, limit)
+        # no value holds the last code point, a noncharacter
+        return self.__keys.range((prefix,), (prefix + "\U0010ffff",), limit)
+
+    @staticmethod
+    def __key(id, value):
+        """returns the key of the object id holding value, None if value
+        is not a string"""
+        if not isinstance(value, str):
+            return None
+        return (fold(value), value, id)
+
+
+def complete(indexes, prefix, limit=None):
+    """returns the list of the (value, class name, id) whose value starts
+    with prefix, ignoring case and accents, in the {class name:
+    PrefixIndex} indexes, sorted by folded value, value, class name and
+    id, at most limit of them"""
+    found = [(key[0], key[1], name, key[2])
+             for name, index in indexes.items()
+             for key in index.match(prefix, limit)]
+    if limit is not None:
+        found = nsmallest(limit, found)
+    else:
+        found.sort()
+    return [key[1:] for key in found]
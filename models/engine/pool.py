@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+"""
+Contains the connection pool settings of DBStorage, read from the
+environment, and the PoolMonitor collecting its metrics
+
+HBNB_DB_POOL_CLASS names the class of sqlalchemy.pool to use, the
+dialect's default when it is not set. HBNB_MYSQL_POOL_SIZE,
+HBNB_MYSQL_MAX_OVERFLOW and HBNB_MYSQL_POOL_TIMEOUT size the pool when it
+is a QueuePool, SQLAlchemy's defaults (5, 10 and 30 seconds) applying when
+they are not set, and are ignored by the other pools. Connections are
+pinged before use and replaced after HBNB_MYSQL_POOL_RECYCLE seconds
+(3600), below the idle timeout of MySQL, unless HBNB_MYSQL_POOL_PRE_PING
+is 0.
+"""
+
+from bisect import bisect_left
+from os import getenv
+from sqlalchemy import event, exc
+import sqlalchemy.pool
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+import threading
+from time import monotonic
+
+# float - upper bounds in milliseconds of the buckets of the histogram of
+# the time taken to get a connection, the last bucket holding the rest
+WAIT_BUCKETS_MS = (0.1, 1, 10, 100, 1000)
+# <create_engine argument>: (environment variable, type, default or None
+# to leave it to SQLAlchemy)
+settings = {"pool_size": ("HBNB_MYSQL_POOL_SIZE", int, None),
+            "max_overflow": ("HBNB_MYSQL_MAX_OVERFLOW", int, None),
+            "pool_timeout": ("HBNB_MYSQL_POOL_TIMEOUT", float, None),
+            "pool_recycle": ("HBNB_MYSQL_POOL_RECYCLE", int, "3600"),
+            "pool_pre_ping": ("HBNB_MYSQL_POOL_PRE_PING",
+                              lambda value: value.lower() not in
+                              ("0", "false", "no"), "1")}
+# the create_engine arguments only taken by a QueuePool
+queue_settings = ("pool_size", "max_overflow", "pool_timeout")
+
+
+def pool_options(url):
+    """returns the create_engine arguments of the pool of the database at
+    url, from the environment, sizing the pool and timing the connections
+    got from it only when it is a QueuePool"""
+    options = {}
+    for argument, (variable, kind, default) in settings.items():
+        value = getenv(variable, default)
+        if value is not None:
+            try:
+                options[argument] = kind(value)
+            except ValueError:
+                raise ValueError("invalid {}: {}".format(variable, value))
+    name = getenv("HBNB_DB_POOL_CLASS")
+    if name is None:
+        url = make_url(url)
+        poolclass = url.get_dialect().get_pool_class(url)
+    else:
+        poolclass = getattr(sqlalchemy.pool, name, None)
+        if not isinstance(poolclass, type) or \
+                not issubclass(poolclass, sqlalchemy.pool.Pool):
+            raise ValueError("invalid HBNB_DB_POOL_CLASS: {}".format(name))
+        options["poolclass"] = poolclass
+    if not issubclass(poolclass, QueuePool):
+        for argument in queue_settings:
+            options.pop(argument, None)
+    elif poolclass is QueuePool or name is None:
+        options["poolclass"] = TimedQueuePool
+    return options
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool telling its monitor how long each connection took to get,
+    waiting for one to be returned or opening one"""
+    # PoolMonitor - told the time each connect() took, if any
+    monitor = None
+
+    def connect(self):
+        """returns a connection of the pool, timing how long it took"""
+        start = monotonic()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            if self.monitor is not None:
+                self.monitor.timed_out()
+            raise
+        finally:
+            if self.monitor is not None:
+                self.monitor.waited(monotonic() - start)
+
+    def recreate(self):
+        """returns a new pool like this one, watched by the same monitor"""
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+
+class PoolMonitor:
+    """counts the connections of the pool of an engine through the pool
+    events, and the time taken to get them when its pool is a
+    TimedQueuePool"""
+
+    def __init__(self, engine):
+        """Instantiate the monitor of the pool of engine"""
+        self.engine = engine
+        # lock - guards the counters, the events coming from every thread
+        self.__lock = threading.Lock()
+        # integers - connections checked out now and at most, connections
+        # opened, checkouts, invalidations and checkouts timed out
+        self.__checked_out = 0
+        self.__peak = 0
+        self.__connects = 0
+        self.__checkouts = 0
+        self.__invalidated = 0
+        self.__timeouts = 0
+        # list - number of connections got within each of WAIT_BUCKETS_MS,
+        # the last counting the slower ones
+        self.__waits = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        # float - total time taken to get them, in seconds
+        self.__waited = 0.0
+        for name in ["connect", "checkout", "checkin", "invalidate"]:
+            event.listen(engine, name, getattr(self, "_PoolMonitor__" + name))
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.monitor = self
+
+    def waited(self, seconds):
+        """counts a connection taking seconds to get"""
+        bucket = bisect_left(WAIT_BUCKETS_MS, seconds * 1e3)
+        with self.__lock:
+            self.__waits[bucket] += 1
+            self.__waited += seconds
+
+    def timed_out(self):
+        """counts a connection not got within the pool timeout"""
+        with self.__lock:
+            self.__timeouts += 1
+
+    def stats(self):
+        """returns the metrics of the pool, those of its size and overflow
+        only when its class has them, and the histogram of the time taken
+        to get a connection only for a TimedQueuePool"""
+        pool = self.engine.pool
+        with self.__lock:
+            stats = {"pool": type(pool).__name__,
+                     "checked_out": self.__checked_out,
+                     "peak_checked_out": self.__peak,
+                     "connects": self.__connects,
+                     "checkouts": self.__checkouts,
+                     "invalidated": self.__invalidated}
+            if isinstance(pool, QueuePool):
+                stats.update(size=pool.size(), overflow=pool.overflow(),
+                             timeout=pool.timeout(),
+                             timeouts=self.__timeouts)
+            if isinstance(pool, TimedQueuePool):
+                stats["wait_ms"] = {
+                    "total": self.__waited * 1e3,
+                    "histogram": [{"le": bound, "count": count}
+                                  for bound, count in zip(
+                                      WAIT_BUCKETS_MS + (None,),
+                                      self.__waits)]}
+        return stats
+
+    def __connect(self, dbapi_connection, connection_record):
+        """counts a connection opened"""
+        with self.__lock:
+            self.__connects += 1
+
+    def __checkout(self, dbapi_connection, connection_record,
+                   connection_proxy):
+        """counts a connection checked out"""
+        with self.__lock:
+            self.__checkouts += 1
+            self.__checked_out += 1
+            self.__peak = max(self.__peak, self.__checked_out)
+
+    def __checkin(self, dbapi_connection, connection_record):
+        """counts a connection returned"""
+        with self.__lock:
+            self.__checked_out -= 1
+
+    def __invalidate(self, dbapi_connection, connection_record, exception):
+        """counts a connection found broken or recycled"""
+        with self.__lock:
+            self.__invalidated += 1
@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+"""
+Contains the predicates understood by storage.query()
+
+A predicate is a keyword argument <attribute>=<value> for equality, or
+<attribute>__<operator>=<value> with one of the OPERATORS below, e.g.
+storage.query(Place, city_id=city.id, price_by_night__lte=100)
+
+An order_by is an attribute name, prefixed with - for the descending order,
+e.g. storage.query(Place, order_by="-price_by_night", limit=10)
+"""
+
+from datetime import datetime
+import operator
+
+OPERATORS = {"eq": operator.eq,
+             "gt": operator.gt, "gte": operator.ge,
+             "lt": operator.lt, "lte": operator.le,
+             "in": lambda value, values: value in values}
+
+# operators bounding a range, with whether they bound it from below and
+# whether they include the bound
+RANGES = {"gt": (True, False), "gte": (True, True),
+          "lt": (False, False), "lte": (False, True)}
+
+
+def parse(predicates):
+    """returns the list of the (attribute, operator, value) conditions of
+    predicates, raises ValueError on an unknown operator"""
+    conditions = []
+    for key, value in predicates.items():
+        attribute, _, op = key.partition("__")
+        op = op or "eq"
+        if op not in OPERATORS or not attribute:
+            raise ValueError("invalid predicate: {}".format(key))
+        if op == "in":
+            value = list(value)
+        conditions.append((attribute, op, value))
+    return conditions
+
+
+def matches(obj, conditions):
+    """tells whether obj meets all conditions, a value that can't be
+    compared with the one of a condition failing it"""
+    for attribute, op, value in conditions:
+        try:
+            if not OPERATORS[op](getattr(obj, attribute, None), value):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+def ordering(order_by):
+    """returns the (attribute, descending) of order_by, (None, False) if
+    order_by is None"""
+    if order_by is None:
+        return None, False
+    attribute = order_by[1:] if order_by.startswith("-") else order_by
+    if not attribute:
+        raise ValueError("invalid order_by: {}".format(order_by))
+    return attribute, order_by.startswith("-")
+
+
+def order(objs, attribute, descending=False):
+    """returns the list of objs sorted by attribute, those holding numbers
+    before those holding strings before those holding datetimes in either
+    direction, then those holding other values in no order"""
+    kinds = ((int, float), str, datetime)
+    groups = [[] for kind in kinds]
+    rest = []
+    for obj in objs:
+        value = getattr(obj, attribute, None)
+        for group, kind in zip(groups, kinds):
+            if isinstance(value, kind):
+                group.append((value, obj))
+                break
+        else:
+            rest.append(obj)
+    for group in groups:
+        group.sort(key=lambda item: item[0], reverse=descending)
+    return [obj for group in groups for value, obj in group] + rest
+
+
+def aggregate(objs, attribute):
+    """returns the {"count", "min", "max", "mean"} of objs, the last three
+    over their attribute values that are numbers, None if there are none"""
+    values = [value for value in (getattr(obj, attribute, None)
+                                  for obj in objs)
+              if isinstance(value, (int, float))]
+    if not values:
+        return {"count": len(objs), "min": None, "max": None, "mean": None}
+    return {"count": len(objs), "min": min(values), "max": max(values),
+            "mean": sum(values) / len(values)}
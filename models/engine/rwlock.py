@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+Contains the RWLock class
+"""
+
+from contextlib import contextmanager
+import threading
+
+
+class RWLock:
+    """lets any number of readers, or a single writer, hold the lock
+
+    Waiting writers go first: new readers queue behind them so a steady
+    stream of reads can't starve a write. The lock isn't reentrant.
+    """
+
+    def __init__(self):
+        """initializes an unlocked RWLock"""
+        self.__cond = threading.Condition(threading.Lock())
+        self.__readers = 0
+        self.__writer = False
+        self.__writers_waiting = 0
+
+    def acquire_read(self):
+        """blocks until no writer holds or waits for the lock"""
+        with self.__cond:
+            self.__cond.wait_for(lambda: not (self.__writer or
+                                              self.__writers_waiting))
+            self.__readers += 1
+
+    def release_read(self):
+        """releases a read hold"""
+        with self.__cond:
+            self.__readers -= 1
+            if self.__readers == 0:
+                self.__cond.notify_all()
+
+    def acquire_write(self):
+        """blocks until no reader or writer holds the lock"""
+        with self.__cond:
+            self.__writers_waiting += 1
+            self.__cond.wait_for(lambda: not (self.__writer or
+                                              self.__readers))
+            self.__writers_waiting -= 1
+            self.__writer = True
+
+    def release_write(self):
+        """releases the write hold"""
+        with self.__cond:
+            self.__writer = False
+            self.__cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """holds the lock for reading for the duration of a with block"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """holds the lock for writing for the duration of a with block"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
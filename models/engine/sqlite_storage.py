@@ -0,0 +1,655 @@
+#!/usr/bin/python3
+"""
+Contains the SQLiteStorage class
+"""
+
+from datetime import datetime
+import json
+from models.amenity import Amenity
+from models.base_model import BaseModel, time
+from models.city import City
+from models.engine.geo import nearest, split
+from models.engine.indexes import PrefixIndex, SortedIndex, complete
+from models.engine.predicates import aggregate, matches, order
+from models.engine.predicates import ordering, parse
+from models.engine.text import TextIndex, rank, tokens
+from models.engine.tiles import TileCache
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+from os import getenv
+import sqlite3
+import threading
+from time import monotonic
+
+classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
+           "Place": Place, "Review": Review, "State": State, "User": User}
+
+# SQL of the operators of models.engine.predicates
+operators = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+# <class name>: (table, indexed foreign key columns)
+tables = {"Amenity": ("amenities", ()),
+          "BaseModel": ("base_models", ()),
+          "City": ("cities", ("state_id",)),
+          "Place": ("places", ("city_id", "user_id")),
+          "Review": ("reviews", ("place_id", "user_id")),
+          "State": ("states", ()),
+          "User": ("users", ())}
+
+# <class name>: the (latitude, longitude) columns, indexed together
+locations = {"Place": ("latitude", "longitude")}
+
+# <class name>: the text attributes searched by search(), kept in the FTS5
+# table texts, whose rows are mapped to the objects by the table text_ids
+texts = {"Place": ("description",), "Review": ("text",)}
+
+# <class name>: the attribute completed by autocomplete()
+prefixes = {"Amenity": "name", "City": "name", "State": "name"}
+
+
+class SQLiteStorage:
+    """stores instances in an embedded SQLite database file"""
+    __path = None
+    __local = None
+    # boolean - whether SQLite has FTS5, search() scanning the texts
+    # without it
+    __fts = True
+
+    def __init__(self):
+        """Instantiate a SQLiteStorage object"""
+        self.__path = getenv('HBNB_SQLITE_PATH', 'hbnb.db')
+        self.__local = threading.local()
+        self.__tiles = TileCache(
+            ttl=float(getenv('HBNB_TILE_CACHE_TTL', 60)),
+            latitude=locations["Place"][0], longitude=locations["Place"][1])
+        self.__prefix_ttl = float(getenv('HBNB_PREFIX_INDEX_TTL', 60))
+        # dictionary - <class name>: (PrefixIndex, time it was built) of the
+        # values completed by autocomplete()
+        self.__prefixes = {}
+        self.__prefixes_lock = threading.Lock()
+        self.__count_ttl = float(getenv('HBNB_COUNT_CACHE_TTL', 10))
+        # tuple - ({<class name>: number of objects}, time they were read)
+        # of the approximate counts
+        self.__counts = None
+        self.__counts_lock = threading.Lock()
+        if getenv('HBNB_ENV') == "test":
+            with self.__connection() as conn:
+                for table in [t for t, c in tables.values()] + [
+                        "texts", "text_ids"]:
+                    conn.execute("DROP TABLE IF EXISTS " + table)
+
+    def all(self, cls=None, load=(), how="selectin"):
+        """query on the database, returns a dictionary <class name>.id: obj.
+        load and how, the relationships DBStorage loads with the objects,
+        are ignored, relationships being read through the indexed foreign
+        key columns of related()"""
+        new_dict = {}
+        pending = self.__session()[1]
+        for name in classes:
+            if cls is None or cls is classes[name] or cls == name:
+                rows = self.__connection().execute(
+                    "SELECT id, data FROM " + tables[name][0])
+                for row in rows:
+                    key = name + '.' + row[0]
+                    if key not in pending:
+                        new_dict[key] = self.__load(row[1])
+        for key, obj in pending.items():
+            name = key.split('.', 1)[0]
+            if cls is None or cls is classes[name] or cls == name:
+                if obj is None:
+                    new_dict.pop(key, None)
+                else:
+                    new_dict[key] = obj
+        return new_dict
+
+    def iter(self, cls=None, batch_size=1000):
+        """yields the objects of cls, or of every class, fetching them
+        batch_size rows at a time"""
+        pending = self.__session()[1]
+        for name in classes:
+            if cls is None or cls is classes[name] or cls == name:
+                rows = self.__connection().execute(
+                    "SELECT id, data FROM " + tables[name][0])
+                batch = rows.fetchmany(batch_size)
+                while batch:
+                    for row in batch:
+                        if name + '.' + row[0] not in pending:
+                            yield self.__load(row[1])
+                    batch = rows.fetchmany(batch_size)
+        for key, obj in list(pending.items()):
+            name = key.split('.', 1)[0]
+            if obj is not None and (cls is None or cls is classes[name] or
+                                    cls == name):
+                yield obj
+
+    def new(self, obj):
+        """adds the object to the objects to insert on the next save"""
+        if obj is not None:
+            key = obj.__class__.__name__ + '.' + obj.id
+            identity, pending = self.__session()
+            identity[key] = obj
+            pending[key] = obj
+
+    def touch(self, obj):
+        """marks obj as changed if this thread loaded or added it"""
+        identity, pending = self.__session()
+        key = obj.__class__.__name__ + '.' + str(obj.__dict__.get("id"))
+        if identity.get(key) is obj:
+            pending[key] = obj
+
+    def save(self):
+        """writes the objects added, changed or deleted in one transaction"""
+        pending = self.__session()[1]
+        if not pending:
+            return
+        moves = []
+        with self.__connection() as conn:
+            for key, obj in pending.items():
+                name, id = key.split('.', 1)
+                table, columns = tables[name]
+                if name == "Place":
+                    moves.append((self.__entry(conn, id),
+                                  obj and self.__tiles.entry(obj)))
+                if name in texts and self.__fts:
+                    self.__put_text(conn, name, id, obj and [
+                        getattr(obj, attribute, None)
+                        for attribute in texts[name]])
+                if obj is None:
+                    conn.execute("DELETE FROM {} WHERE id = ?".format(table),
+                                 (id,))
+                    continue
+                values = obj.to_dict()
+                located = locations.get(name, ())
+                conn.execute(
+                    "INSERT OR REPLACE INTO {} (id, created_at, updated_at, "
+                    "{}data) VALUES (?, ?, ?, {}?)".format(
+                        table, "".join(c + ", " for c in columns + located),
+                        "?, " * len(columns + located)),
+                    [id, values.get("created_at"), values.get("updated_at")] +
+                    [values.get(c) for c in columns] +
+                    [self.__number(getattr(obj, c, None)) for c in located] +
+                    [json.dumps(values)])
+        named = [(key.split('.', 1), obj) for key, obj in pending.items()
+                 if key.split('.', 1)[0] in prefixes]
+        pending.clear()
+        for old, new in moves:
+            self.__tiles.update(old, new)
+        with self.__prefixes_lock:
+            for (name, id), obj in named:
+                index = self.__prefixes.get(name, (None,))[0]
+                if index is not None and obj is None:
+                    index.remove(id)
+                elif index is not None:
+                    index.add(obj)
+
+    def delete(self, obj=None):
+        """deletes obj from the database on the next save"""
+        if obj is not None:
+            key = obj.__class__.__name__ + '.' + obj.id
+            identity, pending = self.__session()
+            identity.pop(key, None)
+            pending[key] = None
+
+    def reload(self):
+        """creates the tables and their indexes if they don't exist, adding
+        the location columns to the tables created without them and
+        indexing the texts of the objects saved before the texts table"""
+        with self.__connection() as conn:
+            for name, (table, columns) in tables.items():
+                located = locations.get(name, ())
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS {} (id TEXT PRIMARY KEY, "
+                    "created_at TEXT, updated_at TEXT, {}{}data TEXT NOT "
+                    "NULL) WITHOUT ROWID".format(
+                        table, "".join(c + " TEXT, " for c in columns),
+                        "".join(c + " REAL, " for c in located)))
+                existing = [row[1] for row in conn.execute(
+                    "PRAGMA table_info({})".format(table))]
+                for column in located:
+                    if column not in existing:
+                        conn.execute("ALTER TABLE {} ADD COLUMN {} REAL".
+                                     format(table, column))
+                        conn.execute(
+                            "UPDATE {} SET {} = COALESCE(json_extract(data, "
+                            "?), ?)".format(table, column),
+                            ['$."{}"'.format(column),
+                             getattr(classes[name], column, None)])
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS {0}_created_at ON {0} "
+                    "(created_at, id)".format(table))
+                for column in columns:
+                    conn.execute(
+                        "CREATE INDEX IF NOT EXISTS {0}_{1} ON {0} "
+                        "({1}, created_at, id)".format(table, column))
+                if located:
+                    conn.execute(
+                        "CREATE INDEX IF NOT EXISTS {0}_location ON {0} "
+                        "({1})".format(table, ", ".join(located)))
+            self.__create_texts(conn)
+        self.close()
+
+    def get(self, cls, id, load=(), how="selectin"):
+        '''Returns one instance found in the db or None. load and how are
+        ignored, as by all().'''
+        name = cls if isinstance(cls, str) else getattr(cls, "__name__", "")
+        if name not in classes:
+            return None
+        key = name + '.' + str(id)
+        identity, pending = self.__session()
+        if key in pending:
+            return pending[key]
+        if key in identity:
+            return identity[key]
+        row = self.__connection().execute(
+            "SELECT data FROM {} WHERE id = ?".format(tables[name][0]),
+            (id,)).fetchone()
+        if row is None:
+            return None
+        return self.__load(row[0])
+
+    def count(self, cls=None, approximate=False):
+        '''Returns a count of cls if passed if not all items from database.
+        approximate counts come from counts(approximate=True).'''
+        if cls is None or approximate:
+            counts = self.counts(approximate)
+            if cls is None:
+                return sum(counts.values())
+            return counts.get(getattr(cls, "__name__", cls), 0)
+        count = 0
+        for name in classes:
+            if cls is classes[name] or cls == name:
+                count += self.__connection().execute(
+                    "SELECT COUNT(*) FROM " + tables[name][0]).fetchone()[0]
+        return count
+
+    def counts(self, approximate=False):
+        """returns the {class name: number of saved objects} of every class,
+        read in one statement. approximate counts are cached for
+        HBNB_COUNT_CACHE_TTL seconds"""
+        if approximate:
+            with self.__counts_lock:
+                if self.__counts is None or \
+                        monotonic() - self.__counts[1] > self.__count_ttl:
+                    self.__counts = (self.counts(), monotonic())
+                return dict(self.__counts[0])
+        return dict(self.__connection().execute(" UNION ALL ".join(
+            "SELECT '{}', COUNT(*) FROM {}".format(name, tables[name][0])
+            for name in classes)).fetchall())
+
+    def related(self, cls, attribute, value):
+        """returns the list of the cls objects whose attribute is value"""
+        name = cls if isinstance(cls, str) else getattr(cls, "__name__", "")
+        if name not in classes:
+            return []
+        table, columns = tables[name]
+        if attribute not in columns:
+            return [obj for obj in self.all(name).values()
+                    if getattr(obj, attribute, None) == value]
+        pending = self.__session()[1]
+        objs = {}
+        rows = self.__connection().execute(
+            "SELECT id, data FROM {} WHERE {} = ?".format(table, attribute),
+            (value,))
+        for row in rows:
+            key = name + '.' + row[0]
+            if key not in pending:
+                objs[key] = self.__load(row[1])
+        for key, obj in pending.items():
+            if (obj is not None and key.startswith(name + '.') and
+                    getattr(obj, attribute, None) == value):
+                objs[key] = obj
+        return list(objs.values())
+
+    def query(self, cls, order_by=None, limit=None, **predicates):
+        """returns the list of the cls objects meeting all predicates (see
+        models.engine.predicates), sorted by order_by and cut to limit if
+        given. SQLite narrows them down, then each is checked in Python as
+        SQLite compares values of different types"""
+        conditions = parse(predicates)
+        sort_by, descending = ordering(order_by)
+        name = cls if isinstance(cls, str) else getattr(cls, "__name__", "")
+        if name not in classes:
+            return []
+        table, columns = tables[name]
+        where, params = [], []
+        for attribute, op, value in conditions:
+            values = value if op == "in" else [value]
+            if not values:
+                return []
+            values = [self.__sql_value(v) for v in values]
+            if None in values:
+                continue
+            if attribute in ("id", "created_at", "updated_at") + columns + \
+                    locations.get(name, ()):
+                column = attribute
+            else:
+                default = self.__sql_value(getattr(classes[name], attribute,
+                                                   None))
+                column = "COALESCE(json_extract(data, ?), ?)"
+                params += ['$."{}"'.format(attribute), default]
+            if op == "in":
+                where.append("{} IN ({})".format(
+                    column, ", ".join("?" * len(values))))
+            else:
+                where.append("{} {} ?".format(column, operators[op]))
+            params += values
+        prefix = name + '.'
+        pending = {key: obj for key, obj in self.__session()[1].items()
+                   if key.startswith(prefix)}
+        rows = self.__connection().execute(
+            "SELECT id, data FROM {} {}".format(
+                table, "WHERE " + " AND ".join(where) if where else ""),
+            params)
+        objs = [self.__load(row[1]) for row in rows
+                if prefix + row[0] not in pending]
+        objs += [obj for obj in pending.values() if obj is not None]
+        objs = [obj for obj in objs if matches(obj, conditions)]
+        if sort_by is not None:
+            objs = order(objs, sort_by, descending)
+        return objs if limit is None else objs[:limit]
+
+    def aggregate(self, cls, attribute, **predicates):
+        """returns the {"count", "min", "max", "mean"} of the cls objects
+        meeting all predicates, the last three over their attribute values
+        that are numbers, None if there are none"""
+        return aggregate(self.query(cls, **predicates), attribute)
+
+    def search_places(self, states=(), cities=(), amenities=(),
+                      any_amenities=()):
+        """returns the list of the places in the states or cities given, or
+        of all places if neither is, having all the amenities and one of
+        the any_amenities given. The cities and places are found through
+        the indexed foreign key columns and the amenities by id"""
+        predicates = {}
+        if states or cities:
+            city_ids = set(cities)
+            if states:
+                city_ids.update(city.id for city in
+                                self.query(City, state_id__in=states))
+            predicates["city_id__in"] = city_ids
+        place_ids = []
+        if amenities:
+            found = self.query(Amenity, id__in=amenities)
+            if len(found) < len(set(amenities)):
+                return []
+            place_ids.append(set.intersection(
+                *[{getattr(amenity, "place_id", None)} for amenity in found]))
+        if any_amenities:
+            place_ids.append({getattr(amenity, "place_id", None) for amenity
+                              in self.query(Amenity, id__in=any_amenities)})
+        if place_ids:
+            place_ids = set.intersection(*place_ids)
+            place_ids.discard(None)
+            if not place_ids:
+                return []
+            predicates["id__in"] = place_ids
+        return self.query(Place, **predicates)
+
+    def places_near(self, latitude, longitude, radius_km, limit=None):
+        """returns the (distance in km, place) of the places within
+        radius_km of (latitude, longitude), nearest first, at most limit of
+        them, found through the index on the location columns"""
+        return nearest(self.__places_within, latitude, longitude, radius_km,
+                       limit)
+
+    def places_within(self, south, west, north, east, limit=None):
+        """returns the list of the places within the box (south, west,
+        north, east), crossing the antimeridian if west > east, at most
+        limit of them"""
+        places = self.__places_within([(south, west, north, east)])
+        return places if limit is None else places[:limit]
+
+    def place_clusters(self, south, west, north, east, zoom):
+        """returns the {"count", "latitude", "longitude", "min_price"} of
+        the saved places of each map tile of zoom overlapping the box (see
+        models.engine.tiles). Tiles are cached for HBNB_TILE_CACHE_TTL
+        seconds, kept in step with the places this process saves"""
+        return self.__tiles.clusters(south, west, north, east, zoom,
+                                     self.__entries_within)
+
+    def search(self, text, limit=None, after=None):
+        """returns the (score, obj) of the saved places and reviews whose
+        text holds one of the tokens of text, ranked by the BM25 of FTS5,
+        at most limit of them, after the (score, class name, id) after if
+        given"""
+        terms = sorted(set(tokens(text)))
+        if not terms:
+            return []
+        if not self.__fts:
+            return self.__scan_texts(terms, limit, after)
+        where, params = "", [" OR ".join('"{}"'.format(t) for t in terms)]
+        if after is not None:
+            where = "WHERE score < ? OR (score = ? AND (name, id) > (?, ?))"
+            params += [after[0], after[0], after[1], after[2]]
+        if limit is not None:
+            params.append(limit)
+        rows = self.__connection().execute(
+            "SELECT score, name, id FROM (SELECT -bm25(texts) AS score, "
+            "text_ids.class AS name, text_ids.id AS id FROM texts JOIN "
+            "text_ids ON text_ids.rowid = texts.rowid WHERE texts MATCH ?) "
+            "{} ORDER BY score DESC, name, id{}".format(
+                where, "" if limit is None else " LIMIT ?"),
+            params).fetchall()
+        return self.__scored(rows)
+
+    def autocomplete(self, prefix, limit=None):
+        """returns the (value, class name, id) of the saved states, cities
+        and amenities whose name starts with prefix, ignoring case and
+        accents, sorted by name, at most limit of them, through the
+        PrefixIndex of each class, built from the database when missing or
+        older than HBNB_PREFIX_INDEX_TTL"""
+        indexes = {}
+        with self.__prefixes_lock:
+            for name, attribute in prefixes.items():
+                index, built = self.__prefixes.get(name, (None, 0))
+                if index is None or monotonic() - built > self.__prefix_ttl:
+                    index = PrefixIndex(attribute)
+                    rows = self.__connection().execute(
+                        "SELECT id, json_extract(data, ?) FROM {}".format(
+                            tables[name][0]), ['$."{}"'.format(attribute)])
+                    for id, value in rows:
+                        index.put(id, value)
+                    self.__prefixes[name] = (index, monotonic())
+                indexes[name] = index
+            return complete(indexes, prefix, limit)
+
+    def page(self, cls, limit, after=None, attribute=None, value=None):
+        """returns the list of the first limit cls objects, whose attribute
+        is value if given, sorted by (created_at, id) after the key after"""
+        name = cls if isinstance(cls, str) else getattr(cls, "__name__", "")
+        if name not in classes:
+            return []
+        table, columns = tables[name]
+        if attribute is not None and attribute not in columns:
+            objs = self.related(name, attribute, value)
+            return SortedIndex(objs).page(limit, after)
+        where, params = [], []
+        if attribute is not None:
+            where.append(attribute + " = ?")
+            params.append(value)
+        if after is not None:
+            where.append("(created_at > ? OR (created_at = ? AND id > ?))")
+            params += [after[0], after[0], after[1]]
+        prefix = name + '.'
+        pending = {key: obj for key, obj in self.__session()[1].items()
+                   if key.startswith(prefix)}
+        rows = self.__connection().execute(
+            "SELECT id, data FROM {} {} ORDER BY created_at, id LIMIT ?".
+            format(table, "WHERE " + " AND ".join(where) if where else ""),
+            params + [limit + len(pending)])
+        objs = [self.__load(row[1]) for row in rows
+                if prefix + row[0] not in pending]
+        objs += [obj for obj in pending.values() if obj is not None and
+                 (attribute is None or
+                  getattr(obj, attribute, None) == value)]
+        return SortedIndex(objs).page(limit, after)
+
+    def pool_stats(self):
+        """returns None, each thread having its own connection rather than
+        one from a pool"""
+        return None
+
+    def cache_stats(self):
+        """returns None, SQLiteStorage caching no objects across threads"""
+        return None
+
+    def close(self):
+        """forgets the objects this thread loaded and its unsaved changes"""
+        self.__local.session = ({}, {})
+
+    def __connection(self):
+        """returns the connection of the calling thread, opening it in WAL
+        mode on first use"""
+        conn = getattr(self.__local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.__path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.__local.conn = conn
+        return conn
+
+    def __session(self):
+        """returns the (identity map, pending changes) of the calling thread,
+        both maps of <class name>.id to obj (None for a pending delete)"""
+        session = getattr(self.__local, "session", None)
+        if session is None:
+            session = self.__local.session = ({}, {})
+        return session
+
+    def __places_within(self, boxes):
+        """returns the list of the places within one of the boxes"""
+        places = {}
+        for box in boxes:
+            for south, west, north, east in split(*box):
+                for place in self.query(Place, latitude__gte=south,
+                                        latitude__lte=north,
+                                        longitude__gte=west,
+                                        longitude__lte=east):
+                    places[place.id] = place
+        return list(places.values())
+
+    def __entries_within(self, box):
+        """returns the TileCache entries of the saved places within box"""
+        south, west, north, east = box
+        price = self.__tiles.attributes[2]
+        rows = self.__connection().execute(
+            "SELECT {0}, {1}, COALESCE(json_extract(data, ?), ?) FROM "
+            "places WHERE {0} BETWEEN ? AND ? AND {1} BETWEEN ? AND ?".format(
+                *locations["Place"]),
+            ['$."{}"'.format(price), getattr(Place, price),
+             south, north, west, east])
+        return (TileCache.located(*row) for row in rows)
+
+    def __entry(self, conn, id):
+        """returns the TileCache entry of the place id as saved, None if
+        it is not"""
+        price = self.__tiles.attributes[2]
+        row = conn.execute(
+            "SELECT {}, {}, COALESCE(json_extract(data, ?), ?) FROM places "
+            "WHERE id = ?".format(*locations["Place"]),
+            ['$."{}"'.format(price), getattr(Place, price), id]).fetchone()
+        return row and TileCache.located(*row)
+
+    def __create_texts(self, conn):
+        """creates the FTS5 table of the texts, filling it with those of
+        the objects already saved when it is new"""
+        new = conn.execute("SELECT 1 FROM sqlite_master WHERE name = "
+                           "'texts'").fetchone() is None
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS texts USING "
+                         "fts5(body)")
+        except sqlite3.OperationalError:
+            SQLiteStorage.__fts = False
+            return
+        conn.execute("CREATE TABLE IF NOT EXISTS text_ids (rowid INTEGER "
+                     "PRIMARY KEY, class TEXT NOT NULL, id TEXT NOT NULL, "
+                     "UNIQUE (class, id))")
+        if new:
+            for name, attributes in texts.items():
+                for id, data in conn.execute("SELECT id, data FROM {}".
+                                             format(tables[name][0])):
+                    values = json.loads(data)
+                    self.__put_text(conn, name, id, [
+                        values.get(attribute, getattr(classes[name],
+                                                      attribute, None))
+                        for attribute in attributes])
+
+    @staticmethod
+    def __put_text(conn, name, id, values):
+        """replaces the text of the object id of the class name by the
+        strings of values, deleting it if values is None"""
+        row = conn.execute("SELECT rowid FROM text_ids WHERE class = ? AND "
+                           "id = ?", (name, id)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM texts WHERE rowid = ?", row)
+            if values is None:
+                conn.execute("DELETE FROM text_ids WHERE rowid = ?", row)
+                return
+        if values is None:
+            return
+        if row is None:
+            row = (conn.execute("INSERT INTO text_ids (class, id) VALUES "
+                                "(?, ?)", (name, id)).lastrowid,)
+        conn.execute("INSERT INTO texts (rowid, body) VALUES (?, ?)",
+                     (row[0], " ".join(value for value in values
+                                       if isinstance(value, str))))
+
+    def __scan_texts(self, terms, limit, after):
+        """returns the ranked (score, obj) of the objects whose text holds
+        one of the terms, indexing every saved text in a TextIndex first"""
+        scored = []
+        for name, attributes in texts.items():
+            index = TextIndex(attributes)
+            for id, data in self.__connection().execute(
+                    "SELECT id, data FROM {}".format(tables[name][0])):
+                values = json.loads(data)
+                index.put(id, [values.get(attribute, getattr(
+                    classes[name], attribute, None))
+                    for attribute in attributes])
+            scored.extend((score, name, id, (name, id))
+                          for id, score in index.scores(terms).items())
+        return self.__scored([(score, name, id) for score, (name, id)
+                              in rank(scored, limit, after)])
+
+    def __scored(self, rows):
+        """returns the (score, obj) of the (score, class name, id) rows, in
+        the same order, leaving out the objects deleted since"""
+        objs = {}
+        for name in texts:
+            ids = [id for score, other, id in rows if other == name]
+            if ids:
+                objs.update((name + '.' + obj.id, obj)
+                            for obj in self.query(name, id__in=ids))
+        return [(score, objs[name + '.' + id]) for score, name, id in rows
+                if name + '.' + id in objs]
+
+    @staticmethod
+    def __number(value):
+        """returns value if it is a number, None otherwise"""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+        return None
+
+    @staticmethod
+    def __sql_value(value):
+        """returns value as stored in the database, or None if SQLite can't
+        compare it like Python does"""
+        if isinstance(value, datetime):
+            return value.strftime(time)
+        if isinstance(value, (str, int, float)):
+            return value
+        return None
+
+    def __load(self, data):
+        """returns the object stored as data, the one this thread already
+        holds if any so its unsaved changes are kept"""
+        values = json.loads(data)
+        identity = self.__session()[0]
+        key = values["__class__"] + '.' + values["id"]
+        obj = identity.get(key)
+        if obj is None:
+            obj = classes[values["__class__"]](**values)
+            identity[key] = obj
+        return obj
@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+"""
+Contains the tokenizer and the BM25 ranking of the full-text search of
+storage.search(), and the TextIndex kept by FileStorage for it
+
+Text is cut into tokens, the runs of letters and digits, lowercased and
+stripped of their accents as the unicode61 tokenizer of SQLite FTS5 does.
+A search ranks the objects holding at least one of its tokens by BM25.
+"""
+
+from heapq import nsmallest
+from math import log
+import re
+import unicodedata
+
+# float - BM25 term frequency saturation and length normalization, the
+# values SQLite FTS5 and most engines use
+K1 = 1.2
+B = 0.75
+WORD = re.compile(r"[^\W_]+")
+
+
+def fold(text):
+    """returns text lowercased and stripped of its accents"""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def tokens(text):
+    """returns the list of the tokens of text, [] if it is not a string"""
+    if not isinstance(text, str):
+        return []
+    return WORD.findall(fold(text))
+
+
+def rank(scored, limit=None, after=None):
+    """returns the list of the (score, obj) of the (score, class name, id,
+    obj) scored, by decreasing score then by class name and id, only those
+    coming after the (score, class name, id) after if given, at most limit
+    of them"""
+    if after is not None:
+        bound = (-after[0], after[1], after[2])
+        scored = (item for item in scored
+                  if (-item[0], item[1], item[2]) > bound)
+    key = (lambda item: (-item[0], item[1], item[2]))
+    if limit is None:
+        found = sorted(scored, key=key)
+    else:
+        found = nsmallest(limit, scored, key=key)
+    return [(item[0], item[3]) for item in found]
+
+
+class TextIndex:
+    """inverted index of the tokens of text attributes of the objects of a
+    class, like Review.text, mapping each token to the posting list of the
+    objects holding it with its frequency in them, so that a search only
+    goes through the postings of its tokens"""
+
+    def __init__(self, attributes):
+        """Instantiate an empty index of the tokens of attributes"""
+        self.attributes = tuple(attributes)
+        # dictionary - token -> {id: number of times the object holds it}
+        self.__postings = {}
+        # dictionary - id -> the tuple of the values each object was
+        # indexed with, their tokens being those to take out of the index
+        self.__values = {}
+        # dictionary - id -> number of tokens of each object
+        self.__lengths = {}
+        # integer - total number of tokens of the objects
+        self.__length = 0
+
+    def __len__(self):
+        """returns the number of objects indexed"""
+        return len(self.__lengths)
+
+    def add(self, obj):
+        """indexes the tokens of obj, those of its old values out"""
+        values = tuple(getattr(obj, attribute, None)
+                       for attribute in self.attributes)
+        if self.__values.get(obj.id) != values:
+            self.put(obj.id, values)
+
+    def discard(self, obj):
+        """stops indexing obj"""
+        self.remove(obj.id)
+
+    def stale(self, obj):
+        """tells whether one of obj's attributes changed since it was
+        indexed"""
+        return self.__values.get(obj.id) != tuple(
+            getattr(obj, attribute, None) for attribute in self.attributes)
+
+    def put(self, id, values):
+        """indexes the tokens of values as those of the object id"""
+        self.remove(id)
+        terms = self.__count(values)
+        self.__values[id] = tuple(values)
+        self.__lengths[id] = sum(terms.values())
+        for token, count in terms.items():
+            postings = self.__postings.get(token)
+            if postings is None:
+                postings = self.__postings[token] = {}
+            postings[id] = count
+            self.__length += count
+
+    def remove(self, id):
+        """stops indexing the object id"""
+        values = self.__values.pop(id, None)
+        if values is None:
+            return
+        del self.__lengths[id]
+        for token, count in self.__count(values).items():
+            postings = self.__postings[token]
+            del postings[id]
+            if not postings:
+                del self.__postings[token]
+            self.__length -= count
+
+    def scores(self, terms):
+        """returns the {id: BM25 score} of the objects holding one of the
+        terms"""
+        total = len(self.__lengths)
+        if not total:
+            return {}
+        average = self.__length / total
+        lengths = self.__lengths
+        scores = {}
+        for term in set(terms):
+            postings = self.__postings.get(term)
+            if not postings:
+                continue
+            idf = log(1 + (total - len(postings) + 0.5) /
+                      (len(postings) + 0.5))
+            for id, count in postings.items():
+                norm = K1 * (1 - B + B * lengths[id] / average)
+                scores[id] = (scores.get(id, 0.0) +
+                              idf * count * (K1 + 1) / (count + norm))
+        return scores
+
+    @staticmethod
+    def __count(values):
+        """returns the {token: frequency} of the tokens of values"""
+        terms = {}
+        for value in values:
+            for token in tokens(value):
+                terms[token] = terms.get(token, 0) + 1
+        return terms
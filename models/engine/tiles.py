@@ -0,0 +1,256 @@
+#!/usr/bin/python3
+"""
+Contains the tiles of the map clustering of places, and the TileCache
+keeping the cluster of each tile
+
+Tiles are the Web Mercator tiles of the map front end: at level z the map
+is cut into 2**z by 2**z tiles, x growing eastward and y southward. The
+clusters shown at zoom z are those of the tiles of level z + CELL_ZOOM, a
+quarter of a map tile wide. The top and bottom rows of tiles reach the
+poles, so every place falls in a tile.
+"""
+
+from math import atan, cos, degrees, floor, log, pi, radians, sinh, tan
+from models.engine.geo import point, split
+import threading
+import time
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# integer - the clusters of zoom z are the tiles of level z + CELL_ZOOM
+CELL_ZOOM = 2
+# integer - deepest zoom level of the map
+MAX_ZOOM = 20
+# float - latitudes beyond are drawn on the edge rows of the map
+MAX_LATITUDE = 85.0511287798
+
+
+def tile(latitude, longitude, level):
+    """returns the (x, y) of the tile of level holding the point"""
+    n = 2 ** level
+    latitude = max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude))
+    x = floor((longitude + 180) / 360 * n)
+    rad = radians(latitude)
+    y = floor((1 - log(tan(rad) + 1 / cos(rad)) / pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def bounds(x, y, level):
+    """returns the (south, west, north, east) box of a tile"""
+    n = 2 ** level
+    north = 90.0 if y == 0 else degrees(atan(sinh(pi * (1 - 2 * y / n))))
+    south = (-90.0 if y == n - 1 else
+             degrees(atan(sinh(pi * (1 - 2 * (y + 1) / n)))))
+    return south, x / n * 360 - 180, north, (x + 1) / n * 360 - 180
+
+
+def spans(south, west, north, east, level):
+    """returns the (x1, y1, x2, y2) ranges of the tiles of level overlapping
+    the box, one per part of the box split at the antimeridian"""
+    return [tile(n, w, level) + tile(s, e, level)
+            for s, w, n, e in split(south, west, north, east)]
+
+
+def count(south, west, north, east, level):
+    """returns the number of the tiles of level overlapping the box"""
+    return sum((x2 - x1 + 1) * (y2 - y1 + 1)
+               for x1, y1, x2, y2 in spans(south, west, north, east, level))
+
+
+def covering(south, west, north, east, level):
+    """returns the lists of the (x, y) of the tiles of level overlapping the
+    box, one list per part of the box split at the antimeridian"""
+    return [[(x, y) for y in range(y1, y2 + 1) for x in range(x1, x2 + 1)]
+            for x1, y1, x2, y2 in spans(south, west, north, east, level)]
+
+
+class TileCache:
+    """caches the (count, sum of latitudes, sum of longitudes, min price) of
+    the places of each tile asked for, from which its cluster is drawn.
+    update() keeps them in step with the places, the min price being
+    forgotten when the cheapest place of a tile leaves it. FileStorage
+    keeps one as the index ("tiles", None) of the places, the SQL engines
+    feed it their changes and only trust it for ttl seconds, as other
+    processes may change the database"""
+
+    def __init__(self, size=100000, ttl=None, latitude="latitude",
+                 longitude="longitude", price="price_by_night"):
+        """Instantiate an empty cache of at most size tiles"""
+        self.size = size
+        self.ttl = ttl
+        self.attributes = (latitude, longitude, price)
+        # dictionary - (level, x, y) -> [count, sum of latitudes, sum of
+        # longitudes, min price or None, time it was computed]
+        self.__tiles = {}
+        # dictionary - id -> the entry each object was counted as
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    def entry(self, obj):
+        """returns the (latitude, longitude, price) of obj, None if it is
+        not located, its price being None if it is not a number"""
+        latitude, longitude, price = (getattr(obj, attribute, None)
+                                      for attribute in self.attributes)
+        return self.located(latitude, longitude, price)
+
+    @staticmethod
+    def located(latitude, longitude, price):
+        """returns the entry of a place at (latitude, longitude) priced
+        price, None if it is not located"""
+        location = point(latitude, longitude)
+        if location is None:
+            return None
+        if not isinstance(price, (int, float)) or isinstance(price, bool):
+            price = None
+        return location + (price,)
+
+    def add(self, obj):
+        """counts obj in the tiles of its current entry, out of those of
+        the entry it was counted as if it changed"""
+        new = self.entry(obj)
+        old = self.__entries.get(obj.id)
+        self.__entries[obj.id] = new
+        if old != new:
+            self.update(old, new)
+
+    def discard(self, obj):
+        """stops counting obj"""
+        if obj.id in self.__entries:
+            self.update(self.__entries.pop(obj.id), None)
+
+    def stale(self, obj):
+        """tells whether obj's entry changed since it was counted"""
+        return self.__entries.get(obj.id, self) != self.entry(obj)
+
+    def update(self, old, new):
+        """moves a place from the tiles of the entry old to those of the
+        entry new, either being None for a place added or removed"""
+        if not self.__tiles or old == new:
+            return
+        with self.__lock:
+            for level in range(CELL_ZOOM, MAX_ZOOM + CELL_ZOOM + 1):
+                if old is not None:
+                    self.__remove(level, old)
+                if new is not None:
+                    key = (level,) + tile(new[0], new[1], level)
+                    cached = self.__tiles.get(key)
+                    if cached is not None:
+                        self.__count(cached, new)
+
+    def clusters(self, south, west, north, east, zoom, find):
+        """returns the {"count", "latitude", "longitude", "min_price"} of
+        the places of each tile of level zoom + CELL_ZOOM overlapping the
+        box holding one, their count, centroid and min price. find(box)
+        returns the entries of the places within a box not crossing the
+        antimeridian, at least, or the NumPy array of their rows with NaN
+        for the prices that are not numbers, and is only called for the
+        tiles not cached"""
+        level = zoom + CELL_ZOOM
+        now = time.monotonic()
+        clusters = []
+        for part in covering(south, west, north, east, level):
+            with self.__lock:
+                found = {key: self.__tiles.get((level,) + key)
+                         for key in part}
+                found = {key: cached and tuple(cached)
+                         for key, cached in found.items()}
+            missing = {key for key, cached in found.items()
+                       if cached is None or (self.ttl is not None and
+                                             now - cached[4] > self.ttl)}
+            if missing:
+                computed = self.__compute(level, missing, find, now)
+                with self.__lock:
+                    while self.__tiles and \
+                            len(self.__tiles) + len(computed) > self.size:
+                        del self.__tiles[next(iter(self.__tiles))]
+                    for key, cached in computed.items():
+                        self.__tiles[(level,) + key] = cached
+                        found[key] = tuple(cached)
+            for key in part:
+                count, latitudes, longitudes, price, stamp = found[key]
+                if count:
+                    clusters.append({"count": count,
+                                     "latitude": latitudes / count,
+                                     "longitude": longitudes / count,
+                                     "min_price": price})
+        return clusters
+
+    def __compute(self, level, missing, find, now):
+        """returns the {(x, y): aggregate} of the missing tiles of level,
+        going once through the places within the box they span"""
+        boxes = [bounds(x, y, level) for x, y in missing]
+        margin = 1e-9
+        box = (max(-90.0, min(b[0] for b in boxes) - margin),
+               max(-180.0, min(b[1] for b in boxes) - margin),
+               min(90.0, max(b[2] for b in boxes) + margin),
+               min(180.0, max(b[3] for b in boxes) + margin))
+        computed = {key: [0, 0.0, 0.0, None, now] for key in missing}
+        entries = find(box)
+        if numpy is not None and isinstance(entries, numpy.ndarray):
+            self.__compute_rows(level, computed, entries)
+            return computed
+        for entry in entries:
+            if entry is None:
+                continue
+            cached = computed.get(tile(entry[0], entry[1], level))
+            if cached is not None:
+                self.__count(cached, entry)
+        return computed
+
+    @staticmethod
+    def __compute_rows(level, computed, rows):
+        """fills the computed aggregates from the NumPy array of the
+        (latitude, longitude, price) of places, tiles computed at once"""
+        latitudes, longitudes, prices = rows.T
+        n = 2 ** level
+        x = numpy.floor((longitudes + 180) / 360 * n)
+        rad = numpy.radians(numpy.clip(latitudes, -MAX_LATITUDE,
+                                       MAX_LATITUDE))
+        y = numpy.floor((1 - numpy.log(numpy.tan(rad) + 1 / numpy.cos(rad)) /
+                         pi) / 2 * n)
+        keys = (numpy.clip(y, 0, n - 1).astype(numpy.int64) * n +
+                numpy.clip(x, 0, n - 1).astype(numpy.int64))
+        keys, inverse = numpy.unique(keys, return_inverse=True)
+        counts = numpy.bincount(inverse)
+        sums = (numpy.bincount(inverse, weights=latitudes),
+                numpy.bincount(inverse, weights=longitudes))
+        lows = numpy.full(len(keys), numpy.inf)
+        numpy.fmin.at(lows, inverse, prices)
+        for i, key in enumerate(keys.tolist()):
+            cached = computed.get((key % n, key // n))
+            if cached is None:
+                continue
+            low = float(lows[i])
+            # prices are integers, the array holding them as floats
+            low = (None if low == numpy.inf else
+                   int(low) if low.is_integer() else low)
+            cached[:4] = [int(counts[i]), float(sums[0][i]),
+                          float(sums[1][i]), low]
+
+    def __remove(self, level, entry):
+        """takes the place of entry out of its cached tile of level,
+        forgetting the tile if the place may have been its cheapest"""
+        key = (level,) + tile(entry[0], entry[1], level)
+        cached = self.__tiles.get(key)
+        if cached is None:
+            return
+        price = entry[2]
+        if price is not None and cached[3] is not None and \
+                price <= cached[3]:
+            del self.__tiles[key]
+            return
+        cached[0] -= 1
+        cached[1] -= entry[0]
+        cached[2] -= entry[1]
+
+    @staticmethod
+    def __count(cached, entry):
+        """counts the place of entry in the cached aggregate of a tile"""
+        cached[0] += 1
+        cached[1] += entry[0]
+        cached[2] += entry[1]
+        if entry[2] is not None and (cached[3] is None or
+                                     entry[2] < cached[3]):
+            cached[3] = entry[2]
@@ -14,6 +14,8 @@ class Review(BaseModel, Base):
         place_id = Column(String(60), ForeignKey('places.id'), nullable=False)
         user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
         text = Column(String(1024), nullable=False)
+        # tuple - columns searched by storage.search()
+        full_text = ("text",)
     else:
         place_id = ""
         user_id = ""
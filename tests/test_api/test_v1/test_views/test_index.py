@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""
+Contains the TestIndexDocs and TestIndexViews classes
+"""
+
+from api.v1.app import app
+from api.v1.views import index
+import inspect
+import models
+from models import storage
+from models.state import State
+import pep8
+import unittest
+
+
+class TestIndexDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the index views"""
+    def test_pep8_conformance_index(self):
+        """Test that api/v1/views/index.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/views/index.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_index(self):
+        """Test tests/test_api/test_v1/test_views/test_index.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_api/test_v1/test_views/\
+test_index.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_index_docstrings(self):
+        """Test for the module and function docstrings"""
+        self.assertTrue(index.__doc__)
+        for func in inspect.getmembers(index, inspect.isfunction):
+            if func[1].__module__ == index.__name__:
+                self.assertTrue(func[1].__doc__,
+                                "{:s} needs a docstring".format(func[0]))
+
+
+class TestIndexViews(unittest.TestCase):
+    """Test the status and stats views"""
+    def setUp(self):
+        """creates a test client"""
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """closes the storage session"""
+        storage.close()
+
+    def test_status(self):
+        """Test that status is OK"""
+        response = self.client.get("/api/v1/status")
+        self.assertEqual(response.get_json(), {"status": "OK"})
+
+    def test_stats(self):
+        """Test that stats counts the objects of every class exactly,
+        approximately when asked to"""
+        self.client.get("/api/v1/stats?approximate=1")
+        state = State(name="Stats Test")
+        storage.new(state)
+        storage.save()
+        try:
+            stats = self.client.get("/api/v1/stats").get_json()
+            self.assertEqual(set(stats), set(index.classes))
+            for name, cls in index.classes.items():
+                self.assertEqual(stats[name], storage.count(cls))
+            stats = self.client.get("/api/v1/stats?approximate=1")
+            self.assertEqual(stats.status_code, 200)
+            self.assertEqual(set(stats.get_json()), set(index.classes))
+            for value in ["true", "2", ""]:
+                response = self.client.get("/api/v1/stats",
+                                           query_string={"approximate":
+                                                         value})
+                self.assertEqual(response.status_code, 400)
+        finally:
+            storage.delete(storage.get(State, state.id))
+            storage.save()
+
+    def test_pool_stats(self):
+        """Test that stats/pool is found only for DBStorage"""
+        response = self.client.get("/api/v1/stats/pool")
+        if models.storage_t != 'db':
+            self.assertEqual(response.status_code, 404)
+        else:
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("checkouts", response.get_json())
+
+    def test_cache_stats(self):
+        """Test that stats/cache is found only when the cache is on"""
+        response = self.client.get("/api/v1/stats/cache")
+        if storage.cache_stats() is None:
+            self.assertEqual(response.status_code, 404)
+        else:
+            self.assertEqual(set(response.get_json()),
+                             {"size", "capacity", "ttl", "hits", "misses",
+                              "evictions"})
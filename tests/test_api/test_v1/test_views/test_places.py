@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+"""
+Contains the TestPlacesDocs and TestPlacesViews classes
+"""
+
+from api.v1.app import app
+from api.v1.views import places
+import inspect
+from models import storage
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+import pep8
+import unittest
+
+
+class TestPlacesDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the places views"""
+    def test_pep8_conformance_places(self):
+        """Test that api/v1/views/places.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/views/places.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_places(self):
+        """Test tests/test_api/test_v1/test_views/test_places.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_api/test_v1/test_views/\
+test_places.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_places_docstrings(self):
+        """Test for the module and function docstrings"""
+        self.assertTrue(places.__doc__)
+        for func in inspect.getmembers(places, inspect.isfunction):
+            if func[1].__module__ == places.__name__:
+                self.assertTrue(func[1].__doc__,
+                                "{:s} needs a docstring".format(func[0]))
+
+
+class TestPlacesViews(unittest.TestCase):
+    """Test the search, geographic and filtered lists of places"""
+    def setUp(self):
+        """creates 3 places near (-80, 100), far from any other test"""
+        self.client = app.test_client()
+        self.state = State(name="Views Test")
+        self.city = City(name="Views City", state_id=self.state.id)
+        self.user = User(email="views@test.io", password="pwd")
+        self.places = [Place(name=str(i), city_id=self.city.id,
+                             user_id=self.user.id, price_by_night=10 * i,
+                             latitude=-80.0 - i / 100, longitude=100.0)
+                       for i in range(3)]
+        self.objs = [self.state, self.city, self.user] + self.places
+        for obj in self.objs:
+            storage.new(obj)
+        storage.save()
+
+    def tearDown(self):
+        """deletes the objects created"""
+        for obj in reversed(self.objs):
+            obj = storage.get(type(obj), obj.id)
+            if obj is not None:
+                storage.delete(obj)
+        storage.save()
+        storage.close()
+
+    def get(self, url, **args):
+        """returns the status and JSON of GET /api/v1/url with the
+        arguments"""
+        response = self.client.get("/api/v1/" + url, query_string=args)
+        return response.status_code, response.get_json(silent=True)
+
+    def ids(self, objs):
+        """returns the ids of the dictionaries objs"""
+        return [obj["id"] for obj in objs]
+
+    def test_places_search(self):
+        """Test that places_search filters by state and city and checks
+        its body"""
+        for body in [{"states": [self.state.id]},
+                     {"cities": [self.city.id]},
+                     {"states": [self.state.id], "cities": ["missing"]}]:
+            response = self.client.post("/api/v1/places_search", json=body)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sorted(self.ids(response.get_json())),
+                             sorted(place.id for place in self.places))
+        response = self.client.post("/api/v1/places_search",
+                                    json={"cities": ["missing"]})
+        self.assertEqual(response.get_json(), [])
+        for body in [{"states": self.state.id}, {"cities": [1]}, []]:
+            response = self.client.post("/api/v1/places_search", json=body)
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/v1/places_search", data="{",
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_near(self):
+        """Test that places/near returns the places nearest first, with
+        their distance"""
+        status, found = self.get("places/near", lat=-80, lng=100,
+                                 radius_km=50)
+        self.assertEqual(status, 200)
+        self.assertEqual(self.ids(found),
+                         [place.id for place in self.places])
+        self.assertEqual([round(place["distance_km"]) for place in found],
+                         [0, 1, 2])
+        status, found = self.get("places/near", lat=-80, lng=100,
+                                 radius_km=50, limit=1)
+        self.assertEqual(self.ids(found), [self.places[0].id])
+        for args in [{"lng": 100, "radius_km": 50},
+                     {"lat": -91, "lng": 100, "radius_km": 50},
+                     {"lat": -80, "lng": 100, "radius_km": -1},
+                     {"lat": -80, "lng": "east", "radius_km": 50},
+                     {"lat": -80, "lng": 100, "radius_km": 50,
+                      "limit": 0}]:
+            self.assertEqual(self.get("places/near", **args)[0], 400)
+
+    def test_bbox(self):
+        """Test that places/bbox returns the places within the box"""
+        status, found = self.get("places/bbox", south=-80.015, west=99,
+                                 north=-79, east=101)
+        self.assertEqual(status, 200)
+        self.assertEqual(sorted(self.ids(found)),
+                         sorted(place.id for place in self.places[:2]))
+        for args in [{"south": -79, "west": 99, "north": -80, "east": 101},
+                     {"south": -81, "west": 99, "north": -79},
+                     {"south": -81, "west": 181, "north": -79, "east": 1}]:
+            self.assertEqual(self.get("places/bbox", **args)[0], 400)
+
+    def test_clusters(self):
+        """Test that places/clusters counts the places of each tile"""
+        status, found = self.get("places/clusters", south=-81, west=99,
+                                 north=-79, east=101, zoom=0)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(found), 1)
+        self.assertAlmostEqual(found[0].pop("latitude"), -80.01)
+        self.assertEqual(found[0], {"count": 3, "longitude": 100.0,
+                                    "min_price": 0})
+        for zoom in ["x", -1, 100]:
+            self.assertEqual(self.get("places/clusters", south=-81, west=99,
+                                      north=-79, east=101, zoom=zoom)[0],
+                             400)
+        self.assertEqual(self.get("places/clusters", south=-90, west=-180,
+                                  north=90, east=180, zoom=10)[0], 400)
+
+    def test_city_places_filters(self):
+        """Test that the places of a city are filtered, sorted, counted
+        and paged"""
+        url = "cities/{}/places".format(self.city.id)
+        status, found = self.get(url, price_by_night__gte=10,
+                                 sort="-price_by_night")
+        self.assertEqual(status, 200)
+        self.assertEqual(self.ids(found),
+                         [self.places[2].id, self.places[1].id])
+        self.assertEqual(self.get(url, stats="price_by_night")[1],
+                         {"count": 3, "min": 0, "max": 20, "mean": 10.0})
+        status, page = self.get(url, limit=2)
+        self.assertEqual(len(page["results"]), 2)
+        status, rest = self.get(url, limit=2, cursor=page["next_cursor"])
+        self.assertEqual((len(rest["results"]), rest["next_cursor"]),
+                         (1, None))
+        for args in [{"price_by_night__ne": 1}, {"max_guest": "four"},
+                     {"sort": "name"}, {"stats": "name"},
+                     {"sort": "price_by_night", "cursor": "x"}]:
+            self.assertEqual(self.get(url, **args)[0], 400)
+        self.assertEqual(self.get("cities/missing/places")[0], 404)
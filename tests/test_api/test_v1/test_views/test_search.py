@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+"""
+Contains the TestSearchDocs and TestSearchViews classes
+"""
+
+from api.v1.app import app
+import importlib
+import inspect
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+import pep8
+import unittest
+from werkzeug.exceptions import BadRequest
+# the module, its name being shadowed in api.v1.views by the search view
+search = importlib.import_module("api.v1.views.search")
+
+
+class TestSearchDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the search views"""
+    def test_pep8_conformance_search(self):
+        """Test that api/v1/views/search.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/views/search.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_search(self):
+        """Test tests/test_api/test_v1/test_views/test_search.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_api/test_v1/test_views/\
+test_search.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_search_docstrings(self):
+        """Test for the module and function docstrings"""
+        self.assertTrue(search.__doc__)
+        for func in inspect.getmembers(search, inspect.isfunction):
+            if func[1].__module__ == search.__name__:
+                self.assertTrue(func[1].__doc__,
+                                "{:s} needs a docstring".format(func[0]))
+
+
+class TestSearchViews(unittest.TestCase):
+    """Test the full-text search and the autocomplete"""
+    def setUp(self):
+        """creates a place and reviews holding a word no other test uses,
+        and names starting with Qzv"""
+        self.client = app.test_client()
+        self.state = State(name="Qzvland")
+        self.city = City(name="qzvtown", state_id=self.state.id)
+        self.amenity = Amenity(name="Qzvé pool")
+        self.user = User(email="search-views@test.io", password="pwd")
+        self.place = Place(name="Loft", city_id=self.city.id,
+                           user_id=self.user.id,
+                           description="A quokkafish on the roof")
+        self.reviews = [Review(text=text, place_id=self.place.id,
+                               user_id=self.user.id)
+                        for text in ["Quokkafish, quokkafish, quokkafish!",
+                                     "We saw a quokkafish"]]
+        self.objs = [self.state, self.city, self.amenity, self.user,
+                     self.place] + self.reviews
+        for obj in self.objs:
+            storage.new(obj)
+        storage.save()
+
+    def tearDown(self):
+        """deletes the objects created"""
+        for obj in reversed(self.objs):
+            obj = storage.get(type(obj), obj.id)
+            if obj is not None:
+                storage.delete(obj)
+        storage.save()
+        storage.close()
+
+    def get(self, url, **args):
+        """returns the status and JSON of GET /api/v1/url with the
+        arguments"""
+        response = self.client.get("/api/v1/" + url, query_string=args)
+        return response.status_code, response.get_json(silent=True)
+
+    def test_search(self):
+        """Test that search ranks the texts holding the words, and pages
+        them through next_cursor"""
+        status, found = self.get("search", q="QUOKKAFISH")
+        self.assertEqual(status, 200)
+        self.assertIsNone(found["next_cursor"])
+        results = found["results"]
+        self.assertEqual(results[0]["id"], self.reviews[0].id)
+        self.assertEqual(sorted(obj["id"] for obj in results),
+                         sorted(obj.id for obj in
+                                [self.place] + self.reviews))
+        scores = [obj["score"] for obj in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        paged = []
+        args = {"q": "quokkafish", "limit": 1}
+        while True:
+            status, page = self.get("search", **args)
+            self.assertEqual(len(page["results"]), 1)
+            paged += page["results"]
+            if page["next_cursor"] is None:
+                break
+            args["cursor"] = page["next_cursor"]
+        self.assertEqual(paged, results)
+        for args in [{}, {"q": "  "}, {"q": "quokkafish", "limit": 0},
+                     {"q": "quokkafish", "cursor": "bad"}]:
+            self.assertEqual(self.get("search", **args)[0], 400)
+
+    def test_search_cursor(self):
+        """Test that a search cursor decodes to what it was made of"""
+        cursor = search.encode_search_cursor(1.5, self.place)
+        with app.test_request_context():
+            self.assertEqual(search.decode_search_cursor(cursor),
+                             (1.5, "Place", self.place.id))
+            for bad in ["", "bad!", "WzEsMl0=", cursor[:-4]]:
+                with self.assertRaises(BadRequest):
+                    search.decode_search_cursor(bad)
+
+    def test_autocomplete(self):
+        """Test that autocomplete completes names ignoring case and
+        accents, up to the limit"""
+        status, found = self.get("autocomplete", prefix="QZV")
+        self.assertEqual(status, 200)
+        self.assertEqual(found, [
+            {"__class__": "Amenity", "id": self.amenity.id,
+             "name": "Qzvé pool"},
+            {"__class__": "State", "id": self.state.id, "name": "Qzvland"},
+            {"__class__": "City", "id": self.city.id, "name": "qzvtown"}])
+        self.assertEqual(self.get("autocomplete", prefix="qzve")[1][0]["id"],
+                         self.amenity.id)
+        self.assertEqual(len(self.get("autocomplete", prefix="qzv",
+                                      limit=2)[1]), 2)
+        for args in [{}, {"prefix": " "}, {"prefix": "qzv", "limit": 0},
+                     {"prefix": "qzv", "limit": "all"}]:
+            self.assertEqual(self.get("autocomplete", **args)[0], 400)
@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""
+Contains the TestViewsDocs and TestPagination classes
+"""
+
+from api.v1 import views
+from api.v1.app import app
+from models import storage
+from models.city import City
+from models.state import State
+import pep8
+import unittest
+from werkzeug.exceptions import BadRequest
+
+
+class TestViewsDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the views helpers"""
+    def test_pep8_conformance_test_views(self):
+        """Test tests/test_api/test_v1/test_views/test_views.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_api/test_v1/test_views/\
+test_views.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_views_docstrings(self):
+        """Test for the docstrings of the pagination helpers"""
+        for func in [views.jsonify_iter, views.encode_cursor,
+                     views.decode_cursor, views.request_limit,
+                     views.jsonify_page]:
+            self.assertTrue(func.__doc__,
+                            "{:s} needs a docstring".format(func.__name__))
+
+
+class TestPagination(unittest.TestCase):
+    """Test the cursor pagination of the lists of the API"""
+    def setUp(self):
+        """creates a state with 5 cities"""
+        self.client = app.test_client()
+        self.state = State(name="Paged")
+        self.cities = [City(name="Paged " + str(i), state_id=self.state.id)
+                       for i in range(5)]
+        for obj in [self.state] + self.cities:
+            storage.new(obj)
+        storage.save()
+
+    def tearDown(self):
+        """deletes the state and its cities"""
+        for obj in self.cities + [self.state]:
+            obj = storage.get(type(obj), obj.id)
+            if obj is not None:
+                storage.delete(obj)
+        storage.save()
+        storage.close()
+
+    def get(self, url, **args):
+        """returns the status and JSON of GET url with the arguments"""
+        response = self.client.get(url, query_string=args)
+        return response.status_code, response.get_json(silent=True)
+
+    def test_cursor_round_trip(self):
+        """Test that a cursor decodes to the key of its object"""
+        with app.test_request_context():
+            for city in self.cities:
+                cursor = views.encode_cursor(city)
+                self.assertEqual(views.decode_cursor(cursor),
+                                 views.sort_key(city))
+
+    def test_bad_cursor(self):
+        """Test that a cursor not made by encode_cursor raises 400"""
+        url = "/api/v1/states/{}/cities".format(self.state.id)
+        with app.test_request_context():
+            for cursor in ["", "not base64!", "bnVsbA==", "WzEsMl0=",
+                           views.encode_cursor(self.cities[0])[:-4]]:
+                with self.assertRaises(BadRequest):
+                    views.decode_cursor(cursor)
+        self.assertEqual(self.get(url, cursor="WzEsMl0=")[0], 400)
+
+    def test_request_limit(self):
+        """Test that limit must be a number from 1 to MAX_PAGE_LIMIT"""
+        for limit, expected in [(None, views.PAGE_LIMIT), ("1", 1),
+                                (str(views.MAX_PAGE_LIMIT),
+                                 views.MAX_PAGE_LIMIT)]:
+            args = {} if limit is None else {"limit": limit}
+            with app.test_request_context(query_string=args):
+                self.assertEqual(views.request_limit(), expected)
+        for limit in ["0", "-1", str(views.MAX_PAGE_LIMIT + 1), "ten",
+                      "1.5"]:
+            with app.test_request_context(query_string={"limit": limit}):
+                with self.assertRaises(BadRequest):
+                    views.request_limit()
+        url = "/api/v1/states/{}/cities".format(self.state.id)
+        self.assertEqual(self.get(url, limit=0)[0], 400)
+
+    def test_pages(self):
+        """Test that following next_cursor lists every object once, in
+        creation order"""
+        url = "/api/v1/states/{}/cities".format(self.state.id)
+        status, everything = self.get(url)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(everything), 5)
+        found = []
+        args = {"limit": 2}
+        while True:
+            status, page = self.get(url, **args)
+            self.assertEqual(status, 200)
+            self.assertLessEqual(len(page["results"]), 2)
+            found += [city["id"] for city in page["results"]]
+            if page["next_cursor"] is None:
+                break
+            args["cursor"] = page["next_cursor"]
+        self.assertEqual(found, [city.id for city in sorted(
+            self.cities, key=views.sort_key)])
@@ -1,12 +1,17 @@
 #!/usr/bin/python3
 """
-Contains the class TestConsoleDocs
+Contains the classes TestConsoleDocs and TestHBNBCommand
 """
 
 import console
 import inspect
+import io
+import models
+from models.place import Place
+from models.state import State
 import pep8
 import unittest
+from unittest import mock
 HBNBCommand = console.HBNBCommand
 
 
@@ -39,3 +44,48 @@ class TestConsoleDocs(unittest.TestCase):
                          "HBNBCommand class needs a docstring")
         self.assertTrue(len(HBNBCommand.__doc__) >= 1,
                         "HBNBCommand class needs a docstring")
+
+
+class TestHBNBCommand(unittest.TestCase):
+    """Test the commands of the console against the storage"""
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_destroy(self):
+        """Test that destroy removes the object from the storage"""
+        state = State(name="Destroyed")
+        models.storage.new(state)
+        models.storage.save()
+        count = models.storage.count(State)
+        with mock.patch('sys.stdout', new=io.StringIO()) as out:
+            HBNBCommand().onecmd("destroy State " + state.id)
+            HBNBCommand().onecmd("show State " + state.id)
+        self.assertEqual(out.getvalue(), "** no instance found **\n")
+        self.assertIsNone(models.storage.get(State, state.id))
+        self.assertEqual(models.storage.count(State), count - 1)
+        self.assertNotIn("State." + state.id, models.storage.all(State))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_update(self):
+        """Test that update sets the attribute of the stored object"""
+        place = Place(name="Updated")
+        models.storage.new(place)
+        models.storage.save()
+        HBNBCommand().onecmd("update Place {} max_guest 4".format(place.id))
+        self.assertEqual(models.storage.get(Place, place.id).max_guest, 4)
+        models.storage.delete(place)
+        models.storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all(self):
+        """Test that all prints the stored objects, of a class if given"""
+        state = State(name="Listed")
+        models.storage.new(state)
+        try:
+            for arg in ["", "State"]:
+                with mock.patch('sys.stdout', new=io.StringIO()) as out:
+                    HBNBCommand().onecmd("all " + arg)
+                self.assertIn(str(state), out.getvalue())
+            with mock.patch('sys.stdout', new=io.StringIO()) as out:
+                HBNBCommand().onecmd("all City")
+            self.assertNotIn(str(state), out.getvalue())
+        finally:
+            models.storage.delete(state)
@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""
+Contains the TestCacheDocs and TestLRUCache classes
+"""
+
+import inspect
+from models.engine import cache
+import pep8
+import unittest
+from unittest import mock
+LRUCache = cache.LRUCache
+
+
+class TestCacheDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the cache module"""
+    def test_pep8_conformance_cache(self):
+        """Test that models/engine/cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_cache(self):
+        """Test tests/test_models/test_engine/test_cache.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_cache_docstrings(self):
+        """Test for the module, class and method docstrings"""
+        self.assertTrue(cache.__doc__)
+        self.assertTrue(LRUCache.__doc__)
+        for func in inspect.getmembers(LRUCache, inspect.isfunction):
+            self.assertTrue(func[1].__doc__,
+                            "{:s} needs a docstring".format(func[0]))
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test the LRUCache class"""
+    def test_get_and_put(self):
+        """Test that values are found until discarded, and counted"""
+        values = LRUCache(10)
+        self.assertIsNone(values.get("a"))
+        values.put("a", 1, values.generation)
+        self.assertEqual(values.get("a"), 1)
+        values.discard("a", "b")
+        self.assertEqual(values.get("a", 0), 0)
+        self.assertEqual(values.stats(),
+                         {"size": 0, "capacity": 10, "ttl": None,
+                          "hits": 1, "misses": 2, "evictions": 0})
+
+    def test_eviction(self):
+        """Test that the least recently used values are evicted"""
+        values = LRUCache(2)
+        values.put("a", 1, values.generation)
+        values.put("b", 2, values.generation)
+        values.get("a")
+        values.put("c", 3, values.generation)
+        self.assertEqual(len(values), 2)
+        self.assertIsNone(values.get("b"))
+        self.assertEqual((values.get("a"), values.get("c")), (1, 3))
+        self.assertEqual(values.stats()["evictions"], 1)
+
+    def test_weight(self):
+        """Test that values are evicted by their total weight, and one
+        weighing more than the size is not cached"""
+        values = LRUCache(10)
+        values.put("a", 1, values.generation)
+        values.put("rows", list(range(6)), values.generation, 6)
+        self.assertEqual(values.stats()["size"], 7)
+        values.put("more", list(range(4)), values.generation, 4)
+        self.assertIsNone(values.get("a"))
+        self.assertEqual(values.stats()["size"], 10)
+        values.put("table", list(range(11)), values.generation, 11)
+        self.assertIsNone(values.get("table"))
+        self.assertEqual(len(values.get("rows")), 6)
+        values.put("rows", [], values.generation, 1)
+        values.discard("more")
+        self.assertEqual(values.stats()["size"], 1)
+        self.assertEqual(values.stats()["evictions"], 1)
+
+    def test_ttl(self):
+        """Test that values older than the ttl are dropped"""
+        values = LRUCache(10, ttl=5)
+        with mock.patch.object(cache, "monotonic", return_value=100):
+            values.put("a", 1, values.generation)
+        with mock.patch.object(cache, "monotonic", return_value=105):
+            self.assertEqual(values.get("a"), 1)
+        with mock.patch.object(cache, "monotonic", return_value=106):
+            self.assertIsNone(values.get("a"))
+        self.assertEqual(len(values), 0)
+
+    def test_generation(self):
+        """Test that a value read before an invalidation is not cached"""
+        values = LRUCache(10)
+        generation = values.generation
+        values.discard("a")
+        values.put("a", "stale", generation)
+        self.assertIsNone(values.get("a"))
+        values.put("a", "fresh", values.generation)
+        values.clear()
+        self.assertEqual(len(values), 0)
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""
+Contains the TestColumnsDocs and TestColumnStore classes
+"""
+
+import inspect
+from models.engine import columns
+from models.engine.predicates import parse
+from models.place import Place
+import pep8
+import unittest
+ColumnStore = columns.ColumnStore
+
+
+class TestColumnsDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the columns module"""
+    def test_pep8_conformance_columns(self):
+        """Test that models/engine/columns.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/columns.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_columns(self):
+        """Test tests/test_models/test_engine/test_columns.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_columns.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_columns_docstrings(self):
+        """Test for the module, class and method docstrings"""
+        self.assertTrue(columns.__doc__)
+        self.assertTrue(ColumnStore.__doc__)
+        for func in inspect.getmembers(ColumnStore, inspect.isfunction):
+            self.assertTrue(func[1].__doc__,
+                            "{:s} needs a docstring".format(func[0]))
+
+
+@unittest.skipIf(not ColumnStore.available, "NumPy is not installed")
+class TestColumnStore(unittest.TestCase):
+    """Test the ColumnStore class"""
+    def setUp(self):
+        """stores places priced 0, 10, ... 90 and one priced "free\""""
+        self.places = [Place(name=str(i), price_by_night=i * 10,
+                             max_guest=i % 3) for i in range(10)]
+        self.places.append(Place(name="free", price_by_night="free"))
+        self.store = ColumnStore(("price_by_night", "max_guest"),
+                                 self.places)
+
+    def names(self, rows):
+        """returns the names of the places in rows"""
+        ids = self.store.ids(rows)
+        return [p.name for p in self.places if p.id in ids]
+
+    def test_select(self):
+        """Test that the answered conditions are vectorized"""
+        conditions = parse({"price_by_night__gte": 20,
+                            "price_by_night__lt": 70, "max_guest": 0,
+                            "name": "3"})
+        self.assertEqual([self.store.answers(c) for c in conditions],
+                         [True, True, True, False])
+        rows, rest = self.store.select(self.store.rows(), conditions)
+        self.assertEqual(self.names(rows), ["3", "6"])
+        self.assertEqual(rest, [("name", "eq", "3")])
+        rows, rest = self.store.select(
+            self.store.rows(self.places[:5]),
+            parse({"max_guest__in": [1, 2]}))
+        self.assertEqual(self.names(rows), ["1", "2", "4"])
+        self.assertFalse(self.store.answers(("max_guest", "in", [1, "2"])))
+
+    def test_order_and_aggregate(self):
+        """Test sorts and aggregates, non-numbers last and left out"""
+        rows = self.store.order(self.store.rows(), "price_by_night", True)
+        self.assertEqual([self.store.ids(rows)[i] for i in (0, 9, 10)],
+                         [self.places[9].id, self.places[0].id,
+                          self.places[10].id])
+        self.assertEqual(self.store.aggregate(self.store.rows(),
+                                              "price_by_night"),
+                         {"count": 11, "min": 0, "max": 90, "mean": 45.0})
+        self.assertEqual(self.store.aggregate(self.store.rows([]),
+                                              "price_by_night"),
+                         {"count": 0, "min": None, "max": None,
+                          "mean": None})
+
+    def test_sync(self):
+        """Test that changes, new rows and discards are mirrored"""
+        place = self.places[4]
+        place.price_by_night = 1000
+        self.assertTrue(self.store.stale(place))
+        self.store.add(place)
+        self.assertFalse(self.store.stale(place))
+        self.store.discard(self.places[0])
+        self.store.discard(self.places[0])
+        for i in range(40):
+            self.store.add(Place(price_by_night=5))
+        self.assertEqual(len(self.store), 50)
+        self.assertEqual(self.store.aggregate(self.store.rows(),
+                                              "price_by_night")["max"], 1000)
+        rows, rest = self.store.select(self.store.rows(),
+                                       parse({"price_by_night__lt": 10}))
+        self.assertEqual(len(rows), 40)
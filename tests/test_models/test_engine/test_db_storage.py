@@ -7,6 +7,7 @@ from datetime import datetime
 import inspect
 import models
 from models.engine import db_storage
+from models.engine.cache import LRUCache
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -18,12 +19,32 @@ from models import storage
 import json
 import os
 import pep8
+from sqlalchemy import event
 import unittest
+from unittest import mock
 DBStorage = db_storage.DBStorage
 classes = {"Amenity": Amenity, "City": City, "Place": Place,
            "Review": Review, "State": State, "User": User}
 
 
+def statements(function):
+    '''Returns the result of function and the number of SQL statements
+    it ran.'''
+    engine = storage._DBStorage__engine
+    run = []
+
+    def count(conn, cursor, statement, *args):
+        '''Counts one statement.'''
+        run.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = function()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return result, len(run)
+
+
 class TestDBStorageDocs(unittest.TestCase):
     """Tests to check the documentation and style of DBStorage class"""
     @classmethod
@@ -72,18 +93,10 @@ test_db_storage.py'])
 class TestFileStorage(unittest.TestCase):
     """Test the FileStorage class"""
 
-    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
-    def setUp(self):
-        """set up for test"""
-        self.db = MySQLdb.connect(getenv("HBNB_MYSQL_HOST"),
-                                  getenv("HBNB_MYSQL_USER"),
-                                  getenv("HBNB_MYSQL_PWD"),
-                                  getenv("HBNB_MYSQL_DB"))
-        self.cursor = self.db.cursor()
-
     @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
     def tearDown(self):
-        self.close()
+        """closes the session so that each test starts a new one"""
+        storage.close()
 
     @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
     def test_all_returns_dict(self):
@@ -97,22 +110,21 @@ class TestFileStorage(unittest.TestCase):
     @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
     def test_new_DBStorage(self):
         """Tests for new() method"""
-        nb = self.cursor.execute("SELECT COUNT(*) FROM states")
         s = State(name="NSW")
         storage.new(s)
-        storage.save()
-        nb1 = self.cursor.execute("SELECT COUNT(*) FROM states")
-        self.assertEqual(nb1 - nb, 0)
+        self.assertIn("State." + s.id, storage.all(State))
+        storage.close()
+        self.assertNotIn("State." + s.id, storage.all(State))
 
     @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
     def test_save(self):
         """Test that save properly saves objects to file.json"""
-        nb = self.cursor.execute("SELECT COUNT(*) FROM states")
+        nb = storage.count(State)
         s = State(name="NSW")
         storage.new(s)
         storage.save()
-        nb1 = self.cursor.execute("SELECT COUNT(*) FROM states")
-        self.assertGreater(nb1, nb)
+        storage.close()
+        self.assertGreater(storage.count(State), nb)
 
     @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
     def test_get(self):
@@ -127,12 +139,458 @@ class TestFileStorage(unittest.TestCase):
     def test_count(self):
         '''Test count method on db_storage.'''
         test_state = State(name="Test")
-        test_user = User(name="Ada Lovelace")
-        test_place = Place(name="Test Place")
+        test_user = User(email="ada@test.io", password="pwd",
+                         first_name="Ada", last_name="Lovelace")
+        test_city = City(name="Test City", state_id=test_state.id)
+        test_place = Place(name="Test Place", city_id=test_city.id,
+                           user_id=test_user.id)
         storage.new(test_state)
         storage.new(test_user)
+        storage.new(test_city)
         storage.new(test_place)
         storage.save()
         state_count = storage.count(State)
         all_count = storage.count()
         self.assertGreaterEqual(all_count, state_count)
+
+
+@unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+class TestDBStorage(unittest.TestCase):
+    """Test the DBStorage class. It runs on any database SQLAlchemy
+    supports, in memory with HBNB_DB_URL=sqlite://"""
+    def tearDown(self):
+        """closes the session so that each test starts a new one"""
+        storage.close()
+
+    def test_iter(self):
+        '''Test iter lazily yields the same objects as all.'''
+        storage.new(State(name="Test"))
+        storage.save()
+        objs = storage.iter(State, batch_size=1)
+        self.assertNotIsInstance(objs, (list, dict))
+        self.assertEqual({"State." + obj.id for obj in objs},
+                         set(storage.all(State)))
+
+    def test_query(self):
+        '''Test query filters with equality and range predicates.'''
+        test_state = State(name="Query Test")
+        storage.new(test_state)
+        storage.save()
+        self.assertIn(test_state, storage.query(State, name="Query Test"))
+        self.assertNotIn(test_state, storage.query(
+            State, name="Query Test", created_at__lt=test_state.created_at))
+
+    def test_search_places(self):
+        '''Test search_places filters by state, city and amenities.'''
+        state = State(name="Search Test")
+        city = City(name="Search City", state_id=state.id)
+        user = User(email="search@test.io", password="pwd")
+        place = Place(name="Search Place", city_id=city.id, user_id=user.id)
+        wifi = Amenity(name="Search Wifi")
+        place.amenities.append(wifi)
+        for obj in [state, city, user, place, wifi]:
+            storage.new(obj)
+        storage.save()
+        self.assertIn(place, storage.search_places())
+        self.assertEqual(storage.search_places([state.id]), [place])
+        self.assertEqual(storage.search_places([], [city.id], [wifi.id]),
+                         [place])
+        self.assertEqual(storage.search_places([state.id], [], ["x"]), [])
+        self.assertEqual(storage.search_places([], [], [], [wifi.id, "x"]),
+                         [place])
+
+    def test_query_order_and_aggregate(self):
+        '''Test sorted, limited and aggregated queries.'''
+        state = State(name="Aggregate Test")
+        city = City(name="Aggregate City", state_id=state.id)
+        user = User(email="aggregate@test.io", password="pwd")
+        places = [Place(name=str(i), city_id=city.id, user_id=user.id,
+                        price_by_night=i * 10) for i in range(3)]
+        for obj in [state, city, user] + places:
+            storage.new(obj)
+        storage.save()
+        self.assertEqual(storage.query(Place, order_by="-price_by_night",
+                                       limit=2, city_id=city.id),
+                         [places[2], places[1]])
+        self.assertEqual(storage.aggregate(Place, "price_by_night",
+                                           city_id=city.id),
+                         {"count": 3, "min": 0, "max": 20, "mean": 10.0})
+
+    def test_places_near_and_within(self):
+        '''Test radius and box searches, across the antimeridian.'''
+        state = State(name="Geo Test")
+        city = City(name="Geo City", state_id=state.id)
+        user = User(email="geo@test.io", password="pwd")
+        places = [Place(name=name, city_id=city.id, user_id=user.id,
+                        latitude=latitude, longitude=longitude)
+                  for name, latitude, longitude in [
+                      ("east", 5.0, 179.95), ("west", 5.0, -179.9),
+                      ("far", 40.0, 10.0)]]
+        for obj in [state, city, user] + places:
+            storage.new(obj)
+        storage.save()
+        self.assertEqual([p for km, p in storage.places_near(5, 180, 50)],
+                         places[:2])
+        self.assertEqual([p for km, p in storage.places_near(5, 180, 50,
+                                                             limit=1)],
+                         places[:1])
+        self.assertEqual(sorted(p.name for p in storage.places_within(
+            4, 179, 6, -179)), ["east", "west"])
+
+    def test_place_clusters(self):
+        '''Test that clusters follow the places written.'''
+        state = State(name="Cluster Test")
+        city = City(name="Cluster City", state_id=state.id)
+        user = User(email="cluster@test.io", password="pwd")
+        places = [Place(name=str(i), city_id=city.id, user_id=user.id,
+                        latitude=-60.0 - i, longitude=-100.0,
+                        price_by_night=100 - i) for i in range(3)]
+        for obj in [state, city, user] + places:
+            storage.new(obj)
+        storage.save()
+        self.assertEqual(storage.place_clusters(-70, -110, -50, -90, 0),
+                         [{"count": 3, "latitude": -61.0,
+                           "longitude": -100.0, "min_price": 98}])
+        places[2].longitude = -95.0
+        places[0].price_by_night = 5
+        storage.save()
+        self.assertEqual(storage.place_clusters(-70, -110, -50, -90, 0),
+                         [{"count": 3, "latitude": -61.0,
+                           "longitude": -98.33333333333333,
+                           "min_price": 5}])
+        storage.delete(places[0])
+        storage.save()
+        self.assertEqual(storage.place_clusters(-70, -110, -50, -90, 0),
+                         [{"count": 2, "latitude": -61.5,
+                           "longitude": -97.5, "min_price": 98}])
+
+    def test_place_clusters_rollback(self):
+        '''Test that clusters do not follow the places flushed but rolled
+        back or closed without a commit.'''
+        state = State(name="Rollback Test")
+        city = City(name="Rollback City", state_id=state.id)
+        user = User(email="rollback@test.io", password="pwd")
+        place = Place(name="0", city_id=city.id, user_id=user.id,
+                      latitude=-60.0, longitude=100.0, price_by_night=10)
+        for obj in [state, city, user, place]:
+            storage.new(obj)
+        storage.save()
+        clusters = [{"count": 1, "latitude": -60.0, "longitude": 100.0,
+                     "min_price": 10}]
+        self.assertEqual(storage.place_clusters(-70, 90, -50, 110, 0),
+                         clusters)
+        session = storage._DBStorage__session
+        for end in [session.rollback, storage.close]:
+            storage.new(Place(name="1", city_id=city.id, user_id=user.id,
+                              latitude=-61.0, longitude=100.0,
+                              price_by_night=1))
+            session.flush()
+            end()
+            self.assertEqual(storage.place_clusters(-70, 90, -50, 110, 0),
+                             clusters)
+
+    def test_search(self):
+        '''Test that search ranks the places and reviews holding the
+        words and follows the texts written.'''
+        state = State(name="Search Test")
+        city = City(name="Search City", state_id=state.id)
+        user = User(email="search@test.io", password="pwd")
+        place = Place(name="Loft", city_id=city.id, user_id=user.id,
+                      description="Quiet xylophone loft near the beach")
+        reviews = [Review(text=text, place_id=place.id, user_id=user.id)
+                   for text in ["Xylophone, xylophone and xylophone!",
+                                "A xylophone in the garden"]]
+        for obj in [state, city, user, place] + reviews:
+            storage.new(obj)
+        storage.save()
+        found = storage.search("xylophone")
+        self.assertEqual(found[0][1], reviews[0])
+        self.assertEqual(sorted(obj.id for score, obj in found),
+                         sorted(obj.id for obj in [place] + reviews))
+        self.assertEqual(storage.search("xylophone", 1), found[:1])
+        reviews[1].text = "A garden"
+        storage.save()
+        self.assertEqual(len(storage.search("xylophone")), 2)
+
+    def test_search_without_full_text(self):
+        '''Test that search on MySQL scans the texts when the FULLTEXT
+        indexes are missing.'''
+        state = State(name="Full Text Test")
+        city = City(name="Full Text City", state_id=state.id)
+        user = User(email="full-text@test.io", password="pwd")
+        place = Place(name="Hut", city_id=city.id, user_id=user.id,
+                      description="A hut with a harpsichord")
+        for obj in [state, city, user, place]:
+            storage.new(obj)
+        storage.save()
+        dialect = storage._DBStorage__engine.dialect
+        self.assertEqual(storage._DBStorage__full_text, set())
+        with mock.patch.object(dialect, "name", "mysql"):
+            self.assertEqual([obj.id for score, obj in
+                              storage.search("harpsichord")], [place.id])
+
+    def test_search_rollback(self):
+        '''Test that search does not follow the texts flushed but rolled
+        back or closed without a commit.'''
+        state = State(name="Rollback Search")
+        city = City(name="Rollback Search City", state_id=state.id)
+        user = User(email="rollback-search@test.io", password="pwd")
+        place = Place(name="Barn", city_id=city.id, user_id=user.id,
+                      description="A barn with a glockenspiel")
+        for obj in [state, city, user, place]:
+            storage.new(obj)
+        storage.save()
+        self.assertEqual([obj.id for score, obj in
+                          storage.search("glockenspiel")], [place.id])
+        session = storage._DBStorage__session
+        for end in [session.rollback, storage.close]:
+            place = storage.get(Place, place.id)
+            place.description = "A barn"
+            session.flush()
+            end()
+            self.assertEqual([obj.id for score, obj in
+                              storage.search("glockenspiel")], [place.id])
+
+    def test_autocomplete(self):
+        '''Test that autocomplete finds the names starting with a prefix
+        and follows the names written.'''
+        state = State(name="Zanzibar Test")
+        cities = [City(name=name, state_id=state.id)
+                  for name in ["zanzibar city", "Zürich Test"]]
+        for obj in [state] + cities:
+            storage.new(obj)
+        storage.save()
+        self.assertEqual(storage.autocomplete("ZANZ"), [
+            ("zanzibar city", "City", cities[0].id),
+            ("Zanzibar Test", "State", state.id)])
+        self.assertEqual(storage.autocomplete("zanz", 1),
+                         [("zanzibar city", "City", cities[0].id)])
+        cities[1].name = "Zanzibar Town"
+        storage.delete(cities[0])
+        storage.save()
+        self.assertEqual([value for value, name, id in
+                          storage.autocomplete("zanz")],
+                         ["Zanzibar Test", "Zanzibar Town"])
+        self.assertEqual(storage.autocomplete("zur"), [])
+
+    def test_autocomplete_rollback(self):
+        '''Test that autocomplete does not follow the names flushed but
+        rolled back or closed without a commit.'''
+        state = State(name="Quasar Test")
+        storage.new(state)
+        storage.save()
+        completed = [("Quasar Test", "State", state.id)]
+        self.assertEqual(storage.autocomplete("quasar"), completed)
+        session = storage._DBStorage__session
+        for end in [session.rollback, storage.close]:
+            storage.get(State, state.id).name = "Pulsar Test"
+            storage.new(State(name="Quasar Town"))
+            session.flush()
+            end()
+            self.assertEqual(storage.autocomplete("quasar"), completed)
+            self.assertEqual(storage.autocomplete("pulsar"), [])
+
+    def test_all_and_counts_at_once(self):
+        '''Test that all() and counts() read every class in one
+        statement.'''
+        state = State(name="Once Test")
+        city = City(name="Once City", state_id=state.id)
+        storage.new(state)
+        storage.new(city)
+        storage.save()
+        counts, run = statements(storage.counts)
+        self.assertEqual(run, 1)
+        for name, cls in classes.items():
+            self.assertEqual(counts[name], storage.count(cls))
+        self.assertEqual(statements(storage.count)[1], 1)
+        self.assertEqual(storage.count(), sum(counts.values()))
+
+        storage.close()
+        objs, run = statements(storage.all)
+        self.assertEqual(run, 1)
+        self.assertEqual(len(objs), sum(counts.values()))
+        found = objs["City." + city.id]
+        self.assertEqual((found.name, found.state_id, found.created_at),
+                         (city.name, state.id, city.created_at))
+        self.assertEqual(found.state.id, state.id)
+        self.assertIs(storage.get(City, city.id), found)
+        found.name = "Once Town"
+        storage.save()
+        storage.close()
+        self.assertEqual(storage.get(City, city.id).name, "Once Town")
+        self.assertIs(storage.all()["City." + city.id],
+                      storage.get(City, city.id))
+
+        approximate = storage.counts(approximate=True)
+        self.assertEqual(set(approximate), set(classes))
+        storage.new(State(name="Once More"))
+        storage.save()
+        self.assertEqual(storage.counts(approximate=True), approximate)
+        self.assertEqual(storage.count(State, approximate=True),
+                         approximate["State"])
+
+    def test_pool_stats(self):
+        '''Test that the pool metrics follow the connections used.'''
+        storage.close()
+        before = storage.pool_stats()
+        storage.count(State)
+        stats = storage.pool_stats()
+        self.assertEqual(stats["checkouts"], before["checkouts"] + 1)
+        self.assertEqual(stats["checked_out"], before["checked_out"] + 1)
+        storage.close()
+        self.assertEqual(storage.pool_stats()["checked_out"],
+                         before["checked_out"])
+
+    def test_load(self):
+        '''Test that relationships loaded by all() and get() are read in
+        a constant number of queries.'''
+        states = [State(name="Load {}".format(i)) for i in range(3)]
+        user = User(email="load@test.io", password="pwd")
+        cities = [City(name=str(i), state_id=states[i % 3].id)
+                  for i in range(6)]
+        places = [Place(name=str(i), city_id=city.id, user_id=user.id)
+                  for i, city in enumerate(cities)]
+        reviews = [Review(text=str(i), place_id=places[0].id,
+                          user_id=user.id) for i in range(2)]
+        for obj in states + [user] + cities + places + reviews:
+            storage.new(obj)
+        storage.save()
+        total = storage.count(State)
+
+        def walk(**hints):
+            '''Reads the places of the cities of every state.'''
+            storage.close()
+            return sum(len(city.places) for state in
+                       storage.all(State, **hints).values()
+                       for city in state.cities)
+
+        found = walk()
+        self.assertGreaterEqual(found, 6)
+        self.assertEqual(statements(walk)[1],
+                         1 + total + storage.count(City))
+        self.assertEqual(statements(lambda: walk(
+            load=("cities.places",))), (found, 3))
+        self.assertEqual(statements(lambda: walk(
+            load=("cities.places",), how="joined")), (found, 1))
+        self.assertEqual(statements(lambda: walk(
+            load=("cities", "reviews"))), (found, 2 + storage.count(City)))
+
+        storage.close()
+        place, run = statements(lambda: storage.get(
+            Place, places[0].id, load=("reviews",)))
+        self.assertEqual(statements(lambda: len(place.reviews)),
+                         (2, 0))
+        self.assertEqual(run, 2)
+        self.assertNotIn("reviews", place.to_dict())
+        json.dumps(place.to_dict())
+        with self.assertRaises(ValueError):
+            storage.all(State, load=("cities",), how="lazy")
+
+    def test_get_identity_map(self):
+        '''Test that get() only queries objects not in the session.'''
+        state = State(name="Identity Test")
+        user = User(email="identity@test.io", password="pwd")
+        city = City(name="Identity City", state_id=state.id)
+        place = Place(name="Identity Place", city_id=city.id,
+                      user_id=user.id)
+        for obj in [state, user, city, place]:
+            storage.new(obj)
+        storage.save()
+        self.assertEqual(statements(lambda: storage.get(
+            State, state.id)), (state, 0))
+        storage.close()
+
+        def create_review():
+            '''Looks up the place and user as POST
+            /places/<place_id>/reviews does.'''
+            return (storage.get(Place, place.id),
+                    storage.get(User, user.id))
+
+        (found, author), first = statements(create_review)
+        self.assertEqual((found.id, author.id), (place.id, user.id))
+        self.assertEqual(first, 2)
+        self.assertEqual(statements(create_review),
+                         ((found, author), 0))
+        self.assertEqual(statements(lambda: storage.get(
+            "Place", place.id)), (found, 0))
+        self.assertIsNone(storage.get(State, None))
+        self.assertIsNone(storage.get("Nothing", place.id))
+        self.assertIsNone(storage.get(State, "missing"))
+        storage.delete(found)
+        self.assertIsNone(storage.get(Place, place.id))
+        storage.close()
+        self.assertEqual(storage.get(Place, place.id).id, place.id)
+
+    def test_object_cache(self):
+        '''Test that get() and all(cls) are read once through the
+        LRUCache, each session getting its own objects, until written.'''
+        state = State(name="Cached State")
+        city = City(name="Cached City", state_id=state.id)
+        storage.new(state)
+        storage.new(city)
+        storage.save()
+        storage.close()
+        self.assertIsNone(storage.cache_stats())
+        storage._DBStorage__cache = LRUCache(100)
+        try:
+            found, run = statements(lambda: storage.get(City, city.id))
+            self.assertEqual((found.name, run), ("Cached City", 1))
+            storage.close()
+            again, run = statements(lambda: storage.get(City, city.id))
+            self.assertEqual((again.name, run), ("Cached City", 0))
+            self.assertIsNot(again, found)
+            self.assertEqual(again.state.id, state.id)
+            self.assertEqual(statements(
+                lambda: storage.get(City, city.id)), (again, 0))
+
+            storage.close()
+            cities = storage.all(City)
+            storage.close()
+            objs, run = statements(lambda: storage.all(City))
+            self.assertEqual((set(objs), run), (set(cities), 0))
+            self.assertEqual(objs["City." + city.id].name, "Cached City")
+
+            objs["City." + city.id].name = "Renamed City"
+            other = City(name="Other City", state_id=state.id)
+            storage.new(other)
+            storage.save()
+            storage.close()
+            found, run = statements(lambda: storage.get(City, city.id))
+            self.assertEqual((found.name, run), ("Renamed City", 1))
+            self.assertIn("City." + other.id, storage.all(City))
+            storage.delete(found)
+            self.assertNotIn("City." + city.id, storage.all(City))
+            storage.save()
+            storage.close()
+            self.assertIsNone(storage.get(City, city.id))
+            self.assertEqual(storage.get(State, state.id).name,
+                             "Cached State")
+            stats = storage.cache_stats()
+            self.assertEqual((stats["hits"], stats["capacity"]), (2, 100))
+            self.assertGreaterEqual(stats["misses"], 4)
+        finally:
+            storage._DBStorage__cache = None
+            storage.close()
+
+    def test_object_cache_size(self):
+        '''Test that all(cls) is charged its number of rows in the
+        LRUCache, a table larger than the cache not being cached.'''
+        state = State(name="Sized State")
+        storage.new(state)
+        for i in range(3):
+            storage.new(City(name="Sized {}".format(i), state_id=state.id))
+        storage.save()
+        storage.close()
+        rows = storage.count(City)
+        for size, run in [(rows - 1, 1), (rows, 0)]:
+            storage._DBStorage__cache = LRUCache(size)
+            try:
+                storage.all(City)
+                storage.close()
+                self.assertEqual(statements(lambda: len(storage.all(City))),
+                                 (rows, run))
+                self.assertEqual(storage.cache_stats()["size"],
+                                 0 if run else rows)
+            finally:
+                storage._DBStorage__cache = None
+                storage.close()
@@ -3,10 +3,13 @@
 Contains the TestFileStorageDocs classes
 """
 
+from console import HBNBCommand
 from datetime import datetime
 import inspect
 import models
 from models.engine import file_storage
+from models.engine.geo import distance
+from models.engine.predicates import aggregate, matches, order, parse
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -15,9 +18,16 @@ from models.review import Review
 from models.state import State
 from models.user import User
 import json
+import multiprocessing
 import os
 import pep8
+import random
+import shutil
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 FileStorage = file_storage.FileStorage
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
@@ -70,6 +80,16 @@ test_file_storage.py'])
 
 class TestFileStorage(unittest.TestCase):
     """Test the FileStorage class"""
+    def setUp(self):
+        """makes the models tell a FileStorage of their changes, as
+        models.storage is not one under HBNB_TYPE_STORAGE=sqlite"""
+        self.patch = mock.patch.object(models, "storage", FileStorage())
+        self.patch.start()
+
+    def tearDown(self):
+        """restores models.storage"""
+        self.patch.stop()
+
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_all_returns_dict(self):
         """Test that all returns the FileStorage.__objects attr"""
@@ -78,6 +98,25 @@ class TestFileStorage(unittest.TestCase):
         self.assertEqual(type(new_dict), dict)
         self.assertIs(new_dict, storage._FileStorage__objects)
 
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_is_snapshot(self):
+        """Test that the dictionary all returns does not follow the objects
+        added and deleted afterwards"""
+        storage = FileStorage()
+        kept = State(name="Kept")
+        storage.new(kept)
+        snapshot = storage.all()
+        copy = dict(snapshot)
+        added = State(name="Added")
+        storage.new(added)
+        storage.delete(kept)
+        self.assertEqual(snapshot, copy)
+        self.assertIn("State." + kept.id, snapshot)
+        self.assertNotIn("State." + added.id, snapshot)
+        self.assertIn("State." + added.id, storage.all())
+        self.assertNotIn("State." + kept.id, storage.all())
+        storage.delete(added)
+
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_new(self):
         """test that new adds an object to the FileStorage.__objects attr"""
@@ -143,3 +182,925 @@ class TestFileStorage(unittest.TestCase):
         self.assertGreaterEqual(count, state_count)
         self.assertGreaterEqual(count, user_count)
         self.assertGreaterEqual(count, count_place)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_counts(self):
+        '''Test that counts gives the count of every class.'''
+        storage = FileStorage()
+        storage.new(State(name="Counted"))
+        counts = storage.counts()
+        self.assertEqual(set(counts), set(file_storage.classes))
+        for name in counts:
+            self.assertEqual(counts[name], storage.count(name))
+        self.assertEqual(sum(counts.values()), storage.count())
+        self.assertEqual(storage.counts(approximate=True), counts)
+        self.assertEqual(storage.count(State, approximate=True),
+                         counts["State"])
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_get_exact_id(self):
+        '''Test get only matches the exact id, not a substring of it'''
+        storage = FileStorage()
+        new_obj = State(name='TEST')
+        storage.new(new_obj)
+        self.assertIs(storage.get(State, new_obj.id), new_obj)
+        self.assertIs(storage.get("State", new_obj.id), new_obj)
+        self.assertIsNone(storage.get(State, new_obj.id[:8]))
+        self.assertIsNone(storage.get(City, new_obj.id))
+        self.assertIsNone(storage.get("NotAClass", new_obj.id))
+        storage.delete(new_obj)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_buckets_follow_new_and_delete(self):
+        '''Test all(cls), get and count stay in step with new/delete'''
+        storage = FileStorage()
+        before = storage.count(City)
+        new_obj = City(name='TEST')
+        storage.new(new_obj)
+        key = "City." + new_obj.id
+        self.assertEqual(storage.count(City), before + 1)
+        self.assertEqual(storage.count("City"), before + 1)
+        self.assertIs(storage.all(City)[key], new_obj)
+        self.assertIs(storage.all("City")[key], new_obj)
+        self.assertNotIn(key, storage.all(State))
+        storage.delete(new_obj)
+        self.assertEqual(storage.count(City), before)
+        self.assertNotIn(key, storage.all(City))
+        self.assertIsNone(storage.get(City, new_obj.id))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_iter(self):
+        """Test that iter yields the objects all returns"""
+        storage = FileStorage()
+        state = State(name="California")
+        storage.new(state)
+        objs = storage.iter(State)
+        self.assertNotIsInstance(objs, (list, dict))
+        self.assertEqual({"State." + obj.id for obj in objs},
+                         set(storage.all(State)))
+        self.assertEqual(len(list(storage.iter())), len(storage.all()))
+        self.assertEqual(list(storage.iter("Nothing")), [])
+        storage.delete(state)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_encodes_dirty_objects_only(self):
+        """Test that save only calls to_dict on changed objects"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__buckets = {}
+        FileStorage._FileStorage__indexes = {}
+        kept = State(name="California")
+        changed = State(name="Nevada")
+        gone = State(name="Oregon")
+        for obj in [kept, changed, gone]:
+            storage.new(obj)
+        storage.save()
+        changed.name = "Arizona"
+        storage.delete(gone)
+        added = City(name="Fremont")
+        storage.new(added)
+        with mock.patch.object(BaseModel, "to_dict", autospec=True,
+                               side_effect=BaseModel.to_dict) as to_dict:
+            storage.save()
+        self.assertEqual(sorted(call[0][0].id for call in
+                                to_dict.call_args_list),
+                         sorted([changed.id, added.id]))
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        self.assertEqual(js, {"State." + kept.id: kept.to_dict(),
+                              "State." + changed.id: changed.to_dict(),
+                              "City." + added.id: added.to_dict()})
+        FileStorage._FileStorage__objects = save
+        FileStorage._FileStorage__buckets = {}
+        FileStorage._FileStorage__indexes = {}
+        for obj in save.values():
+            storage._FileStorage__add(obj)
+
+
+class TempFileStorageTestCase(unittest.TestCase):
+    """Base for tests running FileStorage on an empty temporary file"""
+    # dictionary - FileStorage class attributes to set for each test
+    settings = {}
+
+    def setUp(self):
+        """points FileStorage at an empty file with the test settings"""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "file.json")
+        self.saved = {attr: getattr(FileStorage, attr) for attr in [
+            "_FileStorage__file_path", "_FileStorage__objects",
+            "_FileStorage__buckets", "_FileStorage__indexes",
+            "_FileStorage__declared", "_FileStorage__dirty",
+            "_FileStorage__fragments",
+            "_FileStorage__journal", "_FileStorage__journal_limit",
+            "_FileStorage__flush_window", "_FileStorage__shared",
+            "_FileStorage__generation", "_FileStorage__log_position"]}
+        FileStorage._FileStorage__file_path = self.path
+        for attr, value in self.settings.items():
+            setattr(FileStorage, attr, value)
+        self.reset()
+        self.storage = FileStorage()
+        # the models tell models.storage of their changes and read from it,
+        # which is not a FileStorage under HBNB_TYPE_STORAGE=sqlite
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+
+    def tearDown(self):
+        """restores the FileStorage class attributes and models.storage"""
+        self.patch.stop()
+        self.storage.sync()
+        self.storage.compact()
+        for attr, value in self.saved.items():
+            setattr(FileStorage, attr, value)
+        shutil.rmtree(self.tmp)
+
+    def reset(self):
+        """empties the in-memory objects, as a freshly started process"""
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__buckets = {}
+        FileStorage._FileStorage__indexes = {}
+        FileStorage._FileStorage__dirty = {}
+        FileStorage._FileStorage__fragments = {}
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageJournal(TempFileStorageTestCase):
+    """Test the journaled mode of the FileStorage class"""
+    settings = {"_FileStorage__journal": True}
+
+    def test_save_appends_changes_only(self):
+        """Test that save appends one record per changed object"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.new(City(name="Fremont", state_id=state.id))
+        self.storage.save()
+        with open(self.path + ".log") as f:
+            self.assertEqual(len(f.readlines()), 2)
+        state.name = "Nevada"
+        self.storage.save()
+        self.storage.save()
+        with open(self.path + ".log") as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[-1])[1]["name"], "Nevada")
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_reload_replays_log(self):
+        """Test that reload rebuilds puts, updates and deletes"""
+        kept = State(name="California")
+        gone = State(name="Nevada")
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        kept.name = "Oregon"
+        self.storage.delete(gone)
+        self.storage.save()
+        self.reset()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(self.storage.get(State, kept.id).name, "Oregon")
+        self.assertIsNone(self.storage.get(State, gone.id))
+
+    def test_console_destroy(self):
+        """Test that an object destroyed from the console stays deleted
+        after a reload"""
+        kept = State(name="California")
+        gone = State(name="Nevada")
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        HBNBCommand().onecmd("destroy State " + gone.id)
+        self.reset()
+        self.storage.reload()
+        self.assertIsNone(self.storage.get(State, gone.id))
+        self.assertIsNotNone(self.storage.get(State, kept.id))
+
+    def test_change_in_place(self):
+        """Test that a list changed in place is written by the instance's
+        save(), storage.save() alone only seeing set attributes"""
+        place = Place(name="Loft", amenity_ids=["a"])
+        self.storage.new(place)
+        self.storage.save()
+        place.amenity_ids.append("b")
+        self.storage.save()
+        with open(self.path + ".log") as f:
+            self.assertEqual(len(f.readlines()), 1)
+        place.save()
+        place.amenity_ids.append("c")
+        self.storage.touch(place)
+        self.storage.save()
+        self.reset()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(Place, place.id).amenity_ids,
+                         ["a", "b", "c"])
+
+    def test_torn_last_record(self):
+        """Test that a half written last record is dropped on reload"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        torn = State(name="Nevada")
+        with open(self.path + ".log", "a") as f:
+            f.write(json.dumps(["State." + torn.id, torn.to_dict()])[:40])
+        self.reset()
+        self.storage.reload()
+        self.assertIsNotNone(self.storage.get(State, state.id))
+        self.assertIsNone(self.storage.get(State, torn.id))
+        after = State(name="Oregon")
+        self.storage.new(after)
+        self.storage.save()
+        self.reset()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 2)
+        self.assertIsNotNone(self.storage.get(State, after.id))
+
+    def test_compaction(self):
+        """Test that a log past the limit is folded into the JSON file"""
+        FileStorage._FileStorage__journal_limit = 1
+        states = [State(name="State" + str(i)) for i in range(5)]
+        for state in states:
+            self.storage.new(state)
+            self.storage.save()
+        self.storage.delete(states[0])
+        self.storage.save()
+        self.storage.compact()
+        self.assertFalse(os.path.exists(self.path + ".log"))
+        self.assertFalse(os.path.exists(self.path + ".log.1"))
+        with open(self.path) as f:
+            jo = json.load(f)
+        self.assertEqual(set(jo), {"State." + s.id for s in states[1:]})
+        self.reset()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 4)
+
+    def test_snapshot_save_drops_log(self):
+        """Test that a full save supersedes the journal"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        FileStorage._FileStorage__journal = False
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path + ".log"))
+        self.reset()
+        self.storage.reload()
+        self.assertIsNotNone(self.storage.get(State, state.id))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageFlusher(TempFileStorageTestCase):
+    """Test the background flusher of the FileStorage class"""
+    settings = {"_FileStorage__flush_window": 0.05}
+
+    def read(self):
+        """returns the keys in the JSON file"""
+        with open(self.path) as f:
+            return set(json.load(f))
+
+    def test_save_without_wait(self):
+        """Test that save(wait=False) returns before the write"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save(wait=False)
+        self.assertFalse(os.path.exists(self.path))
+        self.storage.sync()
+        self.assertEqual(self.read(), {"State." + state.id})
+
+    def test_concurrent_saves_are_grouped(self):
+        """Test that saves within one window share a single write"""
+        def writer(i):
+            """saves one new State and waits for it to be on disk"""
+            state = State(name="State" + str(i))
+            self.storage.new(state)
+            self.storage.save()
+            self.assertIn("State." + state.id, self.read())
+
+        write = FileStorage._FileStorage__write
+        with mock.patch.object(FileStorage, "_FileStorage__write",
+                               autospec=True, side_effect=write) as counter:
+            threads = [threading.Thread(target=writer, args=(i,))
+                       for i in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertLess(counter.call_count, 16)
+        self.assertEqual(len(self.read()), 16)
+
+    def test_failed_write_keeps_file(self):
+        """Test that a failed write leaves the old file and the changes"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "Nevada"
+        with mock.patch("os.fsync", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        self.assertEqual(os.listdir(self.tmp), ["file.json"])
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["State." + state.id]["name"],
+                             "California")
+        self.storage.save()
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["State." + state.id]["name"],
+                             "Nevada")
+        self.assertEqual(os.listdir(self.tmp), ["file.json"])
+
+    def test_failed_flush_error_is_kept(self):
+        """Test that a caller waking up after a failed flush gets its
+        error, even once a later flush succeeded"""
+        state = State(name="California")
+        self.storage.new(state)
+        with mock.patch("os.fsync", side_effect=OSError("disk full")):
+            self.storage.save(wait=False)
+            ticket, batch = FileStorage._FileStorage__flush_last
+            with self.assertRaises(OSError):
+                self.storage.sync()
+        self.storage.save()
+        self.assertIn("State." + state.id, self.read())
+        with self.assertRaises(OSError):
+            self.storage._FileStorage__wait_flush(ticket, batch)
+        self.storage.sync()
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageClose(TempFileStorageTestCase):
+    """Test that close only reloads when the file changed"""
+    def test_close_after_own_save(self):
+        """Test that close keeps the objects after this process saved"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        objects = self.storage.all()
+        with mock.patch.object(FileStorage, "reload") as reload:
+            self.storage.close()
+            self.storage.close()
+        reload.assert_not_called()
+        self.assertIs(self.storage.all(), objects)
+        self.assertIs(self.storage.get(State, state.id), state)
+
+    def test_close_after_outside_change(self):
+        """Test that close swaps in the objects another process wrote"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        objects = self.storage.all()
+        outside = City(name="Fremont")
+        with open(self.path) as f:
+            jo = json.load(f)
+        jo["City." + outside.id] = outside.to_dict()
+        with open(self.path + ".new", "w") as f:
+            json.dump(jo, f)
+        os.replace(self.path + ".new", self.path)
+        self.storage.close()
+        self.assertIsNot(self.storage.all(), objects)
+        self.assertEqual(len(objects), 1)
+        self.assertEqual(self.storage.get(City, outside.id).name, "Fremont")
+        self.assertEqual(self.storage.count(), 2)
+        with mock.patch.object(FileStorage, "reload") as reload:
+            self.storage.close()
+        reload.assert_not_called()
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageIndexes(TempFileStorageTestCase):
+    """Test the foreign key indexes behind the relationship properties"""
+    def test_relationships(self):
+        """Test the properties follow new, delete and attribute changes"""
+        state = State(name="California")
+        other = State(name="Nevada")
+        city = City(name="Fremont", state_id=state.id)
+        place = Place(name="Home", city_id=city.id)
+        review = Review(text="Nice", place_id=place.id)
+        for obj in [state, other, city, place, review]:
+            self.storage.new(obj)
+        self.assertEqual(state.cities, [city])
+        self.assertEqual(other.cities, [])
+        self.assertEqual(city.places, [place])
+        self.assertEqual(place.reviews, [review])
+        city.state_id = other.id
+        self.assertEqual(state.cities, [])
+        self.assertEqual(other.cities, [city])
+        self.storage.delete(review)
+        self.assertEqual(place.reviews, [])
+
+    def test_page(self):
+        """Test that pages walk the objects by creation, per parent too"""
+        state = State(name="California")
+        self.storage.new(state)
+        cities = [City(name=str(i), state_id=state.id) for i in range(5)]
+        for city in cities:
+            self.storage.new(city)
+        self.storage.new(City(name="elsewhere"))
+        self.assertEqual(self.storage.page(City, 2), cities[:2])
+        after = (cities[1].created_at.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+                 cities[1].id)
+        self.assertEqual(self.storage.page("City", 2, after), cities[2:4])
+        self.assertEqual(self.storage.page(City, 10, after, "state_id",
+                                           state.id), cities[2:])
+        self.assertEqual(self.storage.page(City, 10, None, "name", "3"),
+                         [cities[3]])
+        self.assertEqual(self.storage.page(Place, 10), [])
+        self.storage.delete(cities[0])
+        self.assertEqual(self.storage.page(City, 1), [cities[1]])
+
+    def test_query(self):
+        """Test that query answers like a scan, with or without indexes"""
+        places = [Place(name=str(i), city_id=str(i % 3),
+                        price_by_night=i * 10, number_rooms=i % 4)
+                  for i in range(30)]
+        for place in places:
+            self.storage.new(place)
+        places[0].price_by_night = 1000
+        checks = [{"city_id": "1"},
+                  {"city_id__in": ["0", "2"], "number_rooms": 3},
+                  {"price_by_night__gte": 100, "price_by_night__lt": 150},
+                  {"price_by_night__gt": 250, "number_rooms__lte": 1},
+                  {"name": "7"},
+                  {"price_by_night__gte": "100"},
+                  {}]
+        for predicates in checks:
+            expected = [p for p in places
+                        if matches(p, parse(predicates))]
+            self.assertEqual(
+                sorted(p.id for p in self.storage.query(Place,
+                                                        **predicates)),
+                sorted(p.id for p in expected), predicates)
+        self.assertEqual(self.storage.query("Place", price_by_night=1000),
+                         [places[0]])
+        with self.assertRaises(ValueError):
+            self.storage.query(Place, name__like="1")
+
+    def test_query_order_and_aggregate(self):
+        """Test sorted, limited and aggregated queries, with or without
+        the ColumnStore"""
+        places = [Place(name=str(i), city_id=str(i % 2),
+                        price_by_night=(i * 7) % 20, max_guest=i % 5)
+                  for i in range(20)]
+        places.append(Place(name="odd", city_id="1", price_by_night="12"))
+        for place in places:
+            self.storage.new(place)
+        places[3].max_guest = 10
+        checks = [{"city_id": "1"},
+                  {"max_guest__gte": 2, "price_by_night__lt": 15},
+                  {"city_id": "0", "max_guest__in": [1, 10]},
+                  {"name__in": ["1", "2", "odd"]},
+                  {}]
+        for predicates in checks:
+            expected = [p for p in places if matches(p, parse(predicates))]
+            for order_by in ["price_by_night", "-max_guest"]:
+                found = self.storage.query(Place, order_by=order_by,
+                                           **predicates)
+                self.assertEqual(
+                    [getattr(p, order_by.lstrip("-")) for p in found],
+                    [getattr(p, order_by.lstrip("-")) for p in order(
+                        expected, order_by.lstrip("-"),
+                        order_by.startswith("-"))], predicates)
+                self.assertEqual(sorted(p.id for p in found),
+                                 sorted(p.id for p in expected))
+            self.assertEqual(len(self.storage.query(Place, limit=3,
+                                                    **predicates)),
+                             min(3, len(expected)))
+            self.assertEqual(self.storage.aggregate(Place, "max_guest",
+                                                    **predicates),
+                             aggregate(expected, "max_guest"), predicates)
+        self.assertEqual(self.storage.query(Place, order_by="-max_guest",
+                                            limit=1), [places[3]])
+        self.assertEqual(self.storage.aggregate(Place, "price_by_night",
+                                                name="odd"),
+                         {"count": 1, "min": None, "max": None,
+                          "mean": None})
+
+    def test_places_near_and_within(self):
+        """Test radius and box searches against brute force, moved and
+        unsaved places included"""
+        random.seed(2)
+        places = [Place(name=str(i), latitude=random.uniform(-60, 60),
+                        longitude=random.uniform(-180, 180))
+                  for i in range(400)]
+        places += [Place(name="east", latitude=5.0, longitude=179.95),
+                   Place(name="west", latitude=5.0, longitude=-179.95)]
+        for place in places:
+            self.storage.new(place)
+        self.storage.save()
+        places[0].latitude, places[0].longitude = 5.01, 179.9
+        for latitude, longitude, radius_km in [(5, 180, 50), (0, 0, 2000),
+                                               (30, -100, 10000)]:
+            expected = sorted((distance(latitude, longitude, p.latitude,
+                                        p.longitude), p.name)
+                              for p in places)
+            expected = [name for km, name in expected if km <= radius_km]
+            found = self.storage.places_near(latitude, longitude, radius_km)
+            self.assertEqual([p.name for km, p in found], expected)
+            found = self.storage.places_near(latitude, longitude, radius_km,
+                                             limit=3)
+            self.assertEqual([p.name for km, p in found], expected[:3])
+        for box in [(4, 179, 6, -179), (-10, -20, 10, 20)]:
+            south, west, north, east = box
+            self.assertEqual(
+                sorted(p.name for p in self.storage.places_within(*box)),
+                sorted(p.name for p in places
+                       if south <= p.latitude <= north and
+                       (west <= p.longitude <= east if west <= east else
+                        (p.longitude >= west or p.longitude <= east))))
+        self.assertEqual(len(self.storage.places_within(-90, -180, 90, 180,
+                                                        limit=5)), 5)
+
+    def test_place_clusters(self):
+        """Test that the clusters of map tiles count the places in them
+        and follow the places saved"""
+        places = [Place(name=str(i), latitude=10.0 + i, longitude=20.0,
+                        price_by_night=100 - i) for i in range(3)]
+        for place in places:
+            self.storage.new(place)
+        self.storage.save()
+        self.assertEqual(self.storage.place_clusters(0, 0, 40, 40, 0),
+                         [{"count": 3, "latitude": 11.0, "longitude": 20.0,
+                           "min_price": 98}])
+        self.assertEqual(self.storage.place_clusters(0, 0, 40, 40, 3), [
+            {"count": 1, "latitude": 12.0, "longitude": 20.0,
+             "min_price": 98},
+            {"count": 2, "latitude": 10.5, "longitude": 20.0,
+             "min_price": 99}])
+        places[2].latitude = -10.0
+        places[0].price_by_night = 5
+        self.storage.new(Place(name="new", latitude=-20.0, longitude=-20.0,
+                               price_by_night=1))
+        self.storage.save()
+        self.assertEqual(self.storage.place_clusters(-40, -40, 40, 40, 0),
+                         [{"count": 2, "latitude": 10.5, "longitude": 20.0,
+                           "min_price": 5},
+                          {"count": 1, "latitude": -20.0, "longitude": -20.0,
+                           "min_price": 1},
+                          {"count": 1, "latitude": -10.0, "longitude": 20.0,
+                           "min_price": 98}])
+        self.assertEqual(self.storage.place_clusters(50, 50, 60, 60, 5), [])
+
+    def test_search(self):
+        """Test that search ranks the places and reviews holding the words
+        and pages through them, following the texts saved"""
+        place = Place(name="Loft", description="Quiet loft near the beach")
+        others = [Review(text="Beach, beach and beach!", place_id="p"),
+                  Review(text="A loft with a garden", place_id="p"),
+                  Review(text="Noisy street", place_id="p")]
+        for obj in [place] + others:
+            self.storage.new(obj)
+        self.storage.save()
+        found = self.storage.search("BEACH")
+        self.assertEqual([obj.id for score, obj in found],
+                         [others[0].id, place.id])
+        self.assertGreater(found[0][0], found[1][0])
+        found = self.storage.search("beach loft garden")
+        self.assertEqual(len(found), 3)
+        self.assertEqual(self.storage.search("beach loft garden", 1),
+                         found[:1])
+        after = (found[0][0], found[0][1].__class__.__name__, found[0][1].id)
+        self.assertEqual(self.storage.search("beach loft garden", 5, after),
+                         found[1:])
+        self.assertEqual(self.storage.search("pool"), [])
+        self.assertEqual(self.storage.search(" ! "), [])
+        others[2].text = "Noisy pool"
+        self.storage.delete(others[0])
+        self.storage.save()
+        self.assertEqual([obj.id for score, obj in
+                          self.storage.search("pool beach")],
+                         [others[2].id, place.id])
+
+    def test_autocomplete(self):
+        """Test that autocomplete finds the names starting with a prefix,
+        ignoring case and accents, following the objects changed"""
+        state = State(name="Colorado")
+        cities = [City(name="Colorado Springs", state_id=state.id),
+                  City(name="Cologne", state_id="x"),
+                  City(name="Denver", state_id=state.id)]
+        amenity = Amenity(name="coffee maker")
+        for obj in [state, amenity] + cities:
+            self.storage.new(obj)
+        self.storage.save()
+        self.assertEqual(self.storage.autocomplete("CO"), [
+            ("coffee maker", "Amenity", amenity.id),
+            ("Cologne", "City", cities[1].id),
+            ("Colorado", "State", state.id),
+            ("Colorado Springs", "City", cities[0].id)])
+        self.assertEqual(self.storage.autocomplete("colo", 1),
+                         [("Cologne", "City", cities[1].id)])
+        self.assertEqual(self.storage.autocomplete("z"), [])
+        cities[2].name = "Côte"
+        self.storage.delete(cities[1])
+        self.storage.save()
+        self.assertEqual([value for value, name, id in
+                          self.storage.autocomplete("cot")], ["Côte"])
+        self.assertEqual(self.storage.autocomplete("colog"), [])
+
+    def test_query_plan(self):
+        """Test that the planner picks the most selective index"""
+        places = [Place(city_id="a", price_by_night=i) for i in range(10)]
+        for place in places:
+            self.storage.new(place)
+        indexes = FileStorage._FileStorage__indexes["Place"]
+        plan = self.storage._FileStorage__plan
+        conditions = parse({"city_id": "a", "price_by_night__gt": 7})
+        self.assertEqual(plan(indexes, conditions),
+                         (places[8:], {1}))
+        conditions = parse({"price_by_night__gte": 2, "name": "x",
+                            "price_by_night__lt": 4, "city_id": "a"})
+        self.assertEqual(plan(indexes, conditions), (places[2:4], {0, 2}))
+        self.assertEqual(plan(indexes, parse({"name": "x"})), (None, ()))
+
+    def test_query_by_id(self):
+        """Test that conditions on the id are looked up in the bucket"""
+        places = [Place(city_id="a") for i in range(5)]
+        for place in places:
+            self.storage.new(place)
+        bucket = FileStorage._FileStorage__buckets["Place"]
+        indexes = FileStorage._FileStorage__indexes["Place"]
+        plan = self.storage._FileStorage__plan
+        conditions = parse({"city_id": "a", "id__in": [places[1].id, "x"]})
+        self.assertEqual(plan(indexes, conditions, bucket),
+                         ([places[1]], {1}))
+        self.assertEqual(self.storage.query(Place, id=places[2].id),
+                         [places[2]])
+
+    def test_search_places(self):
+        """Test that search_places finds what walking the models does"""
+        states = [State(name=str(i)) for i in range(3)]
+        cities = [City(name=str(i), state_id=states[i % 3].id)
+                  for i in range(6)]
+        places = [Place(name=str(i), city_id=cities[i % 6].id)
+                  for i in range(24)]
+        amenities = [Amenity(name=str(i), place_id=places[i % 4].id)
+                     for i in range(8)]
+        amenities.append(Amenity(name="unused"))
+        for obj in states + cities + places + amenities:
+            self.storage.new(obj)
+
+        def walk(state_ids, city_ids, amenity_ids, any_ids=()):
+            """the places found by walking the relationships"""
+            city_ids = set(city_ids)
+            for state in states:
+                if state.id in state_ids:
+                    city_ids.update(city.id for city in state.cities)
+            found = places
+            if city_ids:
+                found = [place for city in cities if city.id in city_ids
+                         for place in city.places]
+            found = [place for place in found if not any_ids or
+                     set(any_ids) & {a.id for a in place.amenities}]
+            return sorted(place.id for place in found
+                          if set(amenity_ids) <= {amenity.id for amenity
+                                                  in place.amenities})
+
+        checks = [([], [], []),
+                  ([states[0].id], [], []),
+                  ([states[0].id], [cities[1].id, cities[3].id], []),
+                  ([], [cities[2].id, "missing"], []),
+                  ([], [], [amenities[1].id]),
+                  ([], [], [amenities[0].id, amenities[4].id]),
+                  ([], [], [amenities[0].id, amenities[1].id]),
+                  ([states[1].id], [], [amenities[1].id]),
+                  ([states[1].id], [], [amenities[0].id]),
+                  ([], [], [amenities[8].id]),
+                  ([], [], ["missing"]),
+                  ([], [], [], [amenities[0].id, amenities[1].id]),
+                  ([], [], [], [amenities[8].id, "missing"]),
+                  ([states[1].id], [], [], [amenities[0].id,
+                                            amenities[1].id]),
+                  ([], [], [amenities[0].id], [amenities[4].id,
+                                               amenities[5].id])]
+        for ids in checks:
+            self.assertEqual(
+                sorted(place.id for place in self.storage.search_places(
+                    *ids)), walk(*ids), ids)
+        amenities[1].place_id = places[0].id
+        self.storage.delete(amenities[4])
+        self.assertEqual(self.storage.search_places(
+            [], [], [amenities[0].id, amenities[1].id]), [places[0]])
+        self.assertEqual(self.storage.search_places(
+            [], [], [], [amenities[4].id]), [])
+
+    def test_add_index(self):
+        """Test that a declared index is filled and kept up to date"""
+        places = [Place(name=str(i % 2)) for i in range(4)]
+        for place in places:
+            self.storage.new(place)
+        self.storage.add_index(Place, "name")
+        self.assertIn(("hash", "name"),
+                      FileStorage._FileStorage__indexes["Place"])
+        places[0].name = "1"
+        self.storage.new(Place(name="1"))
+        self.assertEqual(len(self.storage.query(Place, name="1")), 4)
+        self.assertEqual(self.storage.related(Place, "name", "0"),
+                         [places[2]])
+        with self.assertRaises(ValueError):
+            self.storage.add_index(Place, "name", "bitmap")
+
+    def test_related_scans_without_index(self):
+        """Test related on an attribute that is not a foreign key"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.new(State(name="Nevada"))
+        self.assertEqual(self.storage.related(State, "name", "California"),
+                         [state])
+
+    def test_indexes_survive_reload(self):
+        """Test that the indexes are rebuilt from the file"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.new(City(name="Fremont", state_id=state.id))
+        self.storage.save()
+        self.reset()
+        self.storage.reload()
+        state = self.storage.get(State, state.id)
+        self.assertEqual([city.name for city in state.cities], ["Fremont"])
+        self.storage.new(City(name="Fremont", state_id=state.id))
+        self.assertEqual(len(state.cities), 2)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageThreads(TempFileStorageTestCase):
+    """Test FileStorage under concurrent readers and writers"""
+    def test_no_lost_updates(self):
+        """Test that concurrent new, update, save and reads lose nothing"""
+        writers, per_writer = 8, 10
+        errors = []
+        done = threading.Event()
+
+        def writer(i):
+            """creates, updates and deletes States, saving each time"""
+            try:
+                for j in range(per_writer):
+                    state = State(name="new")
+                    self.storage.new(state)
+                    self.storage.save()
+                    state.name = "{}-{}".format(i, j)
+                    self.storage.save()
+                    gone = State(name="gone")
+                    self.storage.new(gone)
+                    self.storage.delete(gone)
+                    self.storage.save()
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            """keeps reading while the writers run"""
+            try:
+                while not done.is_set():
+                    for state in self.storage.all(State).values():
+                        self.storage.get(State, state.id)
+                    self.storage.count(State)
+                    self.storage.close()
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=reader) for i in range(4)]
+        threads = [threading.Thread(target=writer, args=(i,))
+                   for i in range(writers)]
+        for thread in readers + threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(errors, [])
+        expected = {"{}-{}".format(i, j) for i in range(writers)
+                    for j in range(per_writer)}
+        self.reset()
+        self.storage.reload()
+        names = {s.name for s in self.storage.all(State).values()}
+        self.assertEqual(names, expected)
+
+    def test_iterate_all(self):
+        """Test that iterating all() with no class is safe while other
+        threads add and delete objects"""
+        for i in range(100):
+            self.storage.new(State(name=str(i)))
+        errors = []
+        done = threading.Event()
+
+        def writer():
+            """adds and deletes States"""
+            for i in range(300):
+                state = State(name="new")
+                self.storage.new(state)
+                time.sleep(0)
+                self.storage.delete(state)
+            done.set()
+
+        def reader():
+            """iterates all(), yielding to the writer on each object"""
+            try:
+                while not done.is_set():
+                    for key, obj in self.storage.all().items():
+                        self.assertEqual(key.split(".")[1], obj.id)
+                        time.sleep(0)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer),
+                   threading.Thread(target=reader)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.storage.count(State), 100)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageThreadsJournal(TestFileStorageThreads):
+    """Test the journaled FileStorage under concurrent threads"""
+    settings = {"_FileStorage__journal": True,
+                "_FileStorage__journal_limit": 4096}
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageThreadsFlusher(TestFileStorageThreads):
+    """Test FileStorage with a background flusher under concurrent threads"""
+    settings = {"_FileStorage__flush_window": 0.002}
+
+
+def shared_writer(worker, count):
+    """creates count States, then renames each, from a child process"""
+    storage = FileStorage()
+    storage.reload()
+    for i in range(count):
+        state = State(name="new")
+        storage.new(state)
+        storage.save()
+        state.name = "{}-{}".format(worker, i)
+        storage.save()
+
+
+def shared_deleter(state_id):
+    """deletes one State from a child process"""
+    storage = FileStorage()
+    storage.reload()
+    storage.delete(storage.get(State, state_id))
+    storage.save()
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageShared(TempFileStorageTestCase):
+    """Test FileStorage shared by several processes"""
+    settings = {"_FileStorage__shared": True}
+
+    def run_processes(self, target, args_list):
+        """runs target once per args in child processes, checks they exit
+        cleanly"""
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=target, args=args)
+                     for args in args_list]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+    def test_no_lost_writes(self):
+        """Test that 4 processes saving concurrently lose no writes"""
+        self.storage.reload()
+        workers, per_worker = 4, 15
+        self.run_processes(shared_writer,
+                           [(i, per_worker) for i in range(workers)])
+        expected = {"{}-{}".format(i, j) for i in range(workers)
+                    for j in range(per_worker)}
+        names = {s.name for s in self.storage.all(State).values()}
+        self.assertEqual(names, expected)
+        self.reset()
+        self.storage.reload()
+        names = {s.name for s in self.storage.all(State).values()}
+        self.assertEqual(names, expected)
+
+    def test_no_clobbered_delete(self):
+        """Test that a save doesn't bring back what another process
+        deleted"""
+        gone = State(name="California")
+        self.storage.new(gone)
+        self.storage.save()
+        self.run_processes(shared_deleter, [(gone.id,)])
+        kept = State(name="Nevada")
+        self.storage.new(kept)
+        self.storage.save()
+        self.assertIsNone(self.storage.get(State, gone.id))
+        self.reset()
+        self.storage.reload()
+        self.assertEqual(set(self.storage.all(State)), {"State." + kept.id})
+
+    def test_refresh_only_when_generation_moves(self):
+        """Test that reads don't reload until another process saves"""
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        with mock.patch.object(FileStorage, "_FileStorage__load") as load:
+            self.storage.count(State)
+            self.storage.close()
+        load.assert_not_called()
+        self.run_processes(shared_writer, [(0, 1)])
+        self.assertEqual(self.storage.count(State), 2)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageSharedJournal(TestFileStorageShared):
+    """Test the journaled FileStorage shared by several processes"""
+    settings = {"_FileStorage__shared": True,
+                "_FileStorage__journal": True,
+                "_FileStorage__journal_limit": 4096}
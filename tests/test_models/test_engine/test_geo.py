@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+"""
+Contains the TestGeoDocs, TestGeometry and TestGridIndex classes
+"""
+
+import inspect
+from models.engine import geo
+from models.place import Place
+import pep8
+import random
+import unittest
+GridIndex = geo.GridIndex
+
+
+def inside(place, south, west, north, east):
+    """tells whether place is within the box, the brute force way"""
+    if not (south <= place.latitude <= north):
+        return False
+    if west <= east:
+        return west <= place.longitude <= east
+    return place.longitude >= west or place.longitude <= east
+
+
+class TestGeoDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the geo module"""
+    def test_pep8_conformance_geo(self):
+        """Test that models/engine/geo.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/geo.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_geo(self):
+        """Test tests/test_models/test_engine/test_geo.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_geo.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_geo_docstrings(self):
+        """Test for the module, function, class and method docstrings"""
+        self.assertTrue(geo.__doc__)
+        self.assertTrue(GridIndex.__doc__)
+        for func in (inspect.getmembers(geo, inspect.isfunction) +
+                     inspect.getmembers(GridIndex, inspect.isfunction)):
+            self.assertTrue(func[1].__doc__,
+                            "{:s} needs a docstring".format(func[0]))
+
+
+class TestGeometry(unittest.TestCase):
+    """Test the geometry helpers of the geo module"""
+    def test_point(self):
+        """Test that only the degrees of a point are one"""
+        self.assertEqual(geo.point(1, -2.5), (1.0, -2.5))
+        for latitude, longitude in [(91, 0), (0, 181), ("1", 0), (True, 0),
+                                    (None, 0), (float("nan"), 0)]:
+            self.assertIsNone(geo.point(latitude, longitude))
+
+    def test_distance(self):
+        """Test great circle distances"""
+        self.assertEqual(geo.distance(10, 20, 10, 20), 0)
+        self.assertAlmostEqual(geo.distance(0, 0, 0, 1), 111.195, places=2)
+        self.assertAlmostEqual(geo.distance(0, 179.5, 0, -179.5),
+                               geo.distance(0, 0, 0, 1))
+        self.assertAlmostEqual(geo.distance(90, 0, -90, 0),
+                               geo.EARTH_RADIUS * 3.141592653589793)
+
+    def test_split(self):
+        """Test that boxes are cut at the antimeridian"""
+        self.assertEqual(geo.split(0, -10, 1, 10), [(0, -10, 1, 10)])
+        self.assertEqual(geo.split(0, 170, 1, -170),
+                         [(0, 170, 1, 180), (0, -180, 1, -170)])
+
+    def test_around(self):
+        """Test that the boxes around a point hold the points within the
+        radius, across the antimeridian and over the poles"""
+        random.seed(0)
+        for latitude, longitude, radius_km in [(0, 0, 100), (45, 179.9, 300),
+                                               (-60, -179, 500),
+                                               (89.5, 10, 100),
+                                               (-10, 30, 30000)]:
+            boxes = geo.around(latitude, longitude, radius_km)
+            for i in range(2000):
+                place = Place(latitude=random.uniform(-90, 90),
+                              longitude=random.uniform(-180, 180))
+                if geo.distance(latitude, longitude, place.latitude,
+                                place.longitude) <= radius_km:
+                    self.assertTrue(any(inside(place, *box)
+                                        for box in boxes))
+
+    def test_nearest(self):
+        """Test that nearest sorts by distance and widens the search until
+        it finds limit objects"""
+        places = [Place(latitude=0.0, longitude=i / 10) for i in range(50)]
+        searched = []
+
+        def find(boxes):
+            """returns the places within the boxes, noting them"""
+            searched.append(boxes)
+            return [p for p in places if any(inside(p, *box)
+                                             for box in boxes)]
+
+        found = geo.nearest(find, 0, 0, 1000, limit=3)
+        self.assertEqual([p for km, p in found], places[:3])
+        # 1, 4, 16 then 64 km around, the places being 11 km apart
+        self.assertEqual(len(searched), 4)
+        found = geo.nearest(find, 0, 5, 100)
+        self.assertEqual(sorted(p.longitude for km, p in found),
+                         [i / 10 for i in range(42, 50)])
+        self.assertEqual([km for km, p in found],
+                         sorted(km for km, p in found))
+
+
+class TestGridIndex(unittest.TestCase):
+    """Test the GridIndex class"""
+    def setUp(self):
+        """indexes random places, a few with no location"""
+        random.seed(1)
+        self.places = [Place(latitude=random.uniform(-90, 90),
+                             longitude=random.uniform(-180, 180))
+                       for i in range(3000)]
+        self.places += [Place(latitude=random.uniform(-0.5, 0.5),
+                              longitude=random.uniform(-0.5, 0.5))
+                        for i in range(500)]
+        self.places += [Place(latitude=None, longitude=1.0),
+                        Place(latitude="1", longitude=1.0)]
+        self.index = GridIndex()
+        for place in self.places:
+            self.index.add(place)
+
+    def check(self, *box):
+        """Test that the places within box are those found by brute force"""
+        expected = {p.id for p in self.places
+                    if geo.point(p.latitude, p.longitude) is not None and
+                    inside(p, *box)}
+        found = [p.id for p in self.index.within([box])]
+        self.assertEqual(len(found), len(set(found)))
+        self.assertEqual(set(found), expected, box)
+
+    def test_within(self):
+        """Test boxes, small, large, on cell edges and across the
+        antimeridian"""
+        for box in [(-0.1, -0.1, 0.1, 0.1), (-0.2, 0.03, 0.01, 0.4),
+                    (-1, -1, 1, 1), (10, 20, 40, 60), (-90, -180, 90, 180),
+                    (-20, 170, 20, -170), (0.37, 0.21, 0.37, 0.21)]:
+            self.check(*box)
+        self.assertEqual(len(self.index.within([(-1, -1, 1, 1)], 7)), 7)
+
+    def test_move_and_discard(self):
+        """Test that a moved place is found at its new point only"""
+        place = self.places[0]
+        self.assertFalse(self.index.stale(place))
+        place.latitude, place.longitude = 12.345, -67.891
+        self.assertTrue(self.index.stale(place))
+        self.index.add(place)
+        self.assertFalse(self.index.stale(place))
+        self.check(12.34, -67.9, 12.35, -67.88)
+        self.assertIn(place, self.index.within([(12.34, -67.9, 12.35,
+                                                 -67.88)]))
+        self.index.discard(place)
+        self.assertNotIn(place, self.index.within([(12.34, -67.9, 12.35,
+                                                    -67.88)]))
+        self.assertTrue(self.index.stale(place))
+        self.index.discard(place)
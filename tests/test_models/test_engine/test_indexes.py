@@ -0,0 +1,319 @@
+#!/usr/bin/python3
+"""
+Contains the TestIndexesDocs, TestSortedIndex, TestHashIndex,
+TestRangeIndex, TestBitsetIndex and TestPrefixIndex classes
+"""
+
+from datetime import datetime, timedelta
+import inspect
+import models
+from models.amenity import Amenity
+from models.city import City
+from models.engine import indexes
+from models.place import Place
+from models.state import State
+import pep8
+import unittest
+BitsetIndex = indexes.BitsetIndex
+HashIndex = indexes.HashIndex
+PrefixIndex = indexes.PrefixIndex
+RangeIndex = indexes.RangeIndex
+SortedIndex = indexes.SortedIndex
+
+
+class TestIndexesDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the indexes module"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.index_classes = inspect.getmembers(indexes, inspect.isclass)
+
+    def test_pep8_conformance_indexes(self):
+        """Test that models/engine/indexes.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/indexes.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_indexes(self):
+        """Test tests/test_models/test_engine/test_indexes.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_indexes.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_indexes_module_docstring(self):
+        """Test for the indexes.py module docstring"""
+        self.assertIsNot(indexes.__doc__, None,
+                         "indexes.py needs a docstring")
+        self.assertTrue(len(indexes.__doc__) >= 1,
+                        "indexes.py needs a docstring")
+
+    def test_indexes_docstrings(self):
+        """Test for the presence of docstrings in the index classes"""
+        for name, cls in self.index_classes:
+            self.assertTrue(cls.__doc__, "{} needs a docstring".format(name))
+            for func in inspect.getmembers(cls, inspect.isfunction):
+                self.assertTrue(func[1].__doc__,
+                                "{:s} method needs a docstring".format(
+                                    func[0]))
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Test the SortedIndex class"""
+    def setUp(self):
+        """creates cities created one second apart, out of order"""
+        self.cities = [City(name=str(i)) for i in range(5)]
+        for i, city in enumerate(self.cities):
+            city.created_at = datetime(2017, 1, 1) + timedelta(seconds=i)
+
+    def test_page(self):
+        """Test that pages follow (created_at, id) after the key given"""
+        index = SortedIndex(self.cities[3:])
+        for city in self.cities[:3]:
+            index.add(city)
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.objects(), self.cities)
+        self.assertEqual(index.page(2), self.cities[:2])
+        after = indexes.sort_key(self.cities[1])
+        self.assertEqual(index.page(2, after), self.cities[2:4])
+        self.assertEqual(index.page(2, list(after)), self.cities[2:4])
+        self.assertEqual(index.page(10, indexes.sort_key(self.cities[4])),
+                         [])
+
+    def test_same_created_at(self):
+        """Test that objects created at the same time are paged by id"""
+        cities = sorted([City() for i in range(4)], key=lambda c: c.id)
+        for city in cities:
+            city.created_at = datetime(2017, 1, 1)
+        index = SortedIndex(cities)
+        after = indexes.sort_key(cities[1])
+        self.assertEqual(index.page(5, after), cities[2:])
+
+    def test_move_and_discard(self):
+        """Test that a changed created_at moves the object"""
+        index = SortedIndex(self.cities)
+        first = self.cities[0]
+        self.assertFalse(index.stale(first))
+        first.created_at = datetime(2018, 1, 1)
+        self.assertTrue(index.stale(first))
+        index.add(first)
+        self.assertEqual(index.objects(), self.cities[1:] + [first])
+        index.discard(first)
+        index.discard(first)
+        self.assertEqual(index.objects(), self.cities[1:])
+
+
+class TestHashIndex(unittest.TestCase):
+    """Test the HashIndex class"""
+    def test_add_lookup_discard(self):
+        """Test that objects are found under their attribute value"""
+        index = HashIndex("state_id")
+        a = City(name="a", state_id="1")
+        b = City(name="b", state_id="1")
+        c = City(name="c", state_id="2")
+        for city in [a, b, c]:
+            index.add(city)
+        self.assertEqual(index.lookup("1"), [a, b])
+        self.assertEqual(index.lookup("2"), [c])
+        self.assertEqual(index.lookup("3"), [])
+        self.assertEqual(index.page("1", 1, indexes.sort_key(a)), [b])
+        index.discard(a)
+        index.discard(a)
+        self.assertEqual(index.lookup("1"), [b])
+
+    def test_stale_and_move(self):
+        """Test that a changed attribute is noticed and moved on add"""
+        index = HashIndex("state_id")
+        city = City(name="a", state_id="1")
+        self.assertTrue(index.stale(city))
+        index.add(city)
+        self.assertFalse(index.stale(city))
+        city.state_id = "2"
+        self.assertTrue(index.stale(city))
+        index.add(city)
+        self.assertEqual(index.lookup("1"), [])
+        self.assertEqual(index.lookup("2"), [city])
+
+    def test_count_find(self):
+        """Test the conditions answered for the query planner"""
+        index = HashIndex("name")
+        a, b, c = City(name="a"), City(name="b"), City(name=["c"])
+        for city in [a, b, c]:
+            index.add(city)
+        self.assertEqual(index.count("eq", "a"), 1)
+        self.assertEqual(index.count("in", ["a", "b", "z"]), 2)
+        self.assertEqual(sorted(c.name for c in index.find("in", ["a", "b"])),
+                         ["a", "b"])
+        self.assertIsNone(index.count("gt", "a"))
+        self.assertIsNone(index.count("eq", ["c"]))
+        c.name = "a"
+        self.assertTrue(index.stale(c))
+        index.add(c)
+        self.assertEqual(index.count("eq", "a"), 2)
+        index.discard(b)
+        self.assertEqual(index.lookup("b"), [])
+
+
+@unittest.skipIf(models.storage_t == 'db', "unset attributes are None")
+class TestRangeIndex(unittest.TestCase):
+    """Test the RangeIndex class"""
+    def setUp(self):
+        """creates places priced 0 to 9, a free one and one priced "10" """
+        self.places = [Place(price_by_night=i % 10) for i in range(20)]
+        self.places.append(Place())
+        self.places.append(Place(price_by_night="10"))
+
+    def prices(self, objs):
+        """returns the sorted prices of objs"""
+        return sorted(place.price_by_night for place in objs)
+
+    def test_bulk_and_incremental(self):
+        """Test that both ways of filling the index answer the same"""
+        bulk = RangeIndex("price_by_night", self.places)
+        incremental = RangeIndex("price_by_night")
+        for place in reversed(self.places):
+            incremental.add(place)
+        for index in [bulk, incremental]:
+            self.assertEqual(index.count("eq", 0), 3)
+            self.assertEqual(index.count("lt", 2), 5)
+            self.assertEqual(self.prices(index.find("gte", 8)),
+                             [8, 8, 9, 9])
+            self.assertEqual(self.prices(index.find("gt", 8.5)), [9, 9])
+            self.assertEqual(self.prices(index.find("in", [1, 9, 42])),
+                             [1, 1, 9, 9])
+            self.assertEqual(index.find("gte", "1"), [self.places[-1]])
+            self.assertEqual(self.prices(index.range(3, False, 5, True)),
+                             [4, 4, 5, 5])
+            self.assertEqual(index.range_count(5, True, 3, True), 0)
+            self.assertIsNone(index.range(3, True, "5", True))
+            self.assertIsNone(index.count("eq", None))
+
+    def test_move_and_discard(self):
+        """Test that a changed value moves the object"""
+        index = RangeIndex("price_by_night", self.places)
+        place = self.places[0]
+        self.assertFalse(index.stale(place))
+        place.price_by_night = 100
+        self.assertTrue(index.stale(place))
+        index.add(place)
+        self.assertEqual(index.find("gte", 100), [place])
+        self.assertEqual(index.count("eq", 0), 2)
+        index.discard(place)
+        index.discard(place)
+        self.assertEqual(index.count("gte", 100), 0)
+
+
+class TestBitsetIndex(unittest.TestCase):
+    """Test the BitsetIndex class"""
+    def setUp(self):
+        """indexes amenities a, b and c of place 1 and d of place 2"""
+        self.index = BitsetIndex("place_id")
+        self.a, self.b, self.c, self.d = [
+            Amenity(name=name, place_id=place_id)
+            for name, place_id in zip("abcd", "1112")]
+        for amenity in [self.a, self.b, self.c, self.d]:
+            self.index.add(amenity)
+
+    def test_all_and_any(self):
+        """Test the "all of" and "any of" filters"""
+        every, found = self.index.mask([self.a.id, self.b.id, "x"])
+        self.assertEqual((bin(every).count("1"), found), (2, 2))
+        self.assertTrue(self.index.matches("1", every))
+        self.assertFalse(self.index.matches("2", every))
+        self.assertEqual(self.index.find(every), ["1"])
+        some = self.index.mask([self.a.id, self.d.id])[0]
+        self.assertEqual(sorted(self.index.find(0, some)), ["1", "2"])
+        self.assertEqual(self.index.find(every, self.index.mask(
+            [self.d.id])[0]), [])
+        self.assertFalse(self.index.matches("3", 0, some))
+        self.assertTrue(self.index.matches("3"))
+
+    def test_move_and_discard(self):
+        """Test that moved amenities keep their bit and freed bits are
+        reused"""
+        bit = self.index.mask([self.c.id])[0]
+        self.c.place_id = "2"
+        self.assertTrue(self.index.stale(self.c))
+        self.index.add(self.c)
+        self.assertFalse(self.index.stale(self.c))
+        self.assertEqual(self.index.mask([self.c.id])[0], bit)
+        self.assertTrue(self.index.matches("2", bit))
+        self.assertFalse(self.index.matches("1", bit))
+        self.index.discard(self.a)
+        self.index.discard(self.a)
+        self.assertEqual(self.index.mask([self.a.id]), (0, 0))
+        e = Amenity(name="e", place_id="1")
+        self.index.add(e)
+        self.assertEqual(self.index.mask([e.id, self.b.id])[0], 0b11)
+        self.index.discard(self.b)
+        self.index.discard(e)
+        self.assertEqual(self.index.find(), ["2"])
+
+
+class TestPrefixIndex(unittest.TestCase):
+    """Test the PrefixIndex class and complete"""
+    def setUp(self):
+        """indexes the names of states and cities"""
+        self.states = [State(name=name) for name in
+                       ["California", "Colorado", "Côte-d'Or", "Nevada"]]
+        self.cities = [City(name=name) for name in
+                       ["cologne", "Calistoga", "Colorado", "Reno"]]
+        self.indexes = {"City": PrefixIndex("name"),
+                        "State": PrefixIndex("name")}
+        for state in self.states:
+            self.indexes["State"].add(state)
+        for city in self.cities:
+            self.indexes["City"].add(city)
+
+    def test_match(self):
+        """Test that values are matched by prefix, ignoring case and
+        accents, in order"""
+        index = self.indexes["State"]
+        self.assertEqual(len(index), 4)
+        self.assertEqual([key[1] for key in index.match("co")],
+                         ["Colorado", "Côte-d'Or"])
+        self.assertEqual([key[1] for key in index.match("CÔT")],
+                         ["Côte-d'Or"])
+        self.assertEqual([key[1] for key in index.match("c", 2)],
+                         ["California", "Colorado"])
+        self.assertEqual(len(index.match("")), 4)
+        self.assertEqual(index.match("x"), [])
+        self.assertEqual(index.match("californiaa"), [])
+
+    def test_complete(self):
+        """Test that complete merges the classes by value then class"""
+        colorado = self.cities[2]
+        self.assertEqual(indexes.complete(self.indexes, "Co"), [
+            ("cologne", "City", self.cities[0].id),
+            ("Colorado", "City", colorado.id),
+            ("Colorado", "State", self.states[1].id),
+            ("Côte-d'Or", "State", self.states[2].id)])
+        self.assertEqual(indexes.complete(self.indexes, "c", 2), [
+            ("California", "State", self.states[0].id),
+            ("Calistoga", "City", self.cities[1].id)])
+        self.assertEqual(indexes.complete({}, "c"), [])
+
+    def test_move_and_discard(self):
+        """Test that a renamed object moves and others are left out"""
+        index = self.indexes["City"]
+        city = self.cities[3]
+        self.assertFalse(index.stale(city))
+        city.name = "Carson City"
+        self.assertTrue(index.stale(city))
+        index.add(city)
+        self.assertFalse(index.stale(city))
+        self.assertEqual(index.match("re"), [])
+        self.assertEqual([key[2] for key in index.match("car")], [city.id])
+        city.name = None
+        index.add(city)
+        self.assertEqual(len(index), 3)
+        index.discard(self.cities[0])
+        index.discard(self.cities[0])
+        index.put("other", "Cork")
+        self.assertEqual([key[1] for key in index.match("co")],
+                         ["Colorado", "Cork"])
+        index.remove("other")
+        self.assertEqual(len(index), 2)
@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+"""
+Contains the TestPoolDocs, TestPoolOptions and TestPoolMonitor classes
+"""
+
+import inspect
+from models.engine import pool
+import os
+import pep8
+import shutil
+from sqlalchemy import create_engine, exc, text
+import sqlalchemy.pool
+import tempfile
+import unittest
+from unittest import mock
+PoolMonitor = pool.PoolMonitor
+TimedQueuePool = pool.TimedQueuePool
+
+
+class TestPoolDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the pool module"""
+    def test_pep8_conformance_pool(self):
+        """Test that models/engine/pool.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/pool.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_pool(self):
+        """Test tests/test_models/test_engine/test_pool.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_pool.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pool_docstrings(self):
+        """Test for the module, function, class and method docstrings"""
+        self.assertTrue(pool.__doc__)
+        for cls in [PoolMonitor, TimedQueuePool]:
+            self.assertTrue(cls.__doc__)
+            for func in inspect.getmembers(cls, inspect.isfunction):
+                if func[0] in vars(cls):
+                    self.assertTrue(func[1].__doc__,
+                                    "{:s} needs a docstring".format(func[0]))
+        self.assertTrue(pool.pool_options.__doc__)
+
+
+class TestPoolOptions(unittest.TestCase):
+    """Test the pool settings read from the environment"""
+    def test_defaults(self):
+        """Test that connections are pinged and recycled by default"""
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(pool.pool_options("sqlite://"),
+                             {"pool_recycle": 3600, "pool_pre_ping": True})
+            self.assertEqual(pool.pool_options("sqlite:///hbnb.db"),
+                             {"pool_recycle": 3600, "pool_pre_ping": True,
+                              "poolclass": TimedQueuePool})
+
+    def test_environment(self):
+        """Test that the HBNB_MYSQL_POOL_* variables set the pool"""
+        environ = {"HBNB_MYSQL_POOL_SIZE": "20",
+                   "HBNB_MYSQL_MAX_OVERFLOW": "5",
+                   "HBNB_MYSQL_POOL_TIMEOUT": "2.5",
+                   "HBNB_MYSQL_POOL_RECYCLE": "600",
+                   "HBNB_MYSQL_POOL_PRE_PING": "false"}
+        with mock.patch.dict(os.environ, environ, clear=True):
+            self.assertEqual(pool.pool_options("sqlite:///hbnb.db"),
+                             {"pool_size": 20, "max_overflow": 5,
+                              "pool_timeout": 2.5, "pool_recycle": 600,
+                              "pool_pre_ping": False,
+                              "poolclass": TimedQueuePool})
+        with mock.patch.dict(os.environ, {"HBNB_MYSQL_POOL_SIZE": "x"}):
+            with self.assertRaises(ValueError):
+                pool.pool_options("sqlite://")
+
+    def test_pool_class(self):
+        """Test that HBNB_DB_POOL_CLASS picks the pool, which is only given
+        the HBNB_MYSQL_* sizes if it is a QueuePool"""
+        environ = {"HBNB_MYSQL_POOL_SIZE": "20",
+                   "HBNB_MYSQL_MAX_OVERFLOW": "5",
+                   "HBNB_MYSQL_POOL_TIMEOUT": "2.5"}
+        for name in ["NullPool", "StaticPool"]:
+            environ["HBNB_DB_POOL_CLASS"] = name
+            with mock.patch.dict(os.environ, environ, clear=True):
+                options = pool.pool_options("sqlite:///hbnb.db")
+            self.assertEqual(options, {
+                "pool_recycle": 3600, "pool_pre_ping": True,
+                "poolclass": getattr(sqlalchemy.pool, name)})
+            engine = create_engine("sqlite://", **options)
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            engine.dispose()
+        environ["HBNB_DB_POOL_CLASS"] = "QueuePool"
+        with mock.patch.dict(os.environ, environ, clear=True):
+            self.assertEqual(pool.pool_options("sqlite://"),
+                             {"pool_size": 20, "max_overflow": 5,
+                              "pool_timeout": 2.5, "pool_recycle": 3600,
+                              "pool_pre_ping": True,
+                              "poolclass": TimedQueuePool})
+        for name in ["Nothing", "exc", "QueuePool.connect"]:
+            with mock.patch.dict(os.environ, {"HBNB_DB_POOL_CLASS": name}):
+                with self.assertRaises(ValueError):
+                    pool.pool_options("sqlite://")
+
+
+class TestPoolMonitor(unittest.TestCase):
+    """Test the PoolMonitor class"""
+    def setUp(self):
+        """creates an engine with a pool of one connection"""
+        self.tmp = tempfile.mkdtemp()
+        url = "sqlite:///" + os.path.join(self.tmp, "pool.db")
+        with mock.patch.dict(os.environ, {"HBNB_MYSQL_POOL_SIZE": "1",
+                                          "HBNB_MYSQL_MAX_OVERFLOW": "0",
+                                          "HBNB_MYSQL_POOL_TIMEOUT": "0.05"}):
+            self.engine = create_engine(url, **pool.pool_options(url))
+        self.monitor = PoolMonitor(self.engine)
+
+    def tearDown(self):
+        """closes the engine and removes its database"""
+        self.engine.dispose()
+        shutil.rmtree(self.tmp)
+
+    def test_stats(self):
+        """Test that checkouts, timeouts and waits are counted"""
+        stats = self.monitor.stats()
+        self.assertEqual((stats["pool"], stats["size"], stats["timeout"]),
+                         ("TimedQueuePool", 1, 0.05))
+        conn = self.engine.connect()
+        conn.execute(text("SELECT 1"))
+        with self.assertRaises(exc.TimeoutError):
+            self.engine.connect()
+        stats = self.monitor.stats()
+        self.assertEqual((stats["checked_out"], stats["peak_checked_out"],
+                          stats["connects"], stats["checkouts"],
+                          stats["timeouts"], stats["overflow"]),
+                         (1, 1, 1, 1, 1, 0))
+        histogram = stats["wait_ms"]["histogram"]
+        self.assertEqual([bucket["le"] for bucket in histogram],
+                         list(pool.WAIT_BUCKETS_MS) + [None])
+        self.assertEqual(sum(bucket["count"] for bucket in histogram), 2)
+        self.assertGreaterEqual(stats["wait_ms"]["total"], 50)
+        conn.close()
+        self.assertEqual(self.monitor.stats()["checked_out"], 0)
+
+    def test_recreated_pool(self):
+        """Test that the pool recreated by dispose is still watched"""
+        self.engine.dispose()
+        self.assertIsNot(self.engine.pool.monitor, None)
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.invalidate()
+        stats = self.monitor.stats()
+        self.assertEqual((stats["checkouts"], stats["invalidated"],
+                          stats["checked_out"]), (1, 1, 0))
+        self.assertEqual(sum(bucket["count"] for bucket
+                             in stats["wait_ms"]["histogram"]), 1)
+
+    def test_other_pool(self):
+        """Test that pools without a size only report the events"""
+        engine = create_engine("sqlite://", **pool.pool_options("sqlite://"))
+        monitor = PoolMonitor(engine)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        stats = monitor.stats()
+        self.assertEqual(stats["pool"], "SingletonThreadPool")
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertNotIn("wait_ms", stats)
+        self.assertNotIn("size", stats)
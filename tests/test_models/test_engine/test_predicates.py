@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+"""
+Contains the TestPredicatesDocs and TestPredicates classes
+"""
+
+import inspect
+import models
+from models.engine import predicates
+from models.place import Place
+import pep8
+import unittest
+
+
+class TestPredicatesDocs(unittest.TestCase):
+    """Tests to check the documentation and style of predicates.py"""
+    def test_pep8_conformance_predicates(self):
+        """Test that models/engine/predicates.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/predicates.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_predicates(self):
+        """Test tests/test_models/test_engine/test_predicates.py conforms
+        to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_predicates.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_predicates_docstrings(self):
+        """Test for the module and function docstrings"""
+        self.assertTrue(predicates.__doc__)
+        for func in inspect.getmembers(predicates, inspect.isfunction):
+            if func[0] != "<lambda>":
+                self.assertTrue(func[1].__doc__,
+                                "{:s} needs a docstring".format(func[0]))
+
+
+class TestPredicates(unittest.TestCase):
+    """Test the functions of the predicates module"""
+    def test_parse(self):
+        """Test that keywords are split into conditions"""
+        self.assertEqual(
+            predicates.parse({"name": "Home", "price_by_night__lte": 100,
+                              "city_id__in": ("a", "b")}),
+            [("name", "eq", "Home"), ("price_by_night", "lte", 100),
+             ("city_id", "in", ["a", "b"])])
+        for bad in ["price__between", "__gt"]:
+            with self.assertRaises(ValueError):
+                predicates.parse({bad: 1})
+
+    @unittest.skipIf(models.storage_t == 'db', "unset attributes are None")
+    def test_matches(self):
+        """Test conditions on set, default and incomparable values"""
+        place = Place(name="Home", price_by_night=80)
+        conditions = predicates.parse({"price_by_night__gte": 50,
+                                       "price_by_night__lt": 100,
+                                       "name__in": ["Home", "Flat"]})
+        self.assertTrue(predicates.matches(place, conditions))
+        self.assertTrue(predicates.matches(place, []))
+        self.assertFalse(predicates.matches(
+            place, predicates.parse({"price_by_night__gt": 80})))
+        self.assertTrue(predicates.matches(
+            place, predicates.parse({"max_guest": 0})))
+        place.price_by_night = "80"
+        self.assertFalse(predicates.matches(place, conditions))
+
+    def test_ordering(self):
+        """Test that order_by is split into attribute and direction"""
+        self.assertEqual(predicates.ordering("name"), ("name", False))
+        self.assertEqual(predicates.ordering("-name"), ("name", True))
+        self.assertEqual(predicates.ordering(None), (None, False))
+        with self.assertRaises(ValueError):
+            predicates.ordering("-")
+
+    def test_order(self):
+        """Test that objects are sorted, other values last"""
+        places = [Place(name=str(i), price_by_night=price)
+                  for i, price in enumerate([30, None, 10, "20", 20.5])]
+        self.assertEqual(
+            [p.name for p in predicates.order(places, "price_by_night")],
+            ["2", "4", "0", "3", "1"])
+        self.assertEqual(
+            [p.name for p in predicates.order(places, "price_by_night",
+                                              True)],
+            ["0", "4", "2", "3", "1"])
+
+    def test_aggregate(self):
+        """Test the aggregates over the values that are numbers"""
+        places = [Place(price_by_night=price) for price in [30, "x", 10]]
+        self.assertEqual(predicates.aggregate(places, "price_by_night"),
+                         {"count": 3, "min": 10, "max": 30, "mean": 20})
+        self.assertEqual(predicates.aggregate(places, "name"),
+                         {"count": 3, "min": None, "max": None,
+                          "mean": None})
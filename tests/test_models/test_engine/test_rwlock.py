@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""
+Contains the TestRWLockDocs and TestRWLock classes
+"""
+
+import inspect
+from models.engine import rwlock
+import pep8
+import threading
+import time
+import unittest
+RWLock = rwlock.RWLock
+
+
+class TestRWLockDocs(unittest.TestCase):
+    """Tests to check the documentation and style of RWLock class"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.rw_f = inspect.getmembers(RWLock, inspect.isfunction)
+
+    def test_pep8_conformance_rwlock(self):
+        """Test that models/engine/rwlock.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/rwlock.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_rwlock(self):
+        """Test tests/test_models/test_rwlock.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_rwlock.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_rwlock_module_docstring(self):
+        """Test for the rwlock.py module docstring"""
+        self.assertIsNot(rwlock.__doc__, None,
+                         "rwlock.py needs a docstring")
+        self.assertTrue(len(rwlock.__doc__) >= 1,
+                        "rwlock.py needs a docstring")
+
+    def test_rwlock_class_docstring(self):
+        """Test for the RWLock class docstring"""
+        self.assertIsNot(RWLock.__doc__, None,
+                         "RWLock class needs a docstring")
+        self.assertTrue(len(RWLock.__doc__) >= 1,
+                        "RWLock class needs a docstring")
+
+    def test_rwlock_func_docstrings(self):
+        """Test for the presence of docstrings in RWLock methods"""
+        for func in self.rw_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} method needs a docstring".format(func[0]))
+
+
+class TestRWLock(unittest.TestCase):
+    """Test the RWLock class"""
+    def test_readers_share(self):
+        """Test that several readers hold the lock at once"""
+        lock = RWLock()
+        inside = threading.Barrier(3, timeout=5)
+
+        def reader():
+            """holds a read lock until every reader is in"""
+            with lock.read():
+                inside.wait()
+
+        threads = [threading.Thread(target=reader) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(inside.broken)
+
+    def test_writer_excludes(self):
+        """Test that a writer waits for readers and blocks new ones"""
+        lock = RWLock()
+        events = []
+        lock.acquire_read()
+
+        def writer():
+            """records when it got the write lock"""
+            with lock.write():
+                events.append("write")
+
+        def reader():
+            """records when it got the read lock"""
+            with lock.read():
+                events.append("read")
+
+        w = threading.Thread(target=writer)
+        w.start()
+        time.sleep(0.05)
+        r = threading.Thread(target=reader)
+        r.start()
+        time.sleep(0.05)
+        self.assertEqual(events, [])
+        lock.release_read()
+        w.join()
+        r.join()
+        self.assertEqual(events, ["write", "read"])
@@ -0,0 +1,503 @@
+#!/usr/bin/python3
+"""
+Contains the TestSQLiteStorageDocs and TestSQLiteStorage classes
+"""
+
+import inspect
+import json
+import models
+from models.engine import sqlite_storage
+from models.engine.geo import distance
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+import os
+import pep8
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+SQLiteStorage = sqlite_storage.SQLiteStorage
+
+
+class TestSQLiteStorageDocs(unittest.TestCase):
+    """Tests to check the documentation and style of SQLiteStorage class"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.sqs_f = inspect.getmembers(SQLiteStorage, inspect.isfunction)
+
+    def test_pep8_conformance_sqlite_storage(self):
+        """Test that models/engine/sqlite_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/sqlite_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_sqlite_storage(self):
+        """Test tests/test_models/test_sqlite_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_sqlite_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_sqlite_storage_module_docstring(self):
+        """Test for the sqlite_storage.py module docstring"""
+        self.assertIsNot(sqlite_storage.__doc__, None,
+                         "sqlite_storage.py needs a docstring")
+        self.assertTrue(len(sqlite_storage.__doc__) >= 1,
+                        "sqlite_storage.py needs a docstring")
+
+    def test_sqlite_storage_class_docstring(self):
+        """Test for the SQLiteStorage class docstring"""
+        self.assertIsNot(SQLiteStorage.__doc__, None,
+                         "SQLiteStorage class needs a docstring")
+        self.assertTrue(len(SQLiteStorage.__doc__) >= 1,
+                        "SQLiteStorage class needs a docstring")
+
+    def test_sqs_func_docstrings(self):
+        """Test for the presence of docstrings in SQLiteStorage methods"""
+        for func in self.sqs_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} method needs a docstring".format(func[0]))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing sqlite storage")
+class TestSQLiteStorage(unittest.TestCase):
+    """Test the SQLiteStorage class"""
+    def setUp(self):
+        """opens a SQLiteStorage on an empty temporary database"""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "hbnb.db")
+        with mock.patch.dict(os.environ, {"HBNB_SQLITE_PATH": self.path}):
+            self.storage = SQLiteStorage()
+        self.storage.reload()
+        self.patch = mock.patch.object(models, "storage", self.storage)
+        self.patch.start()
+
+    def tearDown(self):
+        """removes the temporary database"""
+        self.patch.stop()
+        shutil.rmtree(self.tmp)
+
+    def fresh(self):
+        """returns another SQLiteStorage on the same database"""
+        with mock.patch.dict(os.environ, {"HBNB_SQLITE_PATH": self.path}):
+            return SQLiteStorage()
+
+    def test_schema(self):
+        """Test that the tables are WAL mode with foreign key indexes"""
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0],
+                         "wal")
+        indexes = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for index in ["cities_state_id", "places_city_id", "places_user_id",
+                      "reviews_place_id", "reviews_user_id"]:
+            self.assertIn(index, indexes)
+        conn.close()
+
+    def test_new_save_get(self):
+        """Test that saved objects can be read back"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertIs(self.storage.get(State, state.id), state)
+        other = self.fresh().get("State", state.id)
+        self.assertIsNot(other, state)
+        self.assertEqual(other.to_dict(), state.to_dict())
+        self.assertIsNone(self.storage.get(State, "nope"))
+        self.assertIsNone(self.storage.get("NotAClass", state.id))
+
+    def test_update_through_attribute(self):
+        """Test that an attribute set on a loaded object is saved"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.close()
+        loaded = self.storage.get(State, state.id)
+        loaded.name = "Nevada"
+        self.storage.save()
+        self.assertEqual(self.fresh().get(State, state.id).name, "Nevada")
+
+    def test_all_count_delete(self):
+        """Test all and count per class, and delete"""
+        state = State(name="California")
+        city = City(name="Fremont", state_id=state.id)
+        user = User(email="a@b.c", password="pwd")
+        for obj in [state, city, user]:
+            self.storage.new(obj)
+        self.assertEqual(set(self.storage.all(City)), {"City." + city.id})
+        self.storage.save()
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.count(City), 1)
+        self.assertEqual(self.storage.count("Place"), 0)
+        self.assertEqual(set(self.fresh().all("State")),
+                         {"State." + state.id})
+        self.assertEqual(len(self.fresh().all()), 3)
+        self.storage.delete(city)
+        self.assertEqual(self.storage.all(City), {})
+        self.assertIsNone(self.storage.get(City, city.id))
+        self.storage.save()
+        self.assertEqual(self.storage.count(City), 0)
+
+    def test_close_drops_unsaved_changes(self):
+        """Test that close forgets the changes that were not saved"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.close()
+        self.storage.save()
+        self.assertEqual(self.storage.count(), 0)
+
+    def test_threads(self):
+        """Test that each thread uses its own connection and session"""
+        errors = []
+
+        def writer(i):
+            """saves 20 States from one thread"""
+            try:
+                for j in range(20):
+                    self.storage.new(Place(name="{}-{}".format(i, j)))
+                    self.storage.save()
+                self.storage.close()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(i,))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.storage.count(Place), 80)
+
+    def test_related(self):
+        """Test related on indexed and plain attributes, with unsaved
+        changes"""
+        state = State(name="California")
+        city = City(name="Fremont", state_id=state.id)
+        for obj in [state, city]:
+            self.storage.new(obj)
+        self.assertEqual(state.cities, [city])
+        self.storage.save()
+        self.storage.close()
+        state = self.storage.get(State, state.id)
+        self.assertEqual([c.id for c in state.cities], [city.id])
+        city = self.storage.get(City, city.id)
+        city.state_id = "elsewhere"
+        self.assertEqual(state.cities, [])
+        self.assertEqual(self.storage.related(State, "name", "California"),
+                         [state])
+
+    def test_iter(self):
+        """Test that iter yields saved and unsaved objects in batches"""
+        states = [State(name=str(i)) for i in range(5)]
+        for state in states:
+            self.storage.new(state)
+        self.storage.save()
+        self.storage.delete(states[0])
+        added = State(name="new")
+        self.storage.new(added)
+        self.storage.new(City(name="Fremont"))
+        objs = self.storage.iter(State, batch_size=2)
+        self.assertNotIsInstance(objs, (list, dict))
+        self.assertEqual(sorted(obj.name for obj in objs),
+                         ["1", "2", "3", "4", "new"])
+        self.assertEqual(len(list(self.storage.iter())), 6)
+
+    def test_page(self):
+        """Test that pages walk saved and unsaved objects by creation"""
+        state = State(name="California")
+        self.storage.new(state)
+        cities = [City(name=str(i), state_id=state.id) for i in range(5)]
+        for city in cities[:4]:
+            self.storage.new(city)
+        self.storage.save()
+        self.storage.close()
+        self.storage.new(cities[4])
+        self.storage.delete(self.storage.get(City, cities[0].id))
+        names = [city.name for city in self.storage.page(City, 10)]
+        self.assertEqual(names, ["1", "2", "3", "4"])
+        after = (cities[1].created_at.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+                 cities[1].id)
+        names = [city.name for city in self.storage.page(
+            City, 2, after, "state_id", state.id)]
+        self.assertEqual(names, ["2", "3"])
+        names = [city.name for city in self.storage.page(
+            City, 2, None, "name", "3")]
+        self.assertEqual(names, ["3"])
+
+    def test_query(self):
+        """Test that query answers like a scan, saved or not"""
+        places = [Place(name=str(i), city_id=str(i % 3),
+                        price_by_night=i * 10) for i in range(12)]
+        for place in places:
+            self.storage.new(place)
+        self.storage.save()
+        self.storage.close()
+        self.storage.new(Place(name="new", city_id="1", price_by_night=45))
+        self.storage.get(Place, places[1].id).price_by_night = "10"
+        checks = [({"city_id": "1"}, ["1", "10", "4", "7", "new"]),
+                  ({"price_by_night__gte": 40, "price_by_night__lt": 70},
+                   ["4", "5", "6", "new"]),
+                  ({"price_by_night__gte": "1"}, ["1"]),
+                  ({"name__in": ["2", "3", "x"]}, ["2", "3"]),
+                  ({"max_guest": 0, "city_id": "0"}, ["0", "3", "6", "9"]),
+                  ({"created_at__gt": places[10].created_at},
+                   ["11", "new"])]
+        for predicates, names in checks:
+            self.assertEqual(sorted(place.name for place in
+                                    self.storage.query(Place, **predicates)),
+                             names, predicates)
+
+    def test_query_order_and_aggregate(self):
+        """Test sorted, limited and aggregated queries"""
+        for i in range(6):
+            self.storage.new(Place(name=str(i), city_id=str(i % 2),
+                                   price_by_night=(i * 7) % 10))
+        self.storage.save()
+        self.storage.close()
+        self.storage.new(Place(name="odd", city_id="1",
+                               price_by_night="5"))
+        self.assertEqual([place.name for place in self.storage.query(
+            Place, order_by="-price_by_night", city_id="1")],
+            ["1", "5", "3", "odd"])
+        self.assertEqual([place.name for place in self.storage.query(
+            Place, order_by="price_by_night", limit=2)], ["0", "3"])
+        self.assertEqual(self.storage.aggregate(Place, "price_by_night",
+                                                city_id="1"),
+                         {"count": 4, "min": 1, "max": 7, "mean": 13 / 3})
+
+    def test_places_near_and_within(self):
+        """Test radius and box searches against brute force, moved and
+        unsaved places included"""
+        random.seed(2)
+        places = [Place(name=str(i), latitude=random.uniform(-60, 60),
+                        longitude=random.uniform(-180, 180))
+                  for i in range(400)]
+        places += [Place(name="east", latitude=5.0, longitude=179.95),
+                   Place(name="west", latitude=5.0, longitude=-179.95)]
+        for place in places:
+            self.storage.new(place)
+        self.storage.save()
+        self.storage.close()
+        places[0] = self.storage.get(Place, places[0].id)
+        places[0].latitude, places[0].longitude = 5.01, 179.9
+        for latitude, longitude, radius_km in [(5, 180, 50), (0, 0, 2000),
+                                               (30, -100, 10000)]:
+            expected = sorted((distance(latitude, longitude, p.latitude,
+                                        p.longitude), p.name)
+                              for p in places)
+            expected = [name for km, name in expected if km <= radius_km]
+            found = self.storage.places_near(latitude, longitude, radius_km)
+            self.assertEqual([p.name for km, p in found], expected)
+            found = self.storage.places_near(latitude, longitude, radius_km,
+                                             limit=3)
+            self.assertEqual([p.name for km, p in found], expected[:3])
+        for box in [(4, 179, 6, -179), (-10, -20, 10, 20)]:
+            south, west, north, east = box
+            self.assertEqual(
+                sorted(p.name for p in self.storage.places_within(*box)),
+                sorted(p.name for p in places
+                       if south <= p.latitude <= north and
+                       (west <= p.longitude <= east if west <= east else
+                        (p.longitude >= west or p.longitude <= east))))
+        self.assertEqual(len(self.storage.places_within(-90, -180, 90, 180,
+                                                        limit=5)), 5)
+
+    def test_place_clusters(self):
+        """Test that the clusters of map tiles count the places in them
+        and follow the places saved"""
+        places = [Place(name=str(i), latitude=10.0 + i, longitude=20.0,
+                        price_by_night=100 - i) for i in range(3)]
+        for place in places:
+            self.storage.new(place)
+        self.storage.save()
+        self.storage.close()
+        places = [self.storage.get(Place, place.id) for place in places]
+        self.assertEqual(self.storage.place_clusters(0, 0, 40, 40, 0),
+                         [{"count": 3, "latitude": 11.0, "longitude": 20.0,
+                           "min_price": 98}])
+        self.assertEqual(self.storage.place_clusters(0, 0, 40, 40, 3), [
+            {"count": 1, "latitude": 12.0, "longitude": 20.0,
+             "min_price": 98},
+            {"count": 2, "latitude": 10.5, "longitude": 20.0,
+             "min_price": 99}])
+        places[2].latitude = -10.0
+        places[0].price_by_night = 5
+        self.storage.new(Place(name="new", latitude=-20.0, longitude=-20.0,
+                               price_by_night=1))
+        self.storage.save()
+        self.assertEqual(self.storage.place_clusters(-40, -40, 40, 40, 0),
+                         [{"count": 2, "latitude": 10.5, "longitude": 20.0,
+                           "min_price": 5},
+                          {"count": 1, "latitude": -20.0, "longitude": -20.0,
+                           "min_price": 1},
+                          {"count": 1, "latitude": -10.0, "longitude": 20.0,
+                           "min_price": 98}])
+        self.assertEqual(self.storage.place_clusters(50, 50, 60, 60, 5), [])
+
+    def test_texts_indexed_on_reload(self):
+        """Test that reload indexes the texts saved before the texts
+        table"""
+        review = Review(text="Sunny terrace", place_id="p")
+        self.storage.new(review)
+        self.storage.save()
+        conn = sqlite3.connect(self.path)
+        conn.execute("DROP TABLE texts")
+        conn.execute("DROP TABLE text_ids")
+        conn.commit()
+        conn.close()
+        storage = self.fresh()
+        storage.reload()
+        self.assertEqual([obj.id for score, obj in storage.search("sunny")],
+                         [review.id])
+
+    def test_search(self):
+        """Test that search ranks the places and reviews holding the words
+        and pages through them, following the texts saved"""
+        place = Place(name="Loft", description="Quiet loft near the beach")
+        others = [Review(text="Beach, beach and beach!", place_id="p"),
+                  Review(text="A loft with a garden", place_id="p"),
+                  Review(text="Noisy street", place_id="p")]
+        for obj in [place] + others:
+            self.storage.new(obj)
+        self.storage.save()
+        self.storage.close()
+        others = [self.storage.get(Review, review.id) for review in others]
+        found = self.storage.search("BEACH")
+        self.assertEqual([obj.id for score, obj in found],
+                         [others[0].id, place.id])
+        self.assertGreater(found[0][0], found[1][0])
+        found = self.storage.search("beach loft garden")
+        self.assertEqual(len(found), 3)
+        self.assertEqual(self.storage.search("beach loft garden", 1),
+                         found[:1])
+        after = (found[0][0], found[0][1].__class__.__name__, found[0][1].id)
+        self.assertEqual(self.storage.search("beach loft garden", 5, after),
+                         found[1:])
+        self.assertEqual(self.storage.search("pool"), [])
+        self.assertEqual(self.storage.search(" ! "), [])
+        others[2].text = "Noisy pool"
+        self.storage.delete(others[0])
+        self.storage.save()
+        self.assertEqual([obj.id for score, obj in
+                          self.storage.search("pool beach")],
+                         [others[2].id, place.id])
+
+    def test_autocomplete(self):
+        """Test that autocomplete finds the names starting with a prefix,
+        ignoring case and accents, following the objects changed"""
+        state = State(name="Colorado")
+        cities = [City(name="Colorado Springs", state_id=state.id),
+                  City(name="Cologne", state_id="x"),
+                  City(name="Denver", state_id=state.id)]
+        amenity = Amenity(name="coffee maker")
+        for obj in [state, amenity] + cities:
+            self.storage.new(obj)
+        self.storage.save()
+        self.storage.close()
+        cities = [self.storage.get(City, city.id) for city in cities]
+        self.assertEqual(self.storage.autocomplete("CO"), [
+            ("coffee maker", "Amenity", amenity.id),
+            ("Cologne", "City", cities[1].id),
+            ("Colorado", "State", state.id),
+            ("Colorado Springs", "City", cities[0].id)])
+        self.assertEqual(self.storage.autocomplete("colo", 1),
+                         [("Cologne", "City", cities[1].id)])
+        self.assertEqual(self.storage.autocomplete("z"), [])
+        cities[2].name = "Côte"
+        self.storage.delete(cities[1])
+        self.storage.save()
+        self.assertEqual([value for value, name, id in
+                          self.storage.autocomplete("cot")], ["Côte"])
+        self.assertEqual(self.storage.autocomplete("colog"), [])
+
+    def test_counts(self):
+        """Test that counts reads the count of every class at once and
+        caches the approximate ones"""
+        for obj in [State(name="a"), State(name="b"), City(name="c")]:
+            self.storage.new(obj)
+        self.storage.save()
+        counts = self.storage.counts()
+        self.assertEqual(set(counts), set(sqlite_storage.classes))
+        self.assertEqual((counts["State"], counts["City"], counts["Place"]),
+                         (2, 1, 0))
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.counts(approximate=True), counts)
+        self.storage.new(State(name="d"))
+        self.storage.save()
+        self.assertEqual(self.storage.count(State), 3)
+        self.assertEqual(self.storage.count(State, approximate=True), 2)
+        self.storage._SQLiteStorage__count_ttl = 0
+        self.assertEqual(self.storage.count(State, approximate=True), 3)
+        self.assertEqual(self.storage.count(None, approximate=True), 4)
+
+    def test_location_columns_added(self):
+        """Test that reload adds the location columns to a places table
+        created without them"""
+        shutil.rmtree(self.tmp)
+        os.mkdir(self.tmp)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE places (id TEXT PRIMARY KEY, created_at "
+                     "TEXT, updated_at TEXT, city_id TEXT, user_id TEXT, "
+                     "data TEXT NOT NULL) WITHOUT ROWID")
+        for id, values in [("a", {"latitude": 48.85, "longitude": 2.35}),
+                           ("b", {})]:
+            values.update({"__class__": "Place", "id": id})
+            conn.execute("INSERT INTO places (id, data) VALUES (?, ?)",
+                         [id, json.dumps(values)])
+        conn.commit()
+        conn.close()
+        storage = self.fresh()
+        storage.reload()
+        self.assertEqual([p.id for p in storage.places_within(48, 2, 49, 3)],
+                         ["a"])
+        self.assertEqual([p.id for km, p in storage.places_near(0, 0, 1)],
+                         ["b"])
+        conn = sqlite3.connect(self.path)
+        self.assertIn("places_location", {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")})
+        conn.close()
+
+    def test_search_places(self):
+        """Test search_places by state, city and amenity, saved or not"""
+        states = [State(name=str(i)) for i in range(2)]
+        cities = [City(name=str(i), state_id=states[i % 2].id)
+                  for i in range(4)]
+        places = [Place(name=str(i), city_id=cities[i % 4].id)
+                  for i in range(8)]
+        amenities = [Amenity(name=str(i), place_id=places[i].id)
+                     for i in range(3)]
+        for obj in states + cities + places + amenities:
+            self.storage.new(obj)
+        self.storage.save()
+        self.storage.close()
+        self.storage.new(Place(name="new", city_id=cities[3].id))
+        checks = [(([], [], []), ["0", "1", "2", "3", "4", "5", "6", "7",
+                                  "new"]),
+                  (([states[1].id], [], []), ["1", "3", "5", "7", "new"]),
+                  (([states[0].id], [cities[1].id], []),
+                   ["0", "1", "2", "4", "5", "6"]),
+                  (([], [], [amenities[2].id]), ["2"]),
+                  (([states[1].id], [], [amenities[2].id]), []),
+                  (([], [], [amenities[0].id, amenities[1].id]), []),
+                  (([], [], ["missing"]), []),
+                  (([], [], [], [amenities[0].id, amenities[1].id]),
+                   ["0", "1"]),
+                  (([states[1].id], [], [], [amenities[0].id,
+                                             amenities[1].id]), ["1"])]
+        for ids, names in checks:
+            self.assertEqual(sorted(place.name for place in
+                                    self.storage.search_places(*ids)),
+                             names, ids)
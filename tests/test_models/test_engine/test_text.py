@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+"""
+Contains the TestTextDocs, TestText and TestTextIndex classes
+"""
+
+import inspect
+from math import log
+from models.engine import text
+from models.review import Review
+import pep8
+import random
+import unittest
+TextIndex = text.TextIndex
+
+
+def bm25(reviews, terms):
+    """returns the {id: BM25 score} of the reviews, the brute force way"""
+    documents = {review.id: text.tokens(review.text) for review in reviews}
+    average = sum(map(len, documents.values())) / len(documents)
+    scores = {}
+    for term in set(terms):
+        holding = [id for id, tokens in documents.items() if term in tokens]
+        idf = log(1 + (len(documents) - len(holding) + 0.5) /
+                  (len(holding) + 0.5))
+        for id in holding:
+            count = documents[id].count(term)
+            norm = text.K1 * (1 - text.B + text.B * len(documents[id]) /
+                              average)
+            scores[id] = (scores.get(id, 0.0) +
+                          idf * count * (text.K1 + 1) / (count + norm))
+    return scores
+
+
+class TestTextDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the text module"""
+    def test_pep8_conformance_text(self):
+        """Test that models/engine/text.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/text.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_text(self):
+        """Test tests/test_models/test_engine/test_text.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_text.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_text_docstrings(self):
+        """Test for the module, function, class and method docstrings"""
+        self.assertTrue(text.__doc__)
+        self.assertTrue(TextIndex.__doc__)
+        for func in (inspect.getmembers(text, inspect.isfunction) +
+                     inspect.getmembers(TextIndex, inspect.isfunction)):
+            self.assertTrue(func[1].__doc__,
+                            "{:s} needs a docstring".format(func[0]))
+
+
+class TestText(unittest.TestCase):
+    """Test the tokenizer and the ranking of the text module"""
+    def test_tokens(self):
+        """Test that tokens are lowercased words without accents"""
+        self.assertEqual(text.tokens("Crème brûlée, near the BEACH_2!"),
+                         ["creme", "brulee", "near", "the", "beach", "2"])
+        self.assertEqual(text.tokens(None), [])
+        self.assertEqual(text.tokens(" -- "), [])
+
+    def test_fold(self):
+        """Test that folded text is lowercased without accents"""
+        self.assertEqual(text.fold("Côte-d'Or STRASSE"), "cote-d'or strasse")
+        self.assertEqual(text.fold("Straße"), "strasse")
+
+    def test_rank(self):
+        """Test the order of the ranking and its pages"""
+        scored = [(1.0, "Review", "b", "rb"), (2.0, "Review", "a", "ra"),
+                  (1.0, "Place", "c", "pc"), (1.0, "Review", "a", "ra2")]
+        self.assertEqual(text.rank(scored),
+                         [(2.0, "ra"), (1.0, "pc"), (1.0, "ra2"),
+                          (1.0, "rb")])
+        self.assertEqual(text.rank(scored, 2), [(2.0, "ra"), (1.0, "pc")])
+        self.assertEqual(text.rank(scored, 2, (1.0, "Place", "c")),
+                         [(1.0, "ra2"), (1.0, "rb")])
+        self.assertEqual(text.rank(scored, None, (1.0, "Review", "b")), [])
+
+
+class TestTextIndex(unittest.TestCase):
+    """Test the TextIndex class"""
+    def setUp(self):
+        """indexes reviews made of random words"""
+        random.seed(4)
+        words = ["cozy", "quiet", "loft", "beach", "view", "garden",
+                 "noisy", "street", "pool", "sunny", "wifi", "host"]
+        self.reviews = [Review(text=" ".join(
+            random.choice(words) for i in range(random.randint(0, 20))))
+            for i in range(300)]
+        self.index = TextIndex(("text",))
+        for review in self.reviews:
+            self.index.add(review)
+
+    def check(self, terms):
+        """Test that the scores of terms are those of brute force"""
+        scores = self.index.scores(terms)
+        expected = bm25(self.reviews, terms)
+        self.assertEqual(set(scores), set(expected))
+        for id, score in expected.items():
+            self.assertAlmostEqual(scores[id], score)
+
+    def test_scores(self):
+        """Test BM25 scores of one and several terms"""
+        self.assertEqual(len(self.index), 300)
+        self.check(["beach"])
+        self.check(["beach", "pool", "beach"])
+        self.check(["missing"])
+        self.assertEqual(TextIndex(("text",)).scores(["beach"]), {})
+
+    def test_add_and_discard(self):
+        """Test that the index follows the texts changed and removed"""
+        review = self.reviews[0]
+        self.assertFalse(self.index.stale(review))
+        review.text = "Zebra, zebra and a beach"
+        self.assertTrue(self.index.stale(review))
+        self.index.add(review)
+        self.assertFalse(self.index.stale(review))
+        self.check(["zebra", "beach"])
+        for review in self.reviews[:100]:
+            self.index.discard(review)
+        del self.reviews[:100]
+        self.assertEqual(len(self.index), 200)
+        self.check(["zebra", "beach", "host"])
+        self.index.put("other", ["Beach", 3, None])
+        self.assertIn("other", self.index.scores(["beach"]))
+        self.index.remove("other")
+        self.index.remove("other")
+        self.check(["beach"])
@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+"""
+Contains the TestTilesDocs, TestTiles and TestTileCache classes
+"""
+
+import inspect
+from models.engine import tiles
+from models.place import Place
+import pep8
+import random
+import unittest
+TileCache = tiles.TileCache
+
+
+def brute(places, south, west, north, east, zoom):
+    """returns the sorted (count, min price) of the tiles overlapping the
+    box, from every place"""
+    level = zoom + tiles.CELL_ZOOM
+    found = {}
+    for place in places:
+        key = tiles.tile(place.latitude, place.longitude, level)
+        found.setdefault(key, []).append(place.price_by_night)
+    return sorted((len(found[key]), min(found[key]))
+                  for part in tiles.covering(south, west, north, east, level)
+                  for key in part if key in found)
+
+
+class TestTilesDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the tiles module"""
+    def test_pep8_conformance_tiles(self):
+        """Test that models/engine/tiles.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/tiles.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_tiles(self):
+        """Test tests/test_models/test_engine/test_tiles.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_tiles.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_tiles_docstrings(self):
+        """Test for the module, function, class and method docstrings"""
+        self.assertTrue(tiles.__doc__)
+        self.assertTrue(TileCache.__doc__)
+        for func in (inspect.getmembers(tiles, inspect.isfunction) +
+                     inspect.getmembers(TileCache, inspect.isfunction)):
+            self.assertTrue(func[1].__doc__,
+                            "{:s} needs a docstring".format(func[0]))
+
+
+class TestTiles(unittest.TestCase):
+    """Test the tile helpers of the tiles module"""
+    def test_tile(self):
+        """Test the Web Mercator tiles of points"""
+        self.assertEqual(tiles.tile(0, 0, 0), (0, 0))
+        self.assertEqual(tiles.tile(10, -10, 1), (0, 0))
+        self.assertEqual(tiles.tile(-10, 10, 1), (1, 1))
+        self.assertEqual(tiles.tile(90, 180, 3), (7, 0))
+        self.assertEqual(tiles.tile(-90, -180, 3), (0, 7))
+        self.assertEqual(tiles.tile(48.8584, 2.2945, 15), (16592, 11272))
+
+    def test_bounds(self):
+        """Test that the points of a tile are within its bounds"""
+        random.seed(0)
+        for i in range(500):
+            level = random.randint(0, 12)
+            latitude = random.uniform(-90, 90)
+            longitude = random.uniform(-180, 180)
+            south, west, north, east = tiles.bounds(
+                *tiles.tile(latitude, longitude, level), level=level)
+            self.assertTrue(south <= latitude <= north)
+            self.assertTrue(west <= longitude <= east)
+        self.assertEqual(tiles.bounds(0, 0, 0), (-90.0, -180.0, 90.0, 180.0))
+
+    def test_covering(self):
+        """Test the tiles overlapping boxes, across the antimeridian"""
+        self.assertEqual(tiles.covering(1, 1, 2, 2, 1), [[(1, 0)]])
+        self.assertEqual(tiles.covering(-1, -1, 1, 1, 1),
+                         [[(0, 0), (1, 0), (0, 1), (1, 1)]])
+        self.assertEqual(tiles.covering(1, 170, 2, -170, 2),
+                         [[(3, 1)], [(0, 1)]])
+        self.assertEqual(tiles.count(1, 170, 2, -170, 2), 2)
+        self.assertEqual(tiles.count(-90, -180, 90, 180, 22), 4 ** 22)
+
+
+class TestTileCache(unittest.TestCase):
+    """Test the TileCache class"""
+    def setUp(self):
+        """counts random places, a few with no location"""
+        random.seed(1)
+        self.places = [Place(latitude=random.uniform(-80, 80),
+                             longitude=random.uniform(-180, 180),
+                             price_by_night=random.randint(10, 500))
+                       for i in range(2000)]
+        self.unlocated = [Place(latitude=None, longitude=1.0),
+                          Place(latitude=1.0, longitude="1")]
+        self.cache = TileCache()
+        for place in self.places + self.unlocated:
+            self.cache.add(place)
+        self.searched = []
+
+    def find(self, box):
+        """returns the entries of every place, noting the box"""
+        self.searched.append(box)
+        return [self.cache.entry(place)
+                for place in self.places + self.unlocated]
+
+    def check(self, *box):
+        """Test that the clusters of the box are those found by brute
+        force"""
+        clusters = self.cache.clusters(*box, find=self.find)
+        self.assertEqual(sorted((c["count"], c["min_price"])
+                                for c in clusters),
+                         brute(self.places, *box))
+        return clusters
+
+    def test_clusters(self):
+        """Test that clusters are drawn from the cached tiles"""
+        clusters = self.check(-90, -180, 90, 180, 0)
+        self.assertEqual(sum(c["count"] for c in clusters), 2000)
+        self.assertEqual(len(self.searched), 1)
+        self.check(-90, -180, 90, 180, 0)
+        self.assertEqual(len(self.searched), 1)
+        self.check(10, 170, 40, -160, 3)
+        self.assertEqual(len(self.searched), 3)
+        place = Place(latitude=1.5, longitude=2.5, price_by_night=7)
+        self.cache.add(place)
+        self.places.append(place)
+        cluster = self.check(1.4999, 2.4999, 1.5001, 2.5001,
+                             tiles.MAX_ZOOM)[0]
+        self.assertEqual(cluster, {"count": 1, "latitude": 1.5,
+                                   "longitude": 2.5, "min_price": 7})
+
+    @unittest.skipIf(tiles.numpy is None, "NumPy is not installed")
+    def test_clusters_from_rows(self):
+        """Test that clusters drawn from a NumPy array of rows are those
+        drawn from the entries"""
+        self.places[0].price_by_night = "free"
+        self.cache.add(self.places[0])
+        rows = tiles.numpy.array([
+            (p.latitude, p.longitude, tiles.numpy.nan if
+             isinstance(p.price_by_night, str) else p.price_by_night)
+            for p in self.places])
+        for box in [(-90, -180, 90, 180, 0), (10, 170, 40, -160, 3),
+                    (-10, -10, 10, 10, 4)]:
+            expected = self.cache.clusters(*box, find=self.find)
+            cache = TileCache()
+            clusters = cache.clusters(*box, find=lambda box: rows)
+            self.assertEqual(len(clusters), len(expected))
+            for cluster, other in zip(clusters, expected):
+                self.assertEqual(cluster["count"], other["count"])
+                self.assertEqual(cluster["min_price"], other["min_price"])
+                self.assertAlmostEqual(cluster["latitude"],
+                                       other["latitude"])
+                self.assertAlmostEqual(cluster["longitude"],
+                                       other["longitude"])
+
+    def test_update(self):
+        """Test that the cached tiles follow the places added, moved,
+        repriced and removed"""
+        self.check(-90, -180, 90, 180, 0)
+        self.check(-10, -10, 10, 10, 4)
+        searched = len(self.searched)
+        place = Place(latitude=5.0, longitude=5.0, price_by_night=1)
+        self.cache.add(place)
+        self.places.append(place)
+        self.check(-90, -180, 90, 180, 0)
+        self.check(-10, -10, 10, 10, 4)
+        place.latitude = -5.0
+        self.assertTrue(self.cache.stale(place))
+        self.cache.add(place)
+        self.assertFalse(self.cache.stale(place))
+        self.check(-10, -10, 10, 10, 4)
+        for place in self.places[:50]:
+            place.price_by_night += 1
+            self.cache.add(place)
+        for place in self.places[50:100]:
+            self.cache.discard(place)
+        del self.places[50:100]
+        self.check(-90, -180, 90, 180, 0)
+        self.check(-10, -10, 10, 10, 4)
+        self.assertGreater(len(self.searched), searched)
+
+    def test_ttl_and_size(self):
+        """Test that tiles older than ttl are computed again and that the
+        cache holds at most size tiles"""
+        self.cache = TileCache(size=20, ttl=0)
+        self.check(-90, -180, 90, 180, 0)
+        self.check(-90, -180, 90, 180, 0)
+        self.assertEqual(len(self.searched), 2)
+        self.cache = TileCache(size=20)
+        self.check(-90, -180, 90, 180, 1)
+        self.check(-90, -180, 90, 180, 0)
+        self.assertEqual(len(self.searched), 4)
+        self.check(-90, -180, 90, 180, 1)
+        self.assertEqual(len(self.searched), 5)